@@ -1,16 +1,32 @@
-from flask import Flask, render_template, request, send_from_directory, redirect, url_for
+from flask import Flask, Response, g, jsonify, render_template, request, send_from_directory, redirect, stream_template, url_for
 import os
+import time
 import logging
-import subprocess
-import json
+import threading
+from util import arrow_export, circuit_breaker, correlation, json_store, single_flight
 from util.getUserSession import get_user_session_wrapper
 from util.getPortfolioHoldings import get_portfolio_holdings
 from util.fetch_candle_stick_data import fetch_candle_stick_data # Ensure this file exists
 from util.calculate_atr import calculate_atr
+from util.fundamentals import REPORT_COLUMNS, fundamental_report_rows
+from util.interactive_screen import parse_screen_params, run_screen
+from util.portfolio_risk import get_portfolio_risk
+from util.retention import enforce_retention
+from util.stream_pipeline import run_streaming_pipeline
+from util.profiling import ENABLED as PROFILING_ENABLED, PROFILE_DIR, list_profiles, profile_stage, profiled
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Needed for session
 
+# Set STOCKAUTO_STREAMING=1 to fetch candles and compute ATR one holding at a time (flat memory)
+STREAMING_PIPELINE = os.environ.get('STOCKAUTO_STREAMING', '').lower() in ('1', 'true', 'yes')
+
+ATR_REPORT_PATH = os.path.join(os.path.dirname(__file__), 'files', 'atr.json')
+
+# State of the background report refresh; the last good report is served while it runs.
+_refresh = {"running": False, "ok": None, "message": "", "finished_at": None}
+_refresh_lock = threading.Lock()
+
 # Setup logger
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'log')
 os.makedirs(log_dir, exist_ok=True)
@@ -22,6 +38,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.before_request
+def start_request_profile():
+    """Profiles the request when STOCKAUTO_PROFILE is set or the URL has ?profile=1."""
+    if request.endpoint in ('profiles', 'profile_file', 'static'):
+        return
+    if PROFILING_ENABLED or request.args.get('profile') == '1':
+        g.profile = profiled(f"request_{request.endpoint}", force=True)
+        g.profile.__enter__()
+
+@app.teardown_request
+def stop_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.__exit__(None, None, None)
+
+@profile_stage("get_user_session")
 def getUserSession(auth_code):
     logger.info(f"getUserSession called with auth_code: {auth_code}")
     auth_token = get_user_session_wrapper(auth_code)
@@ -30,10 +62,22 @@ def getUserSession(auth_code):
     else:
         return False, "Failed to fetch session details"
 
+@profile_stage("get_portfolio_holdings")
+def get_portfolio_holdings_wrapper():
+    success, message = circuit_breaker.breaker(circuit_breaker.IIFL_HOLDINGS).call(get_portfolio_holdings)
+    return success, message
+
+@profile_stage("fetch_candle_stick_data")
 def fetch_candle_stick_data_wrapper():
-    success, message = fetch_candle_stick_data()
+    success, message = circuit_breaker.breaker(circuit_breaker.IIFL_HISTORICAL_DATA).call(fetch_candle_stick_data)
+    return success, message
+
+@profile_stage("streaming_candles_atr")
+def streaming_pipeline_wrapper():
+    success, message = circuit_breaker.breaker(circuit_breaker.IIFL_HISTORICAL_DATA).call(run_streaming_pipeline)
     return success, message
 
+@profile_stage("calculate_atr")
 def calculate_atr_wrapper():
     success, message = calculate_atr()
     return success, message
@@ -41,13 +85,9 @@ def calculate_atr_wrapper():
 @app.route('/clean_project', methods=['POST'])
 def clean_project():
     try:
-        logger.info("Running clean_project.py...")
-        result = subprocess.run(['python', 'util/clean_project.py'], capture_output=True, text=True, check=True)
-        logger.info(f"clean_project.py output: {result.stdout}")
-        feedback = "Project cleaned successfully."
-    except subprocess.CalledProcessError as e:
-        feedback = f"Cleanup error: {e.stdout or e.stderr}"
-        logger.error(f"Cleanup error: {e.stdout or e.stderr}")
+        logger.info("Applying retention policies...")
+        success, message = enforce_retention()
+        feedback = f"Project cleaned successfully. {message}" if success else f"Cleanup error: {message}"
     except Exception as e:
         feedback = f"Unexpected cleanup error: {str(e)}"
         logger.exception("Exception during cleanup:")
@@ -60,13 +100,96 @@ def get_auth_code_from_config():
     if not os.path.exists(config_path):
         return ''
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            return config.get('auth_code', '')
-    except (json.JSONDecodeError, IOError) as e:
+        config = json_store.read_json(config_path)
+        return config.get('auth_code', '')
+    except (json_store.JSONDecodeError, IOError) as e:
         logger.error(f"Error reading auth_code from {config_path}: {e}")
         return ''
 
+def run_pipeline(auth_code):
+    """Runs session, holdings, candles and ATR in order. Returns (feedback, show_report)."""
+    # Step 1: Get User Session
+    logger.info(f"Received auth_code from user: {auth_code}")
+    ok, msg = getUserSession(auth_code)
+    if not ok:
+        feedback = f"Session error: {msg}"
+        logger.error(feedback)
+        return feedback, False
+    logger.info("Session step successful.")
+
+    # Step 2: Get Portfolio Holdings
+    logger.info("Fetching portfolio holdings...")
+    ok, msg = get_portfolio_holdings_wrapper()
+    if not ok:
+        feedback = f"Holdings error: {msg}"
+        logger.error(feedback)
+        return feedback, False
+    logger.info("Holdings step successful.")
+
+    if STREAMING_PIPELINE:
+        # Steps 3 and 4 in one pass, one holding at a time
+        logger.info("Fetching candles and calculating ATR in streaming mode...")
+        ok, msg = streaming_pipeline_wrapper()
+        if not ok:
+            feedback = f"Streaming pipeline error: {msg}"
+            logger.error(feedback)
+            return feedback, False
+        return f"All steps successful. {msg}", True
+
+    # Step 3: Fetch Candle Stick Data
+    logger.info("Fetching candle stick data...")
+    ok, msg = fetch_candle_stick_data_wrapper()
+    if not ok:
+        feedback = f"Candle data error: {msg}"
+        logger.error(feedback)
+        return feedback, False
+    logger.info("Candle stick data step successful.")
+
+    # Step 4: Calculate ATR
+    logger.info("Calculating ATR...")
+    ok, msg = calculate_atr_wrapper()
+    if not ok:
+        feedback = f"ATR calculation error: {msg}"
+        logger.error(feedback)
+        return feedback, False
+    logger.info("ATR calculation step successful.")
+    return f"All steps successful. {msg}", True
+
+def report_age_seconds():
+    """Seconds since the last good ATR report was written, or None if there is none."""
+    try:
+        return time.time() - os.path.getmtime(ATR_REPORT_PATH)
+    except OSError:
+        return None
+
+def format_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+def _refresh_in_background(auth_code):
+    try:
+        (feedback, ok), _ = single_flight.pipelines.do("report_pipeline", run_pipeline, auth_code)
+    except Exception as e:
+        feedback, ok = f"Unexpected error: {str(e)}", False
+        logger.exception("Exception in background report refresh:")
+    with _refresh_lock:
+        _refresh.update(running=False, ok=ok, message=feedback, finished_at=time.time())
+
+def start_report_refresh(auth_code):
+    """Starts the pipeline in a background thread unless a refresh is already running. Returns True if started."""
+    with _refresh_lock:
+        if _refresh["running"]:
+            return False
+        _refresh.update(running=True, ok=None, message="", finished_at=None)
+    threading.Thread(target=_refresh_in_background, args=(auth_code,), name="report-refresh", daemon=True).start()
+    return True
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     feedback = request.args.get('feedback', '')
@@ -74,50 +197,19 @@ def index():
     auth_code_value = get_auth_code_from_config()
     try:
         if request.method == 'POST':
-            # Step 1: Get User Session
             auth_code = request.form.get('auth_code', '')
-            logger.info(f"Received auth_code from user: {auth_code}")
-            ok, msg = getUserSession(auth_code)
-            if not ok:
-                feedback = f"Session error: {msg}"
-                logger.error(feedback)
-                # Render template and stop if session fails
-                return render_template('main.html', feedback=feedback, show_report=show_report, auth_code_value=auth_code_value)
-            
-            feedback = f"Session successful. {msg}"
-            logger.info("Session step successful.")
-
-            # Step 2: Get Portfolio Holdings
-            logger.info("Fetching portfolio holdings...")
-            ok, msg = get_portfolio_holdings()
-            if not ok:
-                feedback = f"Holdings error: {msg}"
-                logger.error(feedback)
-                return render_template('main.html', feedback=feedback, show_report=show_report, auth_code_value=auth_code_value)
-            logger.info("Holdings step successful.")
-            feedback = f"Holdings fetched successfully. {msg}"
-
-            # Step 3: Fetch Candle Stick Data
-            logger.info("Fetching candle stick data...")
-            ok, msg = fetch_candle_stick_data_wrapper()
-            if not ok:
-                feedback = f"Candle data error: {msg}"
-                logger.error(feedback)
-                return render_template('main.html', feedback=feedback, show_report=show_report, auth_code_value=auth_code_value)
-            logger.info("Candle stick data step successful.")
-            feedback = f"Candle data fetched. {msg}"
-
-            # Step 4: Calculate ATR
-            logger.info("Calculating ATR...")
-            ok, msg = calculate_atr_wrapper()
-            if not ok:
-                feedback = f"ATR calculation error: {msg}"
-                logger.error(feedback)
-            else:
-                logger.info("ATR calculation step successful.")
-                feedback = f"All steps successful. {msg}"
+            age = report_age_seconds()
+            if age is not None:
+                # Stale-while-revalidate: show the last good report now and refresh it in the background;
+                # the page swaps in the new report when the refresh finishes.
+                start_report_refresh(auth_code)
+                feedback = f"Showing the last report ({format_age(age)} old) while it refreshes in the background."
                 show_report = True
-
+            else:
+                # Concurrent submissions (another tab or user) share one run against the same files and API quota.
+                (feedback, show_report), shared = single_flight.pipelines.do("report_pipeline", run_pipeline, auth_code)
+                if shared:
+                    feedback = f"Joined a run that was already in progress. {feedback}"
     except Exception as e:
         feedback = f"Unexpected error: {str(e)}"
         logger.exception("Exception in main workflow:")
@@ -125,9 +217,113 @@ def index():
 
 @app.route('/report')
 def report():
-    """Serves the generated ATR report file."""
+    """Serves the last good ATR report file, revalidated on every request so a refresh shows up at once."""
     report_path = os.path.join(os.path.dirname(__file__), 'files')
-    return send_from_directory(report_path, 'atr.json')
+    return send_from_directory(report_path, 'atr.json', max_age=0)
+
+@app.route('/report/status')
+def report_status():
+    """Age of the served ATR report, the background refresh state and the IIFL circuit breakers."""
+    age = report_age_seconds()
+    with _refresh_lock:
+        refresh = dict(_refresh)
+    last_refresh = None
+    if refresh["finished_at"] is not None:
+        last_refresh = {"ok": refresh["ok"], "message": refresh["message"], "finished_age": format_age(time.time() - refresh["finished_at"])}
+    return jsonify({
+        "report_available": age is not None,
+        "age_seconds": round(age) if age is not None else None,
+        "age": format_age(age) if age is not None else None,
+        "refreshing": refresh["running"],
+        "last_refresh": last_refresh,
+        "circuits": circuit_breaker.breaker_status(),
+    })
+
+@app.route('/risk')
+def risk():
+    """Serves portfolio risk figures, recomputed only when holdings or their candles change."""
+    try:
+        return jsonify(get_portfolio_risk())
+    except FileNotFoundError:
+        return jsonify({"error": "Holdings not available yet."}), 404
+    except Exception as e:
+        logger.exception("Exception computing portfolio risk:")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/correlation')
+def correlation_report():
+    """
+    Serves the symbols most correlated with the current holdings (?top=20) and the holding pairs that
+    move together, from the rolling correlation matrix refreshed after the close.
+    """
+    try:
+        top = int(request.args.get("top", 20))
+    except ValueError:
+        return jsonify({"error": "Parameter 'top' must be an int."}), 400
+    try:
+        return jsonify(correlation.most_correlated(correlation.holding_symbols(), top))
+    except FileNotFoundError:
+        return jsonify({"error": "Holdings not available yet."}), 404
+    except Exception as e:
+        logger.exception("Exception computing correlations:")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/fundamentals')
+def fundamentals_report():
+    """Streams the fundamentals report rendered from files/fundamental_holdings.json."""
+    try:
+        version, rows = fundamental_report_rows()
+    except FileNotFoundError:
+        return "Fundamentals not available yet. Run util/fetch_fundamental_json.py first.", 404
+    except json_store.JSONDecodeError as e:
+        logger.error(f"Error decoding fundamentals JSON: {e}")
+        return "Fundamentals file is corrupt.", 500
+
+    # The ETag follows the source file, so browsers only re-download after it changes.
+    response = Response(stream_template('fundamental_report.html', columns=REPORT_COLUMNS, rows=rows), mimetype='text/html')
+    response.set_etag(version)
+    return response.make_conditional(request)
+
+@app.route('/screen')
+def screen():
+    """
+    Screens the locally stored market snapshot and fundamentals with thresholds from the query string
+    (min_eps_growth, min_roe, max_debt_to_equity, max_pct_from_high, max_per_sector, min_rs_score, universe).
+    """
+    try:
+        params = parse_screen_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(run_screen(params))
+    except Exception as e:
+        logger.exception("Exception running screen:")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/export/<name>.arrow')
+def export_arrow(name):
+    """
+    Streams a dataset (candles, snapshot, atr_decisions, backtest_trades, buy_list) as an Arrow IPC
+    stream, optionally limited to ?symbols=A-EQ,B-EQ. Read it with pyarrow.ipc.open_stream.
+    """
+    if name not in arrow_export.DATASETS:
+        return jsonify({"error": f"Unknown dataset '{name}'."}), 404
+    if not arrow_export.AVAILABLE:
+        return jsonify({"error": "pyarrow is not installed on the server."}), 503
+    symbols = [s for s in request.args.get("symbols", "").split(",") if s] or None
+    return Response(arrow_export.ipc_stream(name, symbols), mimetype='application/vnd.apache.arrow.stream')
+
+@app.route('/profiles')
+def profiles():
+    """Lists recent profiles written to log/profiles/."""
+    return render_template('profiles.html', profiles=list_profiles())
+
+@app.route('/profiles/<path:filename>')
+def profile_file(filename):
+    """Serves a profile summary (.txt) or raw pstats dump (.prof)."""
+    if not filename.endswith(('.txt', '.prof')):
+        return "Not found", 404
+    return send_from_directory(PROFILE_DIR, filename, mimetype='text/plain' if filename.endswith('.txt') else 'application/octet-stream', as_attachment=filename.endswith('.prof'))
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
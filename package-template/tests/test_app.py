@@ -0,0 +1,38 @@
+import json
+import pytest
+import app as webapp
+from util import fundamentals
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = tmp_path / "fundamental_holdings.json"
+    path.write_text(json.dumps({"RELIANCE.NS": {"symbol": "RELIANCE", "name": "Reliance Industries", "peRatio": 24.5}}))
+    monkeypatch.setattr(webapp, "fundamental_report_rows", lambda: fundamentals.fundamental_report_rows(str(path)))
+    return webapp.app.test_client(), path
+
+
+def test_fundamentals_report_renders_rows(client):
+    http, _ = client
+    response = http.get("/fundamentals")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert "Reliance Industries" in body and "24.5" in body
+    assert response.headers["ETag"]
+
+
+def test_fundamentals_report_is_conditional_on_the_source_file(client):
+    http, path = client
+    etag = http.get("/fundamentals").headers["ETag"]
+    assert http.get("/fundamentals", headers={"If-None-Match": etag}).status_code == 304
+
+    path.write_text(json.dumps({"TCS.NS": {"symbol": "TCS", "name": "Tata Consultancy"}}))
+    response = http.get("/fundamentals", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and "Tata Consultancy" in response.get_data(as_text=True)
+
+
+def test_fundamentals_report_missing_file(monkeypatch):
+    def missing():
+        raise FileNotFoundError
+    monkeypatch.setattr(webapp, "fundamental_report_rows", missing)
+    assert webapp.app.test_client().get("/fundamentals").status_code == 404
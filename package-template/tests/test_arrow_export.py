@@ -0,0 +1,58 @@
+import json
+import pytest
+from util import arrow_export, candle_store
+
+
+def _write_candles(symbol, n):
+    # 2023-12-29 onwards, so the candles span two years.
+    candles = [[1703808000000 + i * 86400000, 100 + i, 102 + i, 98 + i, 101 + i, 1000] for i in range(n)]
+    candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+
+@pytest.fixture
+def candles(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    _write_candles("AAA-EQ", 5)
+    _write_candles("BBB-EQ", 3)
+
+
+def test_candles_are_flattened_one_symbol_per_batch(candles):
+    frames = list(arrow_export.dataset_frames("candles"))
+    assert [f["symbol"].iloc[0] for f in frames] == ["AAA-EQ", "BBB-EQ"]
+    assert list(frames[0].columns) == ["symbol", "date", "open", "high", "low", "close", "volume", "year"]
+    assert frames[0]["year"].tolist() == [2023, 2023, 2023, 2024, 2024]
+    assert len(list(arrow_export.dataset_frames("candles", ["BBB-EQ"]))) == 1
+
+
+def test_backtest_trades_get_snake_case_columns(tmp_path, monkeypatch):
+    path = tmp_path / "nifty200_backtest.json"
+    path.write_text(json.dumps([{"Symbol": "ABC", "Entry Date": "2024-01-02", "Return %": 4.2}]))
+    monkeypatch.setattr(arrow_export, "NIFTY200_BACKTEST_PATH", str(path))
+    monkeypatch.setattr(arrow_export, "PORTFOLIO_BACKTEST_PATH", str(tmp_path / "missing.json"))
+    trades = next(arrow_export.dataset_frames("backtest_trades"))
+    assert list(trades.columns) == ["symbol", "entry_date", "return_pct", "backtest"]
+    assert trades["backtest"].tolist() == ["nifty200"]
+
+
+def test_unknown_dataset_is_rejected():
+    with pytest.raises(KeyError):
+        list(arrow_export.dataset_frames("quotes"))
+
+
+def test_parquet_and_arrow_exports_round_trip(candles, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    export_dir = str(tmp_path / "export")
+
+    ok, _ = arrow_export.export_dataset("candles", "parquet", export_dir=export_dir)
+    assert ok
+    table = pq.read_table(f"{export_dir}/candles")
+    assert table.num_rows == 8 and sorted(set(table.column("year").to_pylist())) == [2023, 2024]
+
+    ok, _ = arrow_export.export_dataset("candles", "arrow", export_dir=export_dir)
+    assert ok
+    assert ipc.open_file(f"{export_dir}/candles.arrow").read_all().num_rows == 8
+
+    streamed = ipc.open_stream(pa.py_buffer(b"".join(arrow_export.ipc_stream("candles", ["AAA-EQ"])))).read_all()
+    assert streamed.column("symbol").to_pylist() == ["AAA-EQ"] * 5
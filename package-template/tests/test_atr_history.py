@@ -0,0 +1,77 @@
+import gzip
+from datetime import date, datetime
+
+import pandas as pd
+
+from util import atr_history
+
+
+def _row(symbol, day, running_high, purchase_price=100.0, action="HOLD"):
+    holding = {"nseTradingSymbol": symbol, "totalQuantity": 10, "purchase_price": purchase_price, "last_close": 120.0,
+               "running_high": running_high, "atr_value": 3.0, "trailing_stop_loss": running_high - 7.5, "action": action}
+    return atr_history.decision_row(holding, day, datetime.combine(day, datetime.min.time()))
+
+
+def test_appended_runs_are_queryable_by_symbol_and_date(tmp_path):
+    history_dir = str(tmp_path)
+    atr_history.append_decisions([_row("A-EQ", date(2024, 12, 30), 120), _row("B-EQ", date(2024, 12, 30), 50)], history_dir)
+    atr_history.append_decisions([_row("A-EQ", date(2025, 1, 2), 125), _row("B-EQ", date(2025, 1, 2), 55)], history_dir)
+    atr_history.append_decisions([_row("A-EQ", date(2025, 1, 3), 130, action="SELL")], history_dir)
+
+    a_rows = atr_history.load_history(["A-EQ"], history_dir=history_dir)
+    assert a_rows["date"].tolist() == ["2024-12-30", "2025-01-02", "2025-01-03"]
+    january = atr_history.load_history(start="2025-01-01", end=date(2025, 1, 2), history_dir=history_dir)
+    assert sorted(january["symbol"]) == ["A-EQ", "B-EQ"]
+
+    last = atr_history.last_decisions(["A-EQ", "B-EQ", "C-EQ"], history_dir)
+    assert last["A-EQ"]["running_high"] == 130 and last["A-EQ"]["action"] == "SELL"
+    assert last["B-EQ"]["date"] == "2025-01-02"
+    assert "C-EQ" not in last
+
+
+def test_running_high_advances_from_last_row():
+    last = {"date": "2025-01-02", "running_high": 130.0, "purchase_price": 100.0}
+    highs = [140.0, 110.0, 120.0, 125.0]
+    holding = {"purchase_price": 100.0, "last_close": 118.0, "first_seen": "2025-01-03"}
+    # Two trading days since the last row: only the last two highs are new.
+    assert atr_history.advance_running_high(last, highs, holding, today=date(2025, 1, 6)) == 130.0
+    assert atr_history.advance_running_high(last, highs + [135.0], holding, today=date(2025, 1, 6)) == 135.0
+    # No usable history: seeded from the highs since first_seen, not the 140 from before the purchase.
+    assert atr_history.advance_running_high(None, highs, holding, today=date(2025, 1, 6)) == 125.0
+    assert atr_history.advance_running_high(last, highs, {**holding, "purchase_price": 90.0}, today=date(2025, 1, 6)) == 125.0
+
+
+def test_running_high_seed_without_purchase_date():
+    highs = [140.0, 110.0, 120.0]
+    # Held before the first sync: the whole candle window counts.
+    assert atr_history.seed_running_high({"purchase_price": 100.0, "first_seen": None, "last_close": 118.0}, highs) == 140.0
+    assert atr_history.seed_running_high({"averageTradedPrice": 150.0}, highs) == 150.0
+    # No candles at all: the larger of purchase price and last close.
+    assert atr_history.seed_running_high({"purchase_price": 100.0, "last_close": 118.0}) == 118.0
+    # Bought today: only today's high counts.
+    assert atr_history.seed_running_high({"purchase_price": 100.0, "first_seen": "2025-01-06"}, highs, today=date(2025, 1, 6)) == 120.0
+
+
+def test_floor_flag_is_logged_and_older_files_stay_readable(tmp_path, monkeypatch):
+    history_dir = str(tmp_path)
+    monkeypatch.setattr(atr_history, "FORMAT", "csv.gz")
+    old_columns = [c for c in atr_history.HISTORY_COLUMNS if c != "floor_armed"]
+    with gzip.open(tmp_path / "2025.csv.gz", "wt", encoding="utf-8", newline="") as f:
+        pd.DataFrame([{**_row("A-EQ", date(2025, 1, 2), 120), "floor_armed": None}], columns=old_columns).to_csv(f, index=False)
+    atr_history.append_decisions([{**_row("A-EQ", date(2025, 1, 3), 125), "floor_armed": True}], history_dir)
+
+    history = atr_history.load_history(["A-EQ"], history_dir=history_dir)
+    assert history["floor_armed"].isna().tolist() == [True, False]
+    last = atr_history.last_decisions(["A-EQ"], history_dir)["A-EQ"]
+    assert atr_history.floor_armed(last, {"purchase_price": 100.0})
+    assert not atr_history.floor_armed(last, {"purchase_price": 90.0})
+
+
+def test_running_high_windows_skip_nse_holidays(monkeypatch):
+    # Tuesday 2025-01-07 a holiday: one trading day (Wednesday) since the Monday row, not two.
+    monkeypatch.setattr(atr_history.trading_calendar, "load_holidays", lambda: {date(2025, 1, 7)})
+    last = {"date": "2025-01-06", "running_high": 130.0, "purchase_price": 100.0}
+    holding = {"purchase_price": 100.0, "first_seen": "2025-01-06"}
+    assert atr_history.advance_running_high(last, [135.0, 120.0], holding, today=date(2025, 1, 8)) == 130.0
+    # Bought Monday: Monday's and Wednesday's candles, not the 150 before the purchase.
+    assert atr_history.seed_running_high(holding, [150.0, 125.0, 120.0], today=date(2025, 1, 8)) == 125.0
@@ -0,0 +1,53 @@
+import json
+from util import candle_store
+from util import calculate_atr as atr
+
+
+def _holding(symbol, purchase_price):
+    candles = [{"high": 100 + i + 2, "low": 100 + i - 2, "close": 100 + i} for i in range(30)]
+    return {"nseTradingSymbol": symbol, "purchase_price": purchase_price, "highest_price_in_period": 131,
+            "historical_data": candles, "totalQuantity": 10}
+
+
+def test_unchanged_holdings_reuse_memoized_result(tmp_path, monkeypatch):
+    holdings_file = tmp_path / "holding.json"
+    monkeypatch.setattr(atr, "HOLDINGS_FILE", str(holdings_file))
+    monkeypatch.setattr(atr, "OUTPUT_FILE", str(tmp_path / "atr.json"))
+    monkeypatch.setattr(atr, "MEMO_FILE", str(tmp_path / "memo.json"))
+    monkeypatch.setattr(atr, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    for symbol in ("A-EQ", "B-EQ"):
+        candle_store.save_candles(symbol, {"result": [{"candles": [[i, 100 + i, 102 + i, 98 + i, 100 + i, 1000] for i in range(30)]}]})
+    holdings_file.write_text(json.dumps({"result": [_holding("A-EQ", 90), _holding("B-EQ", 90)]}))
+
+    ok, msg = atr.calculate_atr()
+    assert ok and "0 unchanged, 2 recomputed" in msg
+    first = json.loads((tmp_path / "atr.json").read_text())
+
+    ok, msg = atr.calculate_atr()
+    assert ok and "2 unchanged, 0 recomputed" in msg
+    assert json.loads((tmp_path / "atr.json").read_text()) == first
+
+    holdings_file.write_text(json.dumps({"result": [_holding("A-EQ", 90), _holding("B-EQ", 125)]}))
+    ok, msg = atr.calculate_atr()
+    assert ok and "1 unchanged, 1 recomputed" in msg
+    # Bought at 125 below a 131 high: the stop trails below cost, the floor is not armed.
+    b = json.loads((tmp_path / "atr.json").read_text())[1]
+    assert b["trailing_stop_loss"] == 131 - 4 * atr.ATR_MULTIPLIER and not b["floor_armed"]
+
+
+def test_fingerprint_is_shared_by_batch_and_streamed_holdings(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    candle_store.save_candles("A-EQ", {"result": [{"candles": [[0, 100, 102, 98, 100, 1000]]}]})
+    raw = {"nseTradingSymbol": "A-EQ", "averageTradedPrice": 90, "totalQuantity": 10, "first_seen": "2024-01-02"}
+    batch = dict(_holding("A-EQ", 90), **raw)
+    assert atr.holding_fingerprint(batch) == atr.holding_fingerprint(raw) is not None
+    assert atr.holding_fingerprint(dict(raw, first_seen="2024-03-01")) != atr.holding_fingerprint(raw)
+    assert atr.holding_fingerprint(dict(raw, nseTradingSymbol="NOCACHE-EQ")) is None
+
+
+def test_trailing_stop_arms_the_cost_floor_once_cleared():
+    assert atr.trailing_stop(100, 4, 100) == (100 - 4 * atr.ATR_MULTIPLIER, False)
+    assert atr.trailing_stop(120, 4, 100) == (110, True)
+    # A wider ATR after arming cannot pull the stop below cost.
+    assert atr.trailing_stop(120, 10, 100, armed=True) == (100, True)
@@ -0,0 +1,48 @@
+import pytest
+from util.circuit_breaker import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures_and_stops_calling():
+    clock = Clock()
+    breaker = CircuitBreaker("api", failure_threshold=2, reset_timeout=60, clock=clock)
+    calls = []
+    failing = lambda: calls.append(1) or (False, "timeout")
+
+    assert breaker.call(failing) == (False, "timeout")
+    assert breaker.state == "closed"
+    breaker.call(failing)
+    assert breaker.state == "open"
+    success, message = breaker.call(failing)
+    assert not success and "unavailable" in message
+    assert len(calls) == 2
+
+
+def test_half_open_trial_closes_or_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker("api", failure_threshold=1, reset_timeout=60, clock=clock)
+    breaker.call(lambda: (False, "down"))
+    clock.now += 61
+    assert breaker.call(lambda: (False, "still down")) == (False, "still down")
+    assert breaker.state == "open"
+    assert breaker.retry_in() == 60
+
+    clock.now += 61
+    assert breaker.call(lambda: (True, "ok")) == (True, "ok")
+    assert breaker.status()["state"] == "closed" and breaker.failures == 0
+
+
+def test_exceptions_count_as_failures():
+    breaker = CircuitBreaker("api", failure_threshold=1, clock=Clock())
+    def boom():
+        raise ConnectionError("refused")
+    with pytest.raises(ConnectionError):
+        breaker.call(boom)
+    assert breaker.state == "open" and breaker.last_error == "refused"
@@ -0,0 +1,93 @@
+import os
+import numpy as np
+import pandas as pd
+from util import candle_store, correlation, json_store
+from util.correlation import RollingCorrelation
+
+
+def _returns(days, seed=0):
+    rng = np.random.default_rng(seed)
+    r = rng.normal(0, 0.01, (days, 4))
+    r[:, 1] = 0.9 * r[:, 0] + rng.normal(0, 0.002, days)   # B moves with A
+    r[rng.random((days, 4)) < 0.05] = np.nan
+    return pd.DataFrame(r, columns=["A-EQ", "B-EQ", "C-EQ", "D-EQ"])
+
+
+def test_incremental_updates_match_full_recompute():
+    returns = _returns(200)
+    state = RollingCorrelation(returns.columns, window=100)
+    state.append(range(120), returns.iloc[:120].to_numpy())
+    for t in range(120, 200):
+        state.append([t], returns.iloc[t:t + 1].to_numpy())
+    expected = returns.tail(100).corr(min_periods=correlation.MIN_PERIODS)
+    assert state.dates == list(range(100, 200))
+    np.testing.assert_allclose(state.matrix(), expected.to_numpy(), atol=1e-9)
+
+
+def test_resize_matches_full_recompute():
+    returns = _returns(100)
+    state = RollingCorrelation(["A-EQ", "B-EQ", "C-EQ"], window=100)
+    state.append(range(100), returns[["A-EQ", "B-EQ", "C-EQ"]].to_numpy())
+    state.resize(["B-EQ", "C-EQ", "D-EQ"], returns[["D-EQ"]].to_numpy())
+    expected = returns[["B-EQ", "C-EQ", "D-EQ"]].corr(min_periods=correlation.MIN_PERIODS)
+    assert state.symbols == ["B-EQ", "C-EQ", "D-EQ"]
+    np.testing.assert_allclose(state.matrix(), expected.to_numpy(), atol=1e-9)
+
+
+def test_queries_and_diversified_selection():
+    state = RollingCorrelation(["A-EQ", "B-EQ", "C-EQ", "D-EQ"], window=100)
+    state.append(range(100), _returns(100).to_numpy())
+    assert state.strongest("B-EQ", ["A-EQ", "C-EQ"])[0] == "A-EQ"
+
+    report = correlation.most_correlated(["A-EQ"], top_n=1, state=state)
+    assert [(r["symbol"], r["with"]) for r in report["universe"]] == [("B-EQ", "A-EQ")]
+    assert correlation.most_correlated(["A-EQ", "B-EQ"], state=state)["holding_pairs"][0]["symbols"] == ["A-EQ", "B-EQ"]
+
+    kept, skipped = correlation.select_diversified(["B-EQ", "C-EQ", "A-EQ", "NEW-EQ"], state=state)
+    assert kept == ["B-EQ", "C-EQ", "NEW-EQ"] and skipped["A-EQ"][0] == "B-EQ"
+    assert correlation.select_diversified(["B-EQ", "C-EQ"], holdings=["A-EQ"], state=state)[0] == ["C-EQ"]
+
+
+def test_refresh_adds_only_new_days(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    path = str(tmp_path / "state.npz")
+    closes = 100 * (1 + _returns(150, seed=1).fillna(0)).cumprod()
+
+    def write(days, symbols=closes.columns):
+        for symbol in symbols:
+            candles = [[1704067200000 + i * 86400000, c, c, c, c, 1000] for i, c in enumerate(closes[symbol][:days])]
+            candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+    write(140)
+    assert "rebuilt with 126 new day(s)" in correlation.refresh_correlations(path=path)[1]
+    assert "already up to date" in correlation.refresh_correlations(path=path)[1]
+    write(150)
+    assert "incremental with 10 new day(s)" in correlation.refresh_correlations(path=path)[1]
+    state = correlation.load_correlations(path)
+    expected = closes.pct_change().iloc[1:150].tail(correlation.WINDOW).corr()
+    np.testing.assert_allclose(state.matrix(), expected.to_numpy(), atol=1e-9)
+
+
+def test_refresh_adds_and_drops_symbols_without_rebuilding(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    path = str(tmp_path / "state.npz")
+    closes = 100 * (1 + _returns(150, seed=2).fillna(0)).cumprod()
+
+    def write(symbols, days=150):
+        for symbol in symbols:
+            candles = [[1704067200000 + i * 86400000, c, c, c, c, 1000] for i, c in enumerate(closes[symbol][:days])]
+            candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+    write(["A-EQ", "B-EQ", "C-EQ"])
+    candle_store.save_candles("NIFTY", json_store.read_json(candle_store.candle_path("A-EQ")))
+    correlation.refresh_correlations(path=path)
+    assert correlation.load_correlations(path).symbols == ["A-EQ", "B-EQ", "C-EQ"]
+
+    write(["D-EQ"])
+    os.remove(candle_store.candle_path("A-EQ"))
+    message = correlation.refresh_correlations(path=path)[1]
+    assert "incremental (+1/-1 symbols) with 0 new day(s)" in message
+    state = correlation.load_correlations(path)
+    assert state.symbols == ["B-EQ", "C-EQ", "D-EQ"] and state.updates == 1
+    expected = closes[state.symbols].pct_change().iloc[1:].tail(correlation.WINDOW).corr()
+    np.testing.assert_allclose(state.matrix(), expected.to_numpy(), atol=1e-9)
@@ -0,0 +1,59 @@
+import json
+import pytest
+from util import download_contract_files as dcf
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+@pytest.fixture
+def contract_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dcf, "CONTRACT_DIR", str(tmp_path))
+    monkeypatch.setattr(dcf, "CONTRACT_META_PATH", str(tmp_path / "contract_files.json"))
+    return tmp_path
+
+
+def test_sync_is_conditional_and_skips_identical_content(contract_dir, monkeypatch):
+    body = json.dumps([{"tradingSymbol": "ABC-EQ", "exchange": "NSEEQ", "instrumentId": 1}]).encode()
+    responses = [FakeResponse(200, body, {"ETag": '"v1"'}), FakeResponse(304), FakeResponse(200, body, {"ETag": '"v2"'})]
+    sent = []
+
+    def fake_get(url, headers, stream, timeout):
+        sent.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(dcf.requests, "get", fake_get)
+    meta = {}
+    assert dcf.sync_contract_file("BSEEQ.json", "u", meta) == "updated"
+    assert dcf.sync_contract_file("BSEEQ.json", "u", meta) == "not_modified"
+    assert sent[1]["If-None-Match"] == '"v1"' and sent[1]["Accept-Encoding"] == "gzip"
+    assert dcf.sync_contract_file("BSEEQ.json", "u", meta) == "unchanged"
+    assert meta["BSEEQ.json"]["etag"] == '"v2"'
+    assert json.loads((contract_dir / "BSEEQ.json").read_bytes()) == json.loads(body)
+
+
+def test_invalid_download_keeps_current_file(contract_dir, monkeypatch):
+    (contract_dir / "BSEEQ.json").write_text("[]")
+    monkeypatch.setattr(dcf.requests, "get", lambda *a, **k: FakeResponse(200, b"<html>error</html>"))
+    with pytest.raises(ValueError):
+        dcf.sync_contract_file("BSEEQ.json", "u", {})
+    assert (contract_dir / "BSEEQ.json").read_text() == "[]"
+    assert not (contract_dir / "BSEEQ.json.tmp").exists()
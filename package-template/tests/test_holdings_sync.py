@@ -0,0 +1,52 @@
+from datetime import date
+from util.getPortfolioHoldings import merge_holdings
+
+
+def _position(isin, quantity, price=100.0, close=110.0):
+    return {"isin": isin, "nseTradingSymbol": f"{isin}-EQ", "totalQuantity": quantity,
+            "averageTradedPrice": price, "previousDayClose": close}
+
+
+def test_merge_keeps_derived_data_and_marks_states():
+    stored = {"result": [
+        {**_position("A", 10), "historical_data": [{"close": 1}], "status": "Strong", "purchase_price": 100.0},
+        {**_position("B", 5), "historical_data": [{"close": 2}], "purchase_price": 100.0},
+        {**_position("C", 7), "historical_data": [{"close": 3}]},
+    ]}
+    fresh = {"status": "success", "result": [
+        _position("A", 10, close=120.0),
+        _position("B", 8, price=105.0),
+        _position("D", 1),
+    ]}
+
+    merged, counts = merge_holdings(stored, fresh, today=date(2026, 1, 2))
+
+    by_isin = {h["isin"]: h for h in merged["result"]}
+    assert counts == {"new": 1, "changed": 1, "unchanged": 1, "closed": 1}
+    assert by_isin["A"]["sync_state"] == "unchanged"
+    assert by_isin["A"]["status"] == "Strong" and by_isin["A"]["historical_data"] == [{"close": 1}]
+    assert by_isin["A"]["previousDayClose"] == 120.0
+    assert by_isin["B"]["sync_state"] == "changed" and by_isin["B"]["purchase_price"] == 105.0
+    assert by_isin["D"]["sync_state"] == "new" and by_isin["D"]["first_seen"] == "2026-01-02"
+    assert merged["closed"] == [{**_position("C", 7), "closed_on": "2026-01-02"}]
+    assert merged["status"] == "success"
+
+
+def test_merge_without_stored_holdings_marks_everything_new():
+    merged, counts = merge_holdings(None, {"result": [_position("A", 1)]})
+    assert counts["new"] == 1 and merged["closed"] == []
+    # Bought at an unknown date before the first sync.
+    assert merged["result"][0]["first_seen"] is None
+
+
+def test_positions_without_isin_match_on_trading_symbol():
+    no_isin = {**_position("X", 3), "isin": None}
+    stored = {"result": [{**no_isin, "historical_data": [{"close": 1}]}, {"totalQuantity": 1}]}
+    fresh = {"result": [_position("X", 3), _position("Y", 1)]}
+
+    merged, counts = merge_holdings(stored, fresh, today=date(2026, 1, 2))
+
+    assert counts == {"new": 1, "changed": 0, "unchanged": 1, "closed": 1}
+    assert merged["result"][0]["historical_data"] == [{"close": 1}] and merged["result"][0]["isin"] == "X"
+    # A stored entry with neither ISIN nor symbol cannot be matched and is closed, not silently dropped.
+    assert merged["closed"] == [{"totalQuantity": 1, "closed_on": "2026-01-02"}]
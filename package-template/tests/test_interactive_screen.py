@@ -0,0 +1,59 @@
+import json
+import pytest
+from util import candle_store, interactive_screen, market_snapshot
+from util.interactive_screen import parse_screen_params, run_screen
+
+
+def _write_candles(symbol, n, start):
+    candles = [[1704067200000 + i * 86400000, start + i, start + i + 2, start + i - 2, start + i + 1, 1000] for i in range(n)]
+    candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    snapshot_path = str(tmp_path / "snapshot.db")
+    fundamentals_path = tmp_path / "fundamental_universe.json"
+    for symbol in ("AAA-EQ", "BBB-EQ", "CCC-EQ"):
+        _write_candles(symbol, 30, 100.0)
+    market_snapshot.refresh_snapshot(path=snapshot_path)
+    fundamentals_path.write_text(json.dumps({
+        "AAA-EQ": {"sector": "Tech", "earningsQuarterlyGrowth": 0.20, "returnOnEquity": 0.25, "debtToEquity": 0.2},
+        "BBB-EQ": {"sector": "Tech", "earningsQuarterlyGrowth": 0.08, "returnOnEquity": 0.12, "debtToEquity": 0.5},
+        "CCC-EQ": {"sector": "Energy", "earningsQuarterlyGrowth": 0.10, "returnOnEquity": 0.15, "debtToEquity": 1.8},
+    }))
+    return {"snapshot_path": snapshot_path, "fundamentals_path": str(fundamentals_path)}
+
+
+def test_thresholds_and_sector_cap(data):
+    symbols = lambda params: [r["Symbol"] for r in run_screen(parse_screen_params(params), **data)["results"]]
+    assert symbols({}) == ["AAA", "BBB"]
+    assert symbols({"min_eps_growth": "0.1"}) == ["AAA"]
+    assert symbols({"max_debt_to_equity": "2"}) == ["AAA", "BBB", "CCC"]
+    assert symbols({"max_per_sector": "1"}) == ["AAA"]
+
+
+def test_results_are_cached_until_the_data_changes(data):
+    params = parse_screen_params({"min_roe": "0.2"})
+    first = run_screen(params, **data)
+    assert not first["cached"]
+    assert run_screen(params, **data)["cached"]
+
+    with open(data["fundamentals_path"], "w") as f:
+        json.dump({"BBB-EQ": {"sector": "Tech", "earningsQuarterlyGrowth": 0.3, "returnOnEquity": 0.3, "debtToEquity": 0.1}}, f)
+    second = run_screen(params, **data)
+    assert not second["cached"]
+    assert second["data_version"] != first["data_version"]
+    assert [r["Symbol"] for r in second["results"]] == ["BBB"]
+
+
+def test_invalid_params_are_rejected():
+    with pytest.raises(ValueError):
+        parse_screen_params({"min_roe": "high"})
+    with pytest.raises(ValueError):
+        parse_screen_params({"universe": "nasdaq"})
+    with pytest.raises(ValueError):
+        parse_screen_params({"min_rs_score": "150"})
+    for raw in ("nan", "inf", "-inf"):
+        with pytest.raises(ValueError):
+            parse_screen_params({"max_pct_from_high": raw})
@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+import stat
+import numpy as np
+import pytest
+from util import json_store
+
+
+@pytest.mark.parametrize("compression", ["", "gzip"])
+def test_round_trip_detects_compression(tmp_path, compression):
+    path = str(tmp_path / "data.json")
+    data = {"result": [{"symbol": "ABC-EQ", "close": np.float64(101.5), "qty": np.int64(3)}]}
+    json_store.write_json(path, data, compression=compression)
+    with open(path, "rb") as f:
+        assert (f.read(2) == json_store.GZIP_MAGIC) == (compression == "gzip")
+    assert json_store.read_json(path) == {"result": [{"symbol": "ABC-EQ", "close": 101.5, "qty": 3}]}
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_compact_by_default_and_pretty_on_request():
+    assert json_store.dumps({"a": [1, 2]}) == b'{"a":[1,2]}'
+    assert json.loads(json_store.dumps({"a": [1, 2]}, pretty=True)) == {"a": [1, 2]}
+    assert b"\n  " in json_store.dumps({"a": [1, 2]}, pretty=True)
+
+
+@pytest.mark.parametrize("backend", ["orjson", "json"])
+def test_nan_and_infinity_are_written_as_null_by_both_backends(monkeypatch, backend):
+    if backend == "json":
+        monkeypatch.setattr(json_store, "orjson", None)
+    elif json_store.orjson is None:
+        pytest.skip("orjson is not installed")
+    data = {"atr": float("nan"), "high": np.float64("inf"), "closes": np.array([1.0, np.nan]), "rows": [(1.5, float("-inf"))]}
+    for pretty in (False, True):
+        assert json.loads(json_store.dumps(data, pretty)) == {"atr": None, "high": None, "closes": [1.0, None], "rows": [[1.5, None]]}
+
+
+def test_each_write_uses_its_own_temporary_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.json")
+    opened = []
+    real_mkstemp = json_store.tempfile.mkstemp
+    monkeypatch.setattr(json_store.tempfile, "mkstemp", lambda **kw: opened.append(real_mkstemp(**kw)) or opened[-1])
+    json_store.write_json(path, {"a": 1})
+    json_store.write_json(path, {"a": 2})
+    assert opened[0][1] != opened[1][1] and all(p.startswith(str(tmp_path)) for _, p in opened)
+    assert json_store.read_json(path) == {"a": 2}
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_reads_files_written_by_the_stdlib(tmp_path):
+    path = tmp_path / "legacy.json"
+    path.write_text(json.dumps({"atr_value": float("nan"), "name": "x"}, indent=4))
+    data = json_store.read_json(str(path))
+    assert np.isnan(data["atr_value"]) and data["name"] == "x"
+
+
+def test_corrupt_files_raise_decode_error(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_bytes(gzip.compress(b'{"a": 1}')[:12])
+    with pytest.raises(json_store.JSONDecodeError):
+        json_store.read_json(str(path))
+    path.write_text("{not json")
+    with pytest.raises(json_store.JSONDecodeError):
+        json_store.read_json(str(path))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_rewrites_keep_the_file_mode(tmp_path):
+    path = tmp_path / "config.json"
+    json_store.write_json(str(path), {"a": 1})
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~json_store._UMASK
+    path.chmod(0o644)
+    json_store.write_json(str(path), {"a": 2})
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
@@ -0,0 +1,55 @@
+import os
+import pytest
+from util import candle_store, market_snapshot
+
+
+def _write_candles(symbol, n, start=100.0):
+    candles = [[1704067200000 + i * 86400000, start + i, start + i + 2, start + i - 2, start + i + 1, 1000 + i] for i in range(n)]
+    return candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    return str(tmp_path / "snapshot.db")
+
+
+def test_snapshot_rows_hold_latest_technicals(store):
+    _write_candles("ABC-EQ", 260)
+    success, _ = market_snapshot.refresh_snapshot(path=store)
+    assert success
+    row = market_snapshot.load_snapshot(path=store).loc["ABC-EQ"]
+    assert row["close"] == 360.0
+    assert row["prev_close"] == 359.0
+    assert row["high52w"] == 361.0
+    assert row["sma200"] == pytest.approx(sum(range(161, 361)) / 200)
+    assert row["change_1w"] == pytest.approx((360 / 355 - 1) * 100)
+    assert row["candle_count"] == 260
+
+
+def test_refresh_only_recomputes_changed_candle_files(store):
+    _write_candles("ABC-EQ", 30)
+    _write_candles("XYZ-EQ", 30)
+    assert "2 updated" in market_snapshot.refresh_snapshot(path=store)[1]
+    assert "0 updated" in market_snapshot.refresh_snapshot(path=store)[1]
+
+    version = market_snapshot.snapshot_version(store)
+    path = _write_candles("XYZ-EQ", 31)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    message = market_snapshot.refresh_snapshot(path=store)[1]
+    assert "1 updated" in message
+    assert market_snapshot.load_snapshot(["XYZ-EQ"], path=store).loc["XYZ-EQ", "candle_count"] == 31
+    assert market_snapshot.snapshot_version(store) != version
+
+    os.remove(candle_store.candle_path("ABC-EQ"))
+    assert "1 removed" in market_snapshot.refresh_snapshot(path=store)[1]
+    assert list(market_snapshot.load_snapshot(path=store).index) == ["XYZ-EQ"]
+
+
+def test_full_refresh_leaves_out_index_caches(store):
+    _write_candles("ABC-EQ", 30)
+    _write_candles("NIFTY", 30)
+    market_snapshot.refresh_snapshot(["NIFTY"], path=store)  # as an earlier full refresh would have
+    assert "1 removed" in market_snapshot.refresh_snapshot(path=store)[1]
+    assert list(market_snapshot.load_snapshot(path=store).index) == ["ABC-EQ"]
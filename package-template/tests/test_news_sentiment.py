@@ -0,0 +1,44 @@
+from util.news_sentiment import get_news_sentiment, get_sentiments, load_news_cache, score_headline
+
+
+def test_score_headline_matches_keywords_once_per_polarity():
+    assert score_headline("Record profit and strong growth") == 1
+    assert score_headline("Regulator opens fraud investigation") == -1
+    assert score_headline("Profit growth offsets decline in exports") == 0
+    assert score_headline("Company holds annual meeting") == 0
+
+
+def test_get_news_sentiment():
+    assert get_news_sentiment(["Shares surge after upgrade", "Quarterly loss narrows"]) == "Neutral"
+    assert get_news_sentiment(["Analysts downgrade stock"]) == "Negative"
+
+
+def test_get_sentiments_caches_and_deduplicates(tmp_path):
+    path = str(tmp_path / "news.json")
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        return [
+            {"uuid": "1", "title": "Record profit", "link": "https://x/1"},
+            {"uuid": "1", "title": "Record profit", "link": "https://x/1"},
+            {"id": "2", "content": {"title": "Lawsuit filed", "canonicalUrl": {"url": "https://x/2"}}},
+            {"id": "3", "content": {"title": "Strong orders"}},
+        ]
+
+    now = 1_700_000_000
+    assert get_sentiments(["AAA"], fetch, path=path, now=now) == {"AAA": "Positive"}
+    assert get_sentiments(["AAA"], fetch, path=path, now=now + 3600) == {"AAA": "Positive"}
+    assert calls == ["AAA"]
+
+    # After the TTL the symbol is fetched again, but already-seen headlines are not duplicated.
+    get_sentiments(["AAA"], fetch, path=path, now=now + 2 * 86400)
+    assert calls == ["AAA", "AAA"]
+    assert [i["id"] for i in load_news_cache(path)["AAA"]["items"]] == ["1", "2", "3"]
+
+
+def test_get_sentiments_marks_failed_fetch_unknown(tmp_path):
+    def fetch(symbol):
+        raise ConnectionError("offline")
+
+    assert get_sentiments(["BBB"], fetch, path=str(tmp_path / "news.json")) == {"BBB": "Unknown"}
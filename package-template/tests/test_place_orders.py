@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+import pytest
+from werkzeug.serving import make_server
+from util import mock_broker, place_orders
+
+
+@pytest.fixture
+def broker():
+    server = make_server("127.0.0.1", 0, mock_broker.create_app(latency_ms=20, reject_instruments=["3"]), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+@pytest.fixture
+def report(tmp_path):
+    path = tmp_path / "atr.json"
+    path.write_text(json.dumps([
+        {"nseTradingSymbol": "AAA-EQ", "nseInstrumentId": "1", "totalQuantity": 10, "product": "DELIVERY", "action": "SELL"},
+        {"nseTradingSymbol": "BBB-EQ", "nseInstrumentId": "2", "totalQuantity": 5, "action": "SELL"},
+        {"nseTradingSymbol": "CCC-EQ", "nseInstrumentId": "3", "totalQuantity": 7, "action": "SELL"},
+        {"nseTradingSymbol": "DDD-EQ", "nseInstrumentId": "4", "totalQuantity": 9, "action": "HOLD"},
+    ]))
+    return str(path)
+
+
+def test_orders_are_built_once_per_signal():
+    holding = {"nseTradingSymbol": "AAA-EQ", "nseInstrumentId": "1", "totalQuantity": 10, "action": "SELL"}
+    first, = place_orders.build_sell_orders([holding])
+    assert first["payload"]["transactionType"] == "SELL" and first["payload"]["quantity"] == "10"
+    assert first["payload"]["orderTag"] == first["key"]
+    assert place_orders.build_sell_orders([holding])[0]["key"] == first["key"]
+    assert place_orders.build_sell_orders([{**holding, "totalQuantity": 4}])[0]["key"] != first["key"]
+
+
+def test_dry_run_sends_nothing(report, broker, tmp_path):
+    ok, msg = place_orders.place_sell_orders(report_path=report, base_url=broker, token="t", journal_path=str(tmp_path / "j.json"))
+    assert ok and "3 SELL order(s) built, none sent" in msg
+    assert not (tmp_path / "j.json").exists()
+
+
+def test_live_batch_is_acknowledged_and_not_resent(report, broker, tmp_path):
+    journal_path = str(tmp_path / "journal.json")
+    place = lambda: place_orders.place_sell_orders(dry_run=False, report_path=report, base_url=broker, token="t",
+                                                   journal_path=journal_path)
+    ok, msg = place()
+    assert not ok and "2 acknowledged, 1 rejected" in msg
+    journal = place_orders.OrderJournal(journal_path).entries
+    states = {e["symbol"]: e["state"] for e in journal.values()}
+    assert states == {"AAA-EQ": "acknowledged", "BBB-EQ": "acknowledged", "CCC-EQ": "rejected"}
+    acked = next(e for e in journal.values() if e["symbol"] == "AAA-EQ")
+    assert acked["broker_order_id"].startswith("MOCK") and acked["round_trip_ms"] >= 20
+    assert "signal_to_ack_ms" in acked
+
+    # A rerun only retries the rejected order; acknowledged ones are not sent again.
+    ok, msg = place()
+    assert "2 duplicate, 1 rejected" in msg
+    book = place_orders.requests.get(f"{broker}/orders").json()["result"]
+    assert sorted(o["instrumentId"] for o in book) == ["1", "2"]
+    retried = next(e for e in place_orders.OrderJournal(journal_path).entries.values() if e["symbol"] == "CCC-EQ")
+    assert retried["attempts"] == 2
+
+
+def test_report_rebuilt_next_day_does_not_resell(report, broker, tmp_path):
+    journal_path = str(tmp_path / "journal.json")
+    place = lambda: place_orders.place_sell_orders(dry_run=False, report_path=report, base_url=broker, token="t",
+                                                   journal_path=journal_path)
+    place()
+    # The report is regenerated the next day while the sold positions have not settled out of the holdings.
+    tomorrow = os.path.getmtime(report) + 86400
+    os.utime(report, (tomorrow, tomorrow))
+    ok, msg = place()
+    assert "2 duplicate, 1 rejected" in msg
+    book = place_orders.requests.get(f"{broker}/orders").json()["result"]
+    assert sorted(o["instrumentId"] for o in book) == ["1", "2"]
+
+    # Once the sale is past the settlement window, a SELL signal for the same position is a new order.
+    journal = place_orders.OrderJournal(journal_path)
+    order, = place_orders.build_sell_orders([{"nseTradingSymbol": "AAA-EQ", "nseInstrumentId": "1", "totalQuantity": 10,
+                                              "action": "SELL"}], date(2099, 1, 1))
+    assert not journal.claim(order)
+    for entry in journal.entries.values():
+        entry["acknowledged_at"] = "2000-01-01T00:00:00.000"
+    assert journal.claim(order)
+
+
+def test_live_orders_refuse_a_report_older_than_the_last_session(report, broker, tmp_path):
+    last_week = time.time() - 7 * 86400
+    os.utime(report, (last_week, last_week))
+    kwargs = dict(dry_run=False, report_path=report, base_url=broker, token="t", journal_path=str(tmp_path / "journal.json"))
+    ok, msg = place_orders.place_sell_orders(**kwargs)
+    assert not ok and "predates" in msg
+    assert place_orders.requests.get(f"{broker}/orders").json()["result"] == []
+
+    ok, msg = place_orders.place_sell_orders(allow_stale=True, **kwargs)
+    assert "2 acknowledged" in msg
@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+from util import candle_store, correlation
+from util import Portfolio_allocation_check as allocation
+
+
+@pytest.fixture
+def positions():
+    return pd.DataFrame({
+        "name": ["OLD", "NEW", "NOCANDLES"],
+        "quantity": [10, 5, 2],
+        "previousDayClose": [0, 0, 50.0],
+        "sector": ["Energy", "Energy", "IT"],
+    }, index=["OLD-EQ", "NEW-EQ", "NOCANDLES-EQ"])
+
+
+def test_history_uses_current_quantities_and_keeps_dates_before_a_recent_listing(positions):
+    dates = pd.date_range("2024-01-01", periods=4)
+    close = pd.DataFrame({"OLD-EQ": [10.0, 10.0, None, 20.0], "NEW-EQ": [None, None, 40.0, 40.0]}, index=dates)
+    values, stock_weights, sector_weights = allocation.allocation_history(positions, close)
+
+    assert list(values.index) == list(dates)
+    # Day 1: OLD 100 and NOCANDLES 100 (valued at previousDayClose); NEW is not listed yet.
+    assert stock_weights.loc[dates[0]].tolist() == [0.5, 0.0, 0.5]
+    # Day 3: OLD's missing close is carried forward; NEW 200 joins.
+    assert values.loc[dates[2]].tolist() == [100.0, 200.0, 100.0]
+    assert stock_weights.loc[dates[3], "OLD-EQ"] == pytest.approx(200 / 500)
+    assert sector_weights.loc[dates[3], "Energy"] == pytest.approx(400 / 500)
+
+
+def test_check_allocation_labels_the_history(tmp_path, monkeypatch):
+    holdings = tmp_path / "holding.json"
+    holdings.write_text(json.dumps({"result": [
+        {"nseTradingSymbol": "AAA-EQ", "totalQuantity": 10, "previousDayClose": 100.0},
+        {"nseTradingSymbol": "BBB-EQ", "totalQuantity": 1, "previousDayClose": 100.0},
+    ]}))
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    monkeypatch.setattr(allocation, "HOLDING_PATH", str(holdings))
+    monkeypatch.setattr(allocation, "OUTPUT_PATH", str(tmp_path / "allocation.json"))
+    monkeypatch.setattr(allocation, "load_fundamentals", lambda: {"AAA.NS": {"sector": "Energy"}})
+    monkeypatch.setattr(correlation, "load_correlations", lambda path=None: None)
+    candle_store.save_candles("AAA-EQ", {"result": [{"candles": [[1704067200000, 1, 1, 1, 90.0, 1], [1704153600000, 1, 1, 1, 100.0, 1]]}]})
+
+    report = allocation.check_allocation()
+    assert "history" not in report
+    history = report["current_weights_history"]
+    assert history["dates"] == ["2024-01-01", "2024-01-02"]
+    assert history["holdings_priced"] == [2, 2]
+    assert history["portfolio_value"] == [1000.0, 1100.0]
+    assert [s["symbol"] for s in report["stocks"] if s["overexposed"]] == ["AAA-EQ"]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from util.portfolio_backtest import run_backtest, summarize
+
+
+def _panel(closes):
+    close = pd.DataFrame(closes, index=pd.bdate_range("2022-01-03", periods=len(next(iter(closes.values())))))
+    return {"open": close, "high": close * 1.01, "low": close * 0.99, "close": close}
+
+
+def test_trend_is_bought_and_stopped_out_after_reversal():
+    n = 300
+    up = np.concatenate([np.linspace(100, 200, 260), np.linspace(200, 150, n - 260)])
+    down = np.linspace(200, 100, n)
+    panel = _panel({"UP-EQ": up, "DOWN-EQ": down})
+
+    trades, equity = run_backtest(panel, {}, capital=100_000, max_positions=2)
+
+    assert {t["Symbol"] for t in trades} == {"UP"}
+    assert all(t["Exit Reason"] == "ATR stop hit" for t in trades)
+    assert trades[0]["Entry Date"] > panel["close"].index[199].strftime("%Y-%m-%d")
+    assert equity.iloc[0] == 100_000
+    assert summarize(trades, equity, 100_000)["trades"] == len(trades)
+
+
+def test_sector_cap_and_capital_limit_entries():
+    n = 260
+    trend = np.linspace(100, 200, n)
+    panel = _panel({"A-EQ": trend, "B-EQ": trend, "C-EQ": trend})
+    sectors = {"A-EQ": "Banks", "B-EQ": "Banks", "C-EQ": "IT"}
+
+    trades, equity = run_backtest(panel, sectors, capital=10_000, max_positions=3, max_per_sector=1, cost_bps=0)
+
+    assert sorted(t["Symbol"] for t in trades) == ["A", "C"]
+    assert all(t["Quantity"] * t["Entry Price"] <= 10_000 / 3 for t in trades)
+    assert (equity > 0).all()
@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from util import candle_store, portfolio_risk
+from util.portfolio_risk import compute_risk, shrinkage_covariance
+
+
+def test_shrinkage_covariance_is_between_sample_and_target():
+    returns = np.random.default_rng(0).normal(0, 0.01, size=(60, 5))
+    cov, shrinkage = shrinkage_covariance(returns)
+    assert 0 <= shrinkage <= 1
+    assert np.allclose(cov, cov.T)
+    assert np.all(np.linalg.eigvalsh(cov) > 0)
+
+
+def test_compute_risk_contributions_and_beta():
+    rng = np.random.default_rng(1)
+    market = rng.normal(0, 0.01, 500)
+    index = pd.date_range("2022-01-03", periods=500, freq="B")
+    returns = pd.DataFrame(
+        {"A": 1.5 * market + rng.normal(0, 0.002, 500), "B": 0.5 * market + rng.normal(0, 0.002, 500)},
+        index=index,
+    )
+    risk = compute_risk(returns, pd.Series({"A": 0.5, "B": 0.5}), pd.Series(market, index=index))
+
+    contributions = [h["risk_contribution_pct"] for h in risk["holdings"]]
+    assert abs(sum(contributions) - 1) < 1e-3
+    assert abs(risk["holdings"][0]["beta"] - 1.5) < 0.1
+    assert abs(risk["portfolio_beta"] - 1.0) < 0.1
+    var95 = risk["var"]["95"]
+    assert 0 < var95["historical_var"] <= var95["historical_cvar"]
+
+
+class _FakeTicker:
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, start, auto_adjust):
+        index = pd.date_range("2024-01-01", periods=3, tz="Asia/Kolkata")
+        return pd.DataFrame({"Open": [1.0, 2.0, 3.0], "High": [2.0, 3.0, 4.0], "Low": [0.5, 1.5, 2.5],
+                             "Close": [1.5, 2.5, 3.5], "Volume": [0, 0, 0]}, index=index)
+
+
+def test_fetch_benchmark_caches_candles_for_beta(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    monkeypatch.setattr(portfolio_risk, "yf", SimpleNamespace(Ticker=_FakeTicker))
+    success, message = portfolio_risk.fetch_benchmark()
+    assert success, message
+    candles = candle_store.load_candles(portfolio_risk.BENCHMARK_SYMBOL)
+    assert candles["close"].tolist() == [1.5, 2.5, 3.5]
+    assert str(candles.index[0].date()) == "2024-01-01"
+    assert "already fetched today" in portfolio_risk.fetch_benchmark()[1]
+
+
+def test_risk_without_overlapping_returns_is_an_empty_summary(tmp_path, monkeypatch):
+    holdings = tmp_path / "holding.json"
+    holdings.write_text(json.dumps({"result": [{"nseTradingSymbol": "AAA-EQ", "totalQuantity": 1},
+                                               {"nseTradingSymbol": "BBB-EQ", "totalQuantity": 1}]}))
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    monkeypatch.setattr(portfolio_risk, "HOLDING_PATH", str(holdings))
+    monkeypatch.setattr(portfolio_risk, "RISK_PATH", str(tmp_path / "risk.json"))
+    day = 86400000
+    candle_store.save_candles("AAA-EQ", {"result": [{"candles": [[1704067200000 + i * day, 1, 1, 1, 100.0 + i, 1] for i in range(3)]}]})
+    candle_store.save_candles("BBB-EQ", {"result": [{"candles": [[1704067200000 + (i + 5) * day, 1, 1, 1, 50.0 + i, 1] for i in range(3)]}]})
+
+    risk = portfolio_risk.get_portfolio_risk()
+    assert risk["observations"] == 0
+    assert "error" in risk
@@ -0,0 +1,65 @@
+import threading
+import pytest
+from util import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "ENABLED", False)
+    return tmp_path
+
+
+def test_disabled_profiling_is_a_no_op(profile_dir):
+    calls = []
+
+    @profiling.profile_stage("stage")
+    def stage(x):
+        calls.append(x)
+        return x * 2
+
+    with profiling.profiled("block") as session:
+        assert session is None
+    assert stage(21) == 42 and calls == [21]
+    assert profiling.list_profiles() == []
+
+
+def test_nested_sessions_report_separately(profile_dir):
+    @profiling.profile_stage()
+    def inner_stage():
+        return sum(range(1000))
+
+    with profiling.profiled("outer", force=True) as outer:
+        assert profiling._stack == [outer]
+        inner_stage()
+        with profiling.profiled("inner") as inner:
+            assert profiling._stack == [outer, inner]
+        assert profiling._stack == [outer]
+
+    assert profiling._stack == [] and profiling._owner is None
+    names = sorted(p["name"] for p in profiling.list_profiles())
+    assert names == ["inner", "inner_stage", "outer"]
+    assert len(list(profile_dir.glob("*.prof"))) == 3
+
+
+def test_other_threads_run_unprofiled_while_one_owns_the_profiler(profile_dir):
+    seen = {}
+
+    def worker():
+        with profiling.profiled("forced", force=True) as session:
+            seen["forced"] = session
+        seen["nested"] = profiling.profiled("not_nested")
+
+    with profiling.profiled("owner", force=True):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert seen["forced"] is None
+    assert seen["nested"] is profiling._NOOP
+    assert [p["name"] for p in profiling.list_profiles()] == ["owner"]
+    # The profiler is free again, so another thread can now claim it.
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen["forced"] is not None
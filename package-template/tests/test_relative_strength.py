@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from util import candle_store, market_snapshot, relative_strength
+
+
+def _closes(n, daily_return):
+    return 100 * (1 + daily_return) ** np.arange(n)
+
+
+def test_composite_ranks_horizons_across_symbols():
+    returns = pd.DataFrame({"1m": [5.0, 1.0, 3.0], "3m": [10.0, 20.0, 30.0], "6m": [1.0, 2.0, None], "1y": [None] * 3},
+                           index=["AAA-EQ", "BBB-EQ", "CCC-EQ"])
+    scores = relative_strength.score_table(returns)
+    assert scores["rs_3m"].tolist() == pytest.approx([100 / 3, 200 / 3, 100])
+    # AAA: (0.1*100 + 0.4*33.3 + 0.3*50) / 0.8; CCC lacks 6m and 1y, covering only half the weight.
+    assert scores.at["AAA-EQ", "rs_score"] == pytest.approx((10 + 0.4 * 100 / 3 + 15) / 0.8)
+    assert scores.at["CCC-EQ", "rs_score"] == pytest.approx((0.1 * 200 / 3 + 40) / 0.5)
+    returns.loc["CCC-EQ", "1m"] = None
+    assert np.isnan(relative_strength.score_table(returns).at["CCC-EQ", "rs_score"])
+
+
+def test_panel_scores_match_latest_snapshot_scores(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    path = str(tmp_path / "snapshot.db")
+    for symbol, daily_return in (("SLOW-EQ", 0.0005), ("FAST-EQ", 0.002), ("FLAT-EQ", 0.0)):
+        closes = _closes(300, daily_return)
+        candles = [[1704067200000 + i * 86400000, c, c, c, c, 1000] for i, c in enumerate(closes)]
+        candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+    market_snapshot.refresh_snapshot(path=path)
+
+    latest = relative_strength.latest_scores(path)
+    assert latest["rs_score"].sort_values(ascending=False).index.tolist() == ["FAST-EQ", "SLOW-EQ", "FLAT-EQ"]
+    assert relative_strength.latest_scores(path) is latest
+
+    panel = relative_strength.score_panel(candle_store.load_panel(fields=("close",))["close"])
+    assert panel.iloc[-1].to_dict() == pytest.approx(latest["rs_score"].to_dict())
+    assert panel.iloc[:21].isna().all().all()
+
+    table = relative_strength.with_scores(market_snapshot.load_snapshot(["FAST-EQ"], path=path), path)
+    assert table.at["FAST-EQ", "rs_score"] == 100
+
+
+def test_panel_returns_use_each_symbols_own_candles():
+    dates = pd.bdate_range("2024-01-01", periods=300)
+    close = pd.DataFrame({"AAA-EQ": _closes(300, 0.001), "BBB-EQ": _closes(300, 0.002)}, index=dates)
+    # BBB misses every other day of the last month: its 1m return still spans 21 of its own candles.
+    close.iloc[-42::2, 1] = np.nan
+    returns = relative_strength._horizon_returns(close, 21)
+    own = close["BBB-EQ"].dropna()
+    assert returns["BBB-EQ"].iloc[-1] == pytest.approx(own.iloc[-1] / own.iloc[-22] - 1)
+    assert np.isnan(returns["BBB-EQ"].iloc[-2])
+    assert returns["AAA-EQ"].iloc[-1] == pytest.approx(close["AAA-EQ"].iloc[-1] / close["AAA-EQ"].iloc[-22] - 1)
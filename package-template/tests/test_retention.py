@@ -0,0 +1,32 @@
+import json
+import os
+from util.retention import enforce_retention, plan_eviction
+
+
+def test_plan_eviction_age_then_lru():
+    now = 1_000_000
+    artifacts = [("old", 10, now - 40 * 86400), ("a", 50, now - 3), ("b", 50, now - 2), ("c", 50, now - 1)]
+    evicted = [path for path, _, _ in plan_eviction(artifacts, max_age_days=30, max_bytes=100, now=now)]
+    assert evicted == ["old", "a"]
+
+
+def test_plan_eviction_skips_protected():
+    now = 1_000_000
+    artifacts = [("held", 80, now - 40 * 86400), ("other", 80, now - 1)]
+    evicted = plan_eviction(artifacts, max_age_days=30, max_bytes=100, protected={"held"}, now=now)
+    assert [path for path, _, _ in evicted] == ["other"]
+
+
+def test_enforce_retention_keeps_held_candles(tmp_path):
+    files = tmp_path / "files"
+    files.mkdir()
+    (files / "holding.json").write_text(json.dumps({"result": [{"nseTradingSymbol": "HELD-EQ"}]}))
+    for name in ("HELD-EQ_candles.json", "GONE-EQ_candles.json"):
+        (files / name).write_text("{}")
+        os.utime(files / name, (0, 0))
+    policies = [{"name": "candles", "patterns": ["files/*_candles.json"], "max_age_days": 30, "max_bytes": None}]
+
+    success, _ = enforce_retention(policies, root=str(tmp_path))
+
+    assert success
+    assert sorted(os.listdir(files)) == ["HELD-EQ_candles.json", "holding.json"]
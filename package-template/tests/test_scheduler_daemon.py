@@ -0,0 +1,42 @@
+from datetime import date, datetime
+from util.scheduler_daemon import IST, is_last_trading_day_of_week, next_due, next_run
+
+DAILY = {"name": "post_close", "at": "15:45", "stages": [], "weekly": False}
+WEEKLY = {"name": "backtest", "at": "19:00", "stages": [], "weekly": True}
+
+
+def test_next_run_today_tomorrow_and_over_weekends_and_holidays():
+    # 2024-03-07 is a Thursday; 2024-03-08 (Mahashivratri) is an NSE holiday.
+    holidays = {date(2024, 3, 8)}
+    assert next_run(DAILY, datetime(2024, 3, 7, 9, 0, tzinfo=IST), holidays) == datetime(2024, 3, 7, 15, 45, tzinfo=IST)
+    assert next_run(DAILY, datetime(2024, 3, 7, 15, 45, tzinfo=IST), holidays) == datetime(2024, 3, 7, 15, 45, tzinfo=IST)
+    assert next_run(DAILY, datetime(2024, 3, 7, 16, 0, tzinfo=IST), holidays) == datetime(2024, 3, 11, 15, 45, tzinfo=IST)
+    assert next_run(DAILY, datetime(2024, 3, 7, 16, 0, tzinfo=IST), set()) == datetime(2024, 3, 8, 15, 45, tzinfo=IST)
+
+
+def test_last_trading_day_of_week_moves_back_for_a_friday_holiday():
+    assert is_last_trading_day_of_week(date(2024, 3, 1), set())          # An ordinary Friday
+    assert not is_last_trading_day_of_week(date(2024, 2, 29), set())
+    holidays = {date(2024, 3, 8)}
+    assert is_last_trading_day_of_week(date(2024, 3, 7), holidays)       # Thursday before a Friday holiday
+    # Good Friday 2024-03-29 and the Monday after are both holidays: the next session is a week later.
+    assert is_last_trading_day_of_week(date(2024, 3, 28), {date(2024, 3, 29), date(2024, 4, 1)})
+    assert next_run(WEEKLY, datetime(2024, 3, 4, 9, 0, tzinfo=IST), holidays) == datetime(2024, 3, 7, 19, 0, tzinfo=IST)
+
+
+def test_jobs_recorded_as_run_today_wait_for_the_next_trading_day():
+    now = datetime(2024, 3, 7, 20, 0, tzinfo=IST)
+    jobs = [DAILY, {"name": "screening", "at": "18:00", "stages": [], "weekly": False}]
+
+    # Neither ran today: the earliest missed job is due immediately.
+    run_at, job = next_due(now, {}, set(), jobs)
+    assert job["name"] == "post_close" and run_at == datetime(2024, 3, 7, 15, 45, tzinfo=IST)
+
+    run_at, job = next_due(now, {"post_close": "2024-03-07"}, set(), jobs)
+    assert job["name"] == "screening" and run_at <= now
+
+    # Both ran: nothing is due until the next trading day, a stale record from yesterday is ignored.
+    run_at, job = next_due(now, {"post_close": "2024-03-07", "screening": "2024-03-07"}, {date(2024, 3, 8)}, jobs)
+    assert job["name"] == "post_close" and run_at == datetime(2024, 3, 11, 15, 45, tzinfo=IST)
+    run_at, _ = next_due(now, {"post_close": "2024-03-06", "screening": "2024-03-07"}, set(), jobs)
+    assert run_at == datetime(2024, 3, 7, 15, 45, tzinfo=IST)
@@ -0,0 +1,65 @@
+import json
+
+import pandas as pd
+import pytest
+from util.screening_rules import RuleError, compile_rule, evaluate, failed_clauses
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame(
+        {
+            "roe": [0.20, 0.05, 0.15, ""],
+            "debtToEquity": [0.5, 0.3, 0.9, 0.1],
+            "close": [110.0, 95.0, 120.0, 50.0],
+            "sma200": [100.0, 100.0, 100.0, None],
+        },
+        index=["AAA", "BBB", "CCC", "DDD"],
+    )
+
+
+def test_clause_masks_and_passed(table):
+    result = compile_rule("roe > 0.12 and debtToEquity < 0.7 and close > sma200").evaluate(table)
+    assert list(result.columns) == ["roe > 0.12", "debtToEquity < 0.7", "close > sma200", "passed"]
+    assert result["passed"].tolist() == [True, False, False, False]
+    assert result["roe > 0.12"].tolist() == [True, False, True, False]
+
+
+def test_missing_values_and_columns_fail(table):
+    result = compile_rule("close >= 0.9 * sma200 and pe < 25").evaluate(table)
+    assert not result["passed"].any()
+    assert failed_clauses(result)["DDD"] == ["close >= 0.9 * sma200", "pe < 25"]
+
+
+def test_not_applies_to_masks_and_numeric_columns(table):
+    table["pledged"] = [0.0, 12.5, 0.0, 3.0]
+    assert compile_rule("not pledged").evaluate(table)["passed"].tolist() == [True, False, True, False]
+    assert compile_rule("not close > sma200").evaluate(table)["passed"].tolist() == [False, True, False, True]
+
+
+def test_unsupported_syntax_is_rejected():
+    with pytest.raises(RuleError):
+        compile_rule("__import__('os').system('ls')")
+
+
+def test_non_numeric_values_fail_their_clause(table):
+    table["roe"] = [0.20, "N/A", 0.15, None]
+    result = compile_rule("roe > 0.12").evaluate(table)
+    assert result["passed"].tolist() == [True, False, True, False]
+
+
+def test_text_columns_compare_with_strings():
+    table = pd.DataFrame({"sector": ["Energy", "Financial Services"]}, index=["AAA", "BBB"])
+    assert compile_rule("sector == 'Energy'").evaluate(table)["passed"].tolist() == [True, False]
+
+
+def test_defaults_fill_missing_fundamentals(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"fundamentals": {
+        "rule": "returnOnEquity >= 0.10 and debtToEquity <= 1.0",
+        "defaults": {"returnOnEquity": 0, "debtToEquity": 1},
+    }}))
+    # A bank reports no debtToEquity at all; only a missing return on equity should fail.
+    table = pd.DataFrame({"returnOnEquity": [0.15, None], "debtToEquity": [None, 0.5]}, index=["HDFCBANK", "XYZ"])
+    assert evaluate("fundamentals", table, str(rules))["passed"].tolist() == [True, False]
+    assert evaluate("fundamentals", table[["returnOnEquity"]], str(rules))["passed"].tolist() == [True, False]
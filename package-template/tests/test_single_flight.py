@@ -0,0 +1,65 @@
+import threading
+import time
+from util.single_flight import SingleFlight, coalesce
+
+
+def _run_concurrently(group, key, fn, n):
+    results = [None] * n
+    def worker(i):
+        try:
+            results[i] = group.do(key, fn)
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    # Wait until one caller is running fn and the others are queued behind it.
+    deadline = time.time() + 5
+    while time.time() < deadline and not (key in group._calls and group._calls[key].waiters == n - 1):
+        time.sleep(0.001)
+    return threads, results
+
+
+def test_concurrent_calls_share_one_run():
+    group = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "done"
+
+    threads, results = _run_concurrently(group, "k", slow, 5)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"done"}
+
+    # Nothing is cached once the call has finished.
+    assert group.do("k", lambda: "again") == ("again", False)
+
+
+def test_errors_reach_every_waiter():
+    group = SingleFlight("test")
+    release = threading.Event()
+    def failing():
+        release.wait(5)
+        raise RuntimeError("api down")
+
+    threads, results = _run_concurrently(group, "k", failing, 3)
+    release.set()
+    for t in threads:
+        t.join()
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not group.in_flight("k")
+
+
+def test_coalesce_keys_by_arguments():
+    group = SingleFlight("test")
+    @coalesce(group)
+    def double(x):
+        assert group.in_flight(("double", (x,), ()))
+        return 2 * x
+    assert double(3) == 6
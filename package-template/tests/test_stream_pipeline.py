@@ -0,0 +1,130 @@
+import json
+from datetime import date
+import pytest
+from util import candle_store, circuit_breaker, stream_pipeline
+from util.calculate_atr import ATR_MULTIPLIER
+from util.stream_pipeline import JsonArrayWriter, run_streaming_pipeline, summarize_holding
+
+
+def _candles(n, start=100.0):
+    return [[i, start + i, start + i + 2, start + i - 2, start + i + 1, 1000] for i in range(n)]
+
+
+def test_summarize_holding_matches_batch_rules():
+    holding = {"nseTradingSymbol": "ABC-EQ", "averageTradedPrice": 50.0, "historical_data": [1, 2], "first_seen": "2020-01-02"}
+    record = summarize_holding(holding, _candles(30))
+    assert "historical_data" not in record
+    assert record["last_close"] == 130.0
+    assert record["highest_price_in_period"] == 131.0
+    assert record["atr_value"] == pytest.approx(4.0)
+    assert record["trailing_stop_loss"] == pytest.approx(131.0 - 4.0 * ATR_MULTIPLIER)
+    assert record["action"] == "HOLD"
+    assert record["percentage_changes"]["1w"] == pytest.approx(round((130 - 125) / 125 * 100, 2))
+    # Bought today: only today's candle counts, not the highs before the purchase.
+    holding["first_seen"] = date.today().isoformat()
+    assert summarize_holding(holding, _candles(30))["running_high"] == 131.0
+    assert summarize_holding(holding, _candles(30)[:-1])["running_high"] == 130.0
+
+
+def test_json_array_writer_only_replaces_on_success(tmp_path):
+    path = str(tmp_path / "out.json")
+    with JsonArrayWriter(path) as writer:
+        writer.write({"a": 1})
+        writer.write({"a": 2})
+    assert json.load(open(path)) == [{"a": 1}, {"a": 2}]
+
+    with pytest.raises(RuntimeError):
+        with JsonArrayWriter(path) as writer:
+            writer.write({"a": 3})
+            raise RuntimeError("boom")
+    assert json.load(open(path)) == [{"a": 1}, {"a": 2}]
+    assert not (tmp_path / "out.json.tmp").exists()
+
+
+def test_run_streaming_pipeline_writes_one_entry_per_holding(tmp_path, monkeypatch):
+    holdings = tmp_path / "holding.json"
+    holdings.write_text(json.dumps({"result": [
+        {"nseTradingSymbol": "ABC-EQ", "averageTradedPrice": 100.0},
+        {"nseTradingSymbol": "MISSING-EQ", "averageTradedPrice": 10.0, "previousDayClose": 9.0},
+    ]}))
+    monkeypatch.setattr(stream_pipeline, "get_instrument_id_map", lambda: {"ABC-EQ": 1})
+    output = str(tmp_path / "atr.json")
+
+    ok, _ = run_streaming_pipeline(fetch=lambda s, i: _candles(20), holdings_path=str(holdings),
+                                   output_path=output, reuse_today=False, history_dir=str(tmp_path / "history"),
+                                   memo_path=str(tmp_path / "memo.json"))
+
+    report = json.load(open(output))
+    assert ok
+    assert [r["nseTradingSymbol"] for r in report] == ["ABC-EQ", "MISSING-EQ"]
+    assert report[1]["last_close"] == 9.0 and report[1]["action"] == "HOLD"
+
+
+def test_bad_candles_are_skipped_and_a_failing_holding_does_not_abort_the_run(tmp_path, monkeypatch):
+    candles = _candles(20)
+    candles[5][2] = None
+    candles[6][4] = "n/a"
+    record = summarize_holding({"nseTradingSymbol": "ABC-EQ", "averageTradedPrice": 50.0}, candles)
+    assert record["atr_value"] == pytest.approx(4.0) and record["action"] == "HOLD"
+
+    holdings = tmp_path / "holding.json"
+    holdings.write_text(json.dumps({"result": [
+        {"nseTradingSymbol": "BAD-EQ", "averageTradedPrice": "not a price"},
+        {"nseTradingSymbol": "ABC-EQ", "averageTradedPrice": 100.0},
+    ]}))
+    monkeypatch.setattr(stream_pipeline, "get_instrument_id_map", lambda: {"ABC-EQ": 1, "BAD-EQ": 2})
+    output = str(tmp_path / "atr.json")
+    ok, message = run_streaming_pipeline(fetch=lambda s, i: candles, holdings_path=str(holdings), output_path=output,
+                                         reuse_today=False, history_dir=str(tmp_path / "history"),
+                                         memo_path=str(tmp_path / "memo.json"))
+    report = json.load(open(output))
+    assert ok and "1 failed" in message
+    assert report[0]["action"] == "HOLD" and "error" in report[0]
+    assert report[1]["atr_value"] == pytest.approx(4.0)
+
+
+def test_unchanged_holdings_reuse_the_atr_memo(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    candle_store.save_candles("ABC-EQ", {"result": [{"candles": _candles(20)}]})
+    holdings = tmp_path / "holding.json"
+    holding = {"nseTradingSymbol": "ABC-EQ", "averageTradedPrice": 100.0, "first_seen": "2024-01-02"}
+    holdings.write_text(json.dumps({"result": [holding]}))
+    monkeypatch.setattr(stream_pipeline, "get_instrument_id_map", lambda: {"ABC-EQ": 1})
+    kwargs = dict(fetch=lambda s, i: pytest.fail("today's candle cache was refetched"), holdings_path=str(holdings),
+                  output_path=str(tmp_path / "atr.json"), history_dir=str(tmp_path / "history"),
+                  memo_path=str(tmp_path / "memo.json"))
+
+    assert "0 unchanged" in run_streaming_pipeline(**kwargs)[1]
+    first = json.load(open(tmp_path / "atr.json"))
+    with monkeypatch.context() as m:
+        m.setattr(stream_pipeline, "candle_atr", lambda candles: pytest.fail("memo hit recomputed the ATR"))
+        assert "1 unchanged" in run_streaming_pipeline(**kwargs)[1]
+    assert json.load(open(tmp_path / "atr.json")) == first
+
+    # Closed and re-bought at the same price and quantity: a new position, so a new running high.
+    holdings.write_text(json.dumps({"result": [dict(holding, first_seen="2024-01-20")]}))
+    assert "0 unchanged" in run_streaming_pipeline(**kwargs)[1]
+
+
+def test_failed_fetches_open_the_breaker_and_keep_the_previous_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    holdings = tmp_path / "holding.json"
+    holdings.write_text(json.dumps({"result": [{"nseTradingSymbol": f"S{i}-EQ", "averageTradedPrice": 100.0} for i in range(5)]}))
+    monkeypatch.setattr(stream_pipeline, "get_instrument_id_map", lambda: {f"S{i}-EQ": i + 1 for i in range(5)})
+    output = tmp_path / "atr.json"
+    output.write_text(json.dumps([{"nseTradingSymbol": "S0-EQ", "atr_value": 4.0, "action": "HOLD"}]))
+    calls = []
+
+    def down(symbol, instrument_id):
+        calls.append(symbol)
+        raise ConnectionError("endpoint down")
+
+    ok, message = run_streaming_pipeline(fetch=down, holdings_path=str(holdings), output_path=str(output), reuse_today=False,
+                                         history_dir=str(tmp_path / "history"), memo_path=str(tmp_path / "memo.json"))
+    assert not ok and "5/5" in message
+    assert json.load(open(output)) == [{"nseTradingSymbol": "S0-EQ", "atr_value": 4.0, "action": "HOLD"}]
+    assert len(json.load(open(str(output) + ".tmp"))) == 5
+    # The breaker opened after FAILURE_THRESHOLD failures; the rest were not requested.
+    assert len(calls) == circuit_breaker.FAILURE_THRESHOLD
+    assert circuit_breaker.breaker(circuit_breaker.IIFL_HISTORICAL_DATA).state == "open"
+    assert not (tmp_path / "history").exists() and not (tmp_path / "memo.json").exists()
@@ -0,0 +1,11 @@
+from datetime import date, datetime
+from util.trading_calendar import IST, last_session_close
+
+
+def test_last_session_close_skips_open_sessions_weekends_and_holidays():
+    holidays = {date(2024, 3, 8)}   # Friday
+    # Thursday during the session: Wednesday's close.
+    assert last_session_close(datetime(2024, 3, 7, 11, 0, tzinfo=IST), holidays) == datetime(2024, 3, 6, 15, 30, tzinfo=IST)
+    assert last_session_close(datetime(2024, 3, 7, 15, 30, tzinfo=IST), holidays) == datetime(2024, 3, 7, 15, 30, tzinfo=IST)
+    # Monday morning after a holiday Friday: Thursday's close.
+    assert last_session_close(datetime(2024, 3, 11, 9, 0, tzinfo=IST), holidays) == datetime(2024, 3, 7, 15, 30, tzinfo=IST)
@@ -0,0 +1,71 @@
+import json
+from datetime import date
+
+from util.trailing_stop_monitor import TrailingStopMonitor, simulated_ticks
+
+
+def test_stop_trails_new_highs_and_sells_once():
+    events = []
+    monitor = TrailingStopMonitor(atr_multiplier=2, on_sell=events.append)
+    monitor.add_holding("AAA", purchase_price=100, atr=5)
+    assert monitor.states["AAA"].stop == 90
+
+    assert monitor.on_tick("AAA", 130) is None
+    assert monitor.states["AAA"].stop == 120
+    assert monitor.on_tick("AAA", 121) is None
+
+    event = monitor.on_tick("AAA", 119.5, timestamp="t1")
+    assert event["action"] == "SELL" and event["trailing_stop_loss"] == 120
+    assert monitor.on_tick("AAA", 110) is None
+    assert events == [event]
+
+
+def test_daily_bar_rolls_atr_window():
+    monitor = TrailingStopMonitor(atr_multiplier=1)
+    monitor.add_holding("BBB", purchase_price=10, atr=0)
+    for _ in range(14):
+        monitor.on_daily_bar("BBB", high=12, low=10, close=11)
+    assert monitor.states["BBB"].atr == 2
+    monitor.on_daily_bar("BBB", high=20, low=10, close=19)
+    assert abs(monitor.states["BBB"].atr - (13 * 2 + 10) / 14) < 1e-9
+    assert monitor.states["BBB"].stop == 20 - monitor.states["BBB"].atr
+
+
+def test_run_over_simulated_ticks():
+    monitor = TrailingStopMonitor()
+    for i in range(200):
+        monitor.add_holding(f"S{i}", purchase_price=100, atr=1)
+    events = monitor.run(simulated_ticks({f"S{i}": 100 for i in range(200)}, 20000, volatility=0.01, seed=7))
+    assert monitor.ticks == 20000
+    assert len({e["symbol"] for e in events}) == len(events)
+
+
+def test_underwater_holding_is_not_sold_at_cost_and_floor_arms_above_it():
+    monitor = TrailingStopMonitor(atr_multiplier=2)
+    monitor.add_holding("UND", purchase_price=100, atr=5)
+    state = monitor.states["UND"]
+    # Trading below cost but within 2 ATR of the high: no SELL on the first tick.
+    assert state.stop == 90 and not state.floor_armed
+    assert monitor.on_tick("UND", 95) is None
+
+    # A high of 110 puts the stop at cost; from then on a wider ATR cannot pull it below 100.
+    monitor.on_tick("UND", 110)
+    assert state.stop == 100 and state.floor_armed
+    for _ in range(14):
+        monitor.on_daily_bar("UND", high=110, low=94, close=100)
+    assert state.atr == 16 and state.stop == 100
+    assert monitor.on_tick("UND", 99.5)["trailing_stop_loss"] == 100
+
+
+def test_from_atr_report_seeds_from_high_since_purchase(tmp_path):
+    path = tmp_path / "atr.json"
+    candles = [{"high": 150.0}, {"high": 112.0}, {"high": 115.0}]
+    path.write_text(json.dumps([
+        {"nseTradingSymbol": "A-EQ", "purchase_price": 100.0, "atr_value": 2.0, "last_close": 110.0,
+         "highest_price_in_period": 150.0, "first_seen": date.today().isoformat(), "historical_data": candles},
+        {"nseTradingSymbol": "B-EQ", "purchase_price": 100.0, "atr_value": 2.0, "last_close": 110.0,
+         "highest_price_in_period": 150.0, "running_high": 120.0},
+    ]))
+    monitor = TrailingStopMonitor.from_atr_report(str(path))
+    assert monitor.states["A-EQ"].running_high == 115.0
+    assert monitor.states["B-EQ"].running_high == 120.0
@@ -0,0 +1,75 @@
+import json
+import os
+import pandas as pd
+import pytest
+from util import candle_store, fetch_candle_stick_data, instruments, universe_screener
+
+DAY_MS = 86400000
+
+
+def _write_candles(symbol, closes, step_days=1):
+    candles = [[1672531200000 + i * step_days * DAY_MS, c, c + 1, c - 1, c, 1000] for i, c in enumerate(closes)]
+    candle_store.save_candles(symbol, {"result": [{"candles": candles}]})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "CANDLE_DIR", str(tmp_path))
+    return str(tmp_path / "snapshot.db")
+
+
+def test_technical_table_averages_each_symbol_over_its_own_candles(store):
+    # DAILY trades every day, SPARSE every other day: on the union of their dates SPARSE would have
+    # gaps, but its 200DMA must still be the mean of its own last 200 closes.
+    _write_candles("DAILY-EQ", [100.0 + i for i in range(400)])
+    _write_candles("SPARSE-EQ", [50.0 + i for i in range(210)], step_days=2)
+    _write_candles("SHORT-EQ", [10.0] * 150)
+    table = universe_screener.technical_table(["DAILY-EQ", "SPARSE-EQ", "SHORT-EQ"], path=store)
+    assert table.at["SPARSE-EQ", "sma200"] == pytest.approx(sum(50.0 + i for i in range(10, 210)) / 200)
+    assert table.at["DAILY-EQ", "sma200"] == pytest.approx(sum(100.0 + i for i in range(200, 400)) / 200)
+    assert pd.isna(table.at["SHORT-EQ", "sma200"])
+    assert "rs_score" in table.columns
+
+
+def test_universe_screen_funnel(store, tmp_path, monkeypatch):
+    _write_candles("LEADER-EQ", [100.0 + i for i in range(260)])
+    _write_candles("LAGGARD-EQ", [400.0 - i for i in range(260)])
+    _write_candles("BANK-EQ", [200.0 + i for i in range(260)])
+    technical_table = universe_screener.technical_table
+    monkeypatch.setattr(instruments, "equity_universe", lambda: ["LEADER-EQ", "LAGGARD-EQ", "BANK-EQ", "NOCANDLES-EQ"])
+    monkeypatch.setattr(universe_screener, "technical_table", lambda symbols: technical_table(symbols, path=store))
+    monkeypatch.setattr(universe_screener, "fetch_fundamentals", lambda symbols: pd.DataFrame({
+        "sector": ["Energy", "Financial Services"], "earningsQuarterlyGrowth": [0.2, 0.1],
+        "revenueGrowth": [0.1, 0.08], "returnOnEquity": [0.2, 0.15], "debtToEquity": [0.4, None],
+    }, index=["LEADER-EQ", "BANK-EQ"]).loc[symbols])
+    monkeypatch.setattr(universe_screener, "news_sentiments", lambda symbols: {"LEADER-EQ": "Neutral", "BANK-EQ": "Negative"})
+    monkeypatch.setattr(universe_screener, "OUTPUT_FILE", str(tmp_path / "universe_buy.json"))
+
+    success, message = universe_screener.run_universe_screen()
+    assert success, message
+    with open(tmp_path / "universe_buy.json") as f:
+        result = json.load(f)
+    assert [(s["stage"], s["in"], s["out"]) for s in result["funnel"]] == [
+        ("cached_candles", 4, 3), ("technical_prefilter", 3, 2), ("fundamentals", 2, 2), ("news", 2, 1)]
+    assert [b["Symbol"] for b in result["buy_list"]] == ["LEADER"]
+
+
+def test_fetch_universe_candles_skips_caches_written_today(store, tmp_path, monkeypatch):
+    _write_candles("FRESH-EQ", [100.0] * 5)
+    _write_candles("OLD-EQ", [100.0] * 5)
+    old = candle_store.candle_path("OLD-EQ")
+    os.utime(old, (os.path.getmtime(old) - 3 * 86400,) * 2)
+    config, token = tmp_path / "config.json", tmp_path / "auth_token.txt"
+    config.write_text(json.dumps({"IIFL_BASE_URL": "https://example.invalid", "HISTORICAL_DATA_ENDPOINT": "/candles"}))
+    token.write_text("token")
+    monkeypatch.setattr(fetch_candle_stick_data, "CONFIG_PATH", str(config))
+    monkeypatch.setattr(fetch_candle_stick_data, "AUTH_TOKEN_PATH", str(token))
+    monkeypatch.setattr(fetch_candle_stick_data, "get_instrument_id_map", lambda: {"OLD-EQ": "1", "NEW-EQ": "2"})
+    monkeypatch.setattr(instruments, "equity_universe", lambda: ["FRESH-EQ", "OLD-EQ", "NEW-EQ", "UNKNOWN-EQ"])
+    fetched = []
+    monkeypatch.setattr(candle_store, "fetch_candles", lambda url, headers, symbol, instrument_id: fetched.append((url, symbol, instrument_id)))
+
+    success, message = universe_screener.fetch_universe_candles()
+    assert success, message
+    assert sorted(fetched) == [("https://example.invalid/candles", "NEW-EQ", "2"), ("https://example.invalid/candles", "OLD-EQ", "1")]
+    assert "2/3" in message
@@ -1,6 +1,14 @@
-import json
 import logging
 import os
+import pandas as pd
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/Portfolio_allocation_check.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import candle_store, correlation, json_store
+from util.fundamentals import load_fundamentals
 
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
@@ -17,39 +25,143 @@ logger = logging.getLogger(__name__)
 MAX_STOCK_WEIGHT = 0.10   # 10% max per stock
 MAX_SECTOR_WEIGHT = 0.25  # 25% max per sector
 
-# Load holdings (from atr.json or holding.json)
-with open("files/atr.json", "r") as f:
-    holdings = json.load(f)
-
-# Calculate position values and total portfolio value
-for h in holdings:
-    h["position_value"] = h["totalQuantity"] * h["previousDayClose"]
-total_value = sum(h["position_value"] for h in holdings)
-
-# Calculate weights
-for h in holdings:
-    h["weight"] = h["position_value"] / total_value if total_value else 0
-
-# Flag overexposed stocks
-logger.info("=== Overexposed Stocks (>{:.0f}% of portfolio) ===".format(MAX_STOCK_WEIGHT*100))
-for h in holdings:
-    if h["weight"] > MAX_STOCK_WEIGHT:
-        logger.info(f"{h['bseTradingSymbol']}: {h['weight']*100:.2f}%")
-
-# Aggregate by sector (if available)
-sector_map = {}
-for h in holdings:
-    sector = h.get("sector", "Unknown")
-    sector_map.setdefault(sector, 0)
-    sector_map[sector] += h["position_value"]
-
-logger.info("\n=== Overexposed Sectors (>{:.0f}% of portfolio) ===".format(MAX_SECTOR_WEIGHT*100))
-for sector, value in sector_map.items():
-    weight = value / total_value if total_value else 0
-    if weight > MAX_SECTOR_WEIGHT:
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json")
+OUTPUT_PATH = os.path.join(BASE_DIR, "..", "files", "allocation.json")
+
+def load_positions():
+    """
+    Returns one row per holding (indexed by NSE trading symbol) with quantity, last known close
+    and sector, the sector coming from the fundamentals output (files/fundamental_holdings.json).
+    """
+    holdings = json_store.read_json(HOLDING_PATH)["result"]
+    try:
+        fundamentals = load_fundamentals()
+    except FileNotFoundError:
+        logger.warning("Fundamentals file not found; all sectors will be 'Unknown'.")
+        fundamentals = {}
+
+    rows = {}
+    for h in holdings:
+        symbol = h.get("nseTradingSymbol") or h.get("bseTradingSymbol")
+        if not symbol:
+            continue
+        fund = fundamentals.get(symbol.replace("-EQ", "") + ".NS", {})
+        rows[symbol] = {
+            "name": h.get("bseTradingSymbol") or symbol,
+            "quantity": h.get("totalQuantity", 0),
+            "previousDayClose": h.get("previousDayClose", 0),
+            "sector": fund.get("sector") or "Unknown",
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+def allocation_history(positions, close):
+    """
+    Computes position values, stock weights and sector weights for every date of the close panel,
+    holding today's quantities fixed: how the current portfolio would have been weighted, not the
+    weights actually held then. Holdings without cached candles are valued at previousDayClose.
+    Each date is weighted over the holdings with a price on it, so a recent listing does not cut
+    the history short. Returns (values, stock_weights, sector_weights), each a DataFrame indexed by date.
+    """
+    if close.empty:
+        close = pd.DataFrame(index=[pd.Timestamp.now().normalize()])
+    prices = close.reindex(columns=positions.index).ffill()
+    missing = prices.columns[prices.isna().all()]
+    if len(missing):
+        logger.info(f"No cached candles for {list(missing)}; valuing them at previousDayClose.")
+    for symbol in missing:
+        prices[symbol] = positions.at[symbol, "previousDayClose"]
+    # Prices are carried forward over a symbol's missing sessions; before its first candle it has none.
+    prices = prices.dropna(how="all")
+
+    values = prices * positions["quantity"]
+    total = values.sum(axis=1, min_count=1)
+    stock_weights = values.div(total.where(total != 0), axis=0).fillna(0)
+    sector_weights = stock_weights.T.groupby(positions["sector"]).sum().T
+    return values, stock_weights, sector_weights
+
+def _breach_periods(weights, limit):
+    """Summarizes, per column, how many days the weight exceeded the limit and when."""
+    breaches = weights > limit
+    summary = {}
+    for column in breaches.columns[breaches.any()]:
+        dates = breaches.index[breaches[column]]
+        summary[column] = {
+            "days": int(len(dates)),
+            "first": dates[0].strftime("%Y-%m-%d"),
+            "last": dates[-1].strftime("%Y-%m-%d"),
+            "max_weight": round(float(weights[column].max()), 4),
+        }
+    return summary
+
+def check_allocation():
+    positions = load_positions()
+    if positions.empty:
+        logger.info("No holdings found.")
+        return None
+    close = candle_store.load_panel(list(positions.index), fields=("close",))["close"]
+    values, stock_weights, sector_weights = allocation_history(positions, close)
+
+    total_value = values.sum(axis=1)
+    today_stock = stock_weights.iloc[-1]
+    today_sector = sector_weights.iloc[-1]
+
+    # Flag overexposed stocks
+    logger.info("=== Overexposed Stocks (>{:.0f}% of portfolio) ===".format(MAX_STOCK_WEIGHT*100))
+    for symbol, weight in today_stock[today_stock > MAX_STOCK_WEIGHT].items():
+        logger.info(f"{positions.at[symbol, 'name']}: {weight*100:.2f}%")
+
+    logger.info("\n=== Overexposed Sectors (>{:.0f}% of portfolio) ===".format(MAX_SECTOR_WEIGHT*100))
+    for sector, weight in today_sector[today_sector > MAX_SECTOR_WEIGHT].items():
         logger.info(f"{sector}: {weight*100:.2f}%")
 
-# Print full allocation for review
-logger.info("\n=== Full Portfolio Allocation ===")
-for h in holdings:
-    logger.info(f"{h['bseTradingSymbol']}: {h['weight']*100:.2f}% (Value: {h['position_value']:.2f})")
+    # Holdings in different sectors can still move together; flag pairs above the buy list's limit.
+    correlated = correlation.most_correlated(list(positions.index), top_n=0)["holding_pairs"]
+    logger.info("\n=== Correlated Holdings (>= {:.2f}) ===".format(correlation.MAX_PAIR_CORRELATION))
+    for pair in correlated:
+        logger.info(f"{' & '.join(pair['symbols'])}: {pair['correlation']:.2f}")
+
+    stock_history = _breach_periods(stock_weights, MAX_STOCK_WEIGHT)
+    sector_history = _breach_periods(sector_weights, MAX_SECTOR_WEIGHT)
+    logger.info(f"\n=== Breaches at current quantities over {len(values)} days ===")
+    for name, info in {**stock_history, **sector_history}.items():
+        logger.info(f"{name}: {info['days']} days above limit ({info['first']} to {info['last']}), peak {info['max_weight']*100:.2f}%")
+
+    # Print full allocation for review
+    logger.info("\n=== Full Portfolio Allocation ===")
+    for symbol, weight in today_stock.items():
+        logger.info(f"{positions.at[symbol, 'name']}: {weight*100:.2f}% (Value: {values[symbol].iloc[-1]:.2f})")
+
+    report = {
+        "as_of": values.index[-1].strftime("%Y-%m-%d"),
+        "portfolio_value": round(float(total_value.iloc[-1]), 2),
+        "stocks": [
+            {
+                "symbol": symbol,
+                "sector": positions.at[symbol, "sector"],
+                "value": round(float(values[symbol].iloc[-1]), 2),
+                "weight": round(float(weight), 4),
+                "overexposed": bool(weight > MAX_STOCK_WEIGHT),
+            }
+            for symbol, weight in today_stock.items()
+        ],
+        "sectors": [
+            {"sector": sector, "weight": round(float(weight), 4), "overexposed": bool(weight > MAX_SECTOR_WEIGHT)}
+            for sector, weight in today_sector.items()
+        ],
+        # Today's quantities valued at each past date's prices; trades since then are not reflected.
+        "current_weights_history": {
+            "dates": [d.strftime("%Y-%m-%d") for d in values.index],
+            "holdings_priced": [int(n) for n in values.notna().sum(axis=1)],
+            "portfolio_value": [round(float(v), 2) for v in total_value],
+            "sector_weights": {s: [round(float(w), 4) for w in sector_weights[s]] for s in sector_weights.columns},
+        },
+        "breaches": {"stocks": stock_history, "sectors": sector_history},
+        "correlated_holdings": correlated,
+    }
+    json_store.write_json(OUTPUT_PATH, report, compression=json_store.ARTIFACT_COMPRESSION)
+    logger.info(f"Allocation report saved to {OUTPUT_PATH}")
+    return report
+
+if __name__ == "__main__":
+    check_allocation()
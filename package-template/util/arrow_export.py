@@ -0,0 +1,272 @@
+import os
+import re
+import sys
+import shutil
+import logging
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = ipc = pq = None
+
+from util import atr_history, candle_store, json_store, market_snapshot
+from util.portfolio_backtest import OUTPUT_PATH as PORTFOLIO_BACKTEST_PATH
+
+# --- Configuration ---
+# Exportable datasets and the column their Parquet export is partitioned by (None: a single file).
+DATASETS = {
+    "candles": "year",           # Daily candles of every cached symbol
+    "snapshot": None,            # Latest per-symbol technicals from the market snapshot
+    "atr_decisions": "year",     # Append-only ATR decision history
+    "backtest_trades": None,     # Trades of the portfolio and Nifty 200 backtests
+    "buy_list": None,            # Current Nifty 200 buy recommendations
+}
+FORMATS = ("parquet", "arrow")
+AVAILABLE = pa is not None
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.path.join(BASE_DIR, "..", "files", "export")
+NIFTY200_BACKTEST_PATH = os.path.join(BASE_DIR, "..", "files", "nifty200_backtest.json")
+BUY_LIST_PATH = os.path.join(BASE_DIR, "..", "recommendations", "nifty200_buy.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def _snake(name):
+    """'Entry Date' -> 'entry_date', 'Return %' -> 'return_pct', '52W High' -> '52w_high'."""
+    return re.sub(r"[^0-9a-z]+", "_", name.replace("%", "pct").lower()).strip("_")
+
+def _records(records):
+    table = pd.DataFrame(records)
+    table.columns = [_snake(c) for c in table.columns]
+    return table
+
+def _read_records(path):
+    try:
+        return json_store.read_json(path)
+    except FileNotFoundError:
+        return []
+
+def _candle_batches(symbols=None):
+    # One symbol at a time, so exporting years of candles for the whole universe never holds them all.
+    for symbol in sorted(symbols if symbols is not None else candle_store.cached_symbols()):
+        df = candle_store.load_candles(symbol)
+        if df is None or df.empty:
+            continue
+        df = df.rename_axis("date").reset_index()
+        df.insert(0, "symbol", symbol)
+        df["year"] = df["date"].dt.year
+        yield df
+
+def _snapshot_batches(symbols=None):
+    yield market_snapshot.load_snapshot(symbols).reset_index()
+
+def _atr_decision_batches(symbols=None):
+    history = atr_history.load_history(symbols)
+    history["year"] = history["date"].str[:4].astype("int64")
+    yield history
+
+def _backtest_trade_batches(symbols=None):
+    portfolio = _read_records(PORTFOLIO_BACKTEST_PATH)
+    frames = [_records(portfolio.get("trades", [])).assign(backtest="portfolio") if portfolio else None,
+              _records(_read_records(NIFTY200_BACKTEST_PATH)).assign(backtest="nifty200")]
+    trades = pd.concat([f for f in frames if f is not None], ignore_index=True)
+    if symbols is not None and "symbol" in trades:
+        trades = trades[trades["symbol"].isin(list(symbols))]
+    yield trades
+
+def _buy_list_batches(symbols=None):
+    buy_list = _records(_read_records(BUY_LIST_PATH))
+    if symbols is not None and "symbol" in buy_list:
+        buy_list = buy_list[buy_list["symbol"].isin(list(symbols))]
+    yield buy_list
+
+_BATCHES = {
+    "candles": _candle_batches,
+    "snapshot": _snapshot_batches,
+    "atr_decisions": _atr_decision_batches,
+    "backtest_trades": _backtest_trade_batches,
+    "buy_list": _buy_list_batches,
+}
+
+def dataset_frames(name, symbols=None):
+    """
+    Yields a dataset as flat DataFrames with snake_case columns, in batches (one per symbol for
+    candles). symbols limits the rows to those trading symbols where the dataset has a symbol column.
+    Raises KeyError for an unknown dataset.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}'. Choose from {', '.join(DATASETS)}.")
+    for frame in _BATCHES[name](symbols):
+        if not frame.empty:
+            yield frame
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; install it to export Parquet or Arrow files.")
+
+def record_batches(name, symbols=None):
+    """Yields the dataset as Arrow record batches sharing the first batch's schema."""
+    _require_pyarrow()
+    schema = None
+    for frame in dataset_frames(name, symbols):
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+        schema = table.schema
+        yield from table.to_batches()
+
+class _Drain:
+    """Write-only sink that hands back whatever the IPC writer has written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def ipc_stream(name, symbols=None):
+    """
+    Yields the dataset as an Arrow IPC stream in chunks of bytes, one batch at a time, for serving
+    over HTTP. Readers (pyarrow.ipc.open_stream, or pandas/polars on top of it) load the columns
+    directly without parsing.
+    """
+    _require_pyarrow()
+    batches = record_batches(name, symbols)
+    first = next(batches, None)
+    if first is None:
+        return
+    sink = _Drain()
+    with ipc.new_stream(sink, first.schema) as writer:
+        writer.write_batch(first)
+        yield sink.drain()
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+def _write_parquet(name, batches, target):
+    partition = DATASETS[name]
+    writers = {}
+    try:
+        for batch in batches:
+            table = pa.Table.from_batches([batch])
+            if partition is None:
+                groups = {None: table}
+            else:
+                groups = {v.as_py(): table.filter(pc.equal(table.column(partition), v))
+                          for v in pc.unique(table.column(partition))}
+            for value, part in groups.items():
+                if value not in writers:
+                    path = os.path.join(target, f"{partition}={value}", "part-0.parquet") if partition else target
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    schema = part.schema.remove(part.schema.get_field_index(partition)) if partition else part.schema
+                    writers[value] = pq.ParquetWriter(path, schema, compression="zstd")
+                writers[value].write_table(part.drop([partition]) if partition else part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return len(writers)
+
+def export_dataset(name, fmt="parquet", symbols=None, export_dir=EXPORT_DIR):
+    """
+    Writes a dataset under export_dir: Parquet as <name>/<partition>=<value>/part-0.parquet (or
+    <name>.parquet when the dataset is not partitioned), Arrow as a single <name>.arrow IPC file that
+    can be memory-mapped. The export replaces the previous one only once it is complete.
+    Returns (success, message).
+    """
+    if fmt not in FORMATS:
+        return False, f"Unknown export format '{fmt}'. Choose from {', '.join(FORMATS)}."
+    if pa is None:
+        return False, "pyarrow is not installed; install it to export Parquet or Arrow files."
+    if fmt == "arrow":
+        path = os.path.join(export_dir, f"{name}.arrow")
+    elif DATASETS.get(name):
+        path = os.path.join(export_dir, name)
+    else:
+        path = os.path.join(export_dir, f"{name}.parquet")
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(export_dir, exist_ok=True)
+        batches = record_batches(name, symbols)
+        first = next(batches, None)
+        if first is None:
+            return True, f"Dataset {name} is empty; nothing exported."
+        rows = first.num_rows
+        def counted():
+            nonlocal rows
+            yield first
+            for batch in batches:
+                rows += batch.num_rows
+                yield batch
+        if fmt == "arrow":
+            with ipc.new_file(tmp_path, first.schema) as writer:
+                for batch in counted():
+                    writer.write_batch(batch)
+            files = 1
+        else:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            files = _write_parquet(name, counted(), tmp_path)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except KeyError as e:
+        return False, str(e.args[0])
+    except Exception as e:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        msg = f"Export of {name} failed: {e}"
+        logger.exception(msg)
+        return False, msg
+    msg = f"Exported {rows} {name} rows to {path} ({files} file(s))."
+    logger.info(msg)
+    return True, msg
+
+def export_all(fmt="parquet", export_dir=EXPORT_DIR):
+    """Exports every dataset. Returns (success, message) with one line per dataset."""
+    results = [export_dataset(name, fmt, export_dir=export_dir) for name in DATASETS]
+    return all(ok for ok, _ in results), "\n".join(msg for _, msg in results)
+
+if __name__ == "__main__":
+    # Usage: python -m util.arrow_export [parquet|arrow] [dataset ...]
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "parquet"
+    names = sys.argv[2:]
+    if names:
+        results = [export_dataset(name, fmt) for name in names]
+        success, message = all(ok for ok, _ in results), "\n".join(msg for _, msg in results)
+    else:
+        success, message = export_all(fmt)
+    print(f"Success: {success}, Message: {message}")
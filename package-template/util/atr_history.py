@@ -0,0 +1,231 @@
+import glob
+import gzip
+import os
+import sys
+import logging
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from util import trading_calendar
+
+# --- Configuration ---
+# One row per holding per ATR run. Stored by year: with pyarrow, each run adds a small zstd Parquet
+# part under year=YYYY/ (compact_history merges a year's parts into one file); without it, each run
+# appends a gzip member to YYYY.csv.gz. Both are append-only and read back the same way.
+HISTORY_COLUMNS = ["date", "run_at", "symbol", "quantity", "purchase_price", "close", "running_high",
+                   "atr", "stop", "floor_armed", "action"]
+HISTORY_DTYPES = {"date": "string", "run_at": "string", "symbol": "string", "quantity": "float64",
+                  "purchase_price": "float64", "close": "float64", "running_high": "float64",
+                  "atr": "float64", "stop": "float64", "floor_armed": "boolean", "action": "string"}
+FORMAT = "parquet" if pq is not None else "csv.gz"
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(BASE_DIR, "..", "files", "atr_history")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def holding_symbol(holding):
+    """Symbol a holding is logged under: its NSE trading symbol, else its BSE one."""
+    return holding.get("nseTradingSymbol") or holding.get("bseTradingSymbol")
+
+def decision_row(holding, run_date, run_at):
+    """History row for a holding after calculate_atr (or the streaming pipeline) has set its decision."""
+    return {
+        "date": run_date.isoformat(),
+        "run_at": run_at.isoformat(timespec="seconds"),
+        "symbol": holding_symbol(holding),
+        "quantity": holding.get("totalQuantity"),
+        "purchase_price": holding.get("purchase_price", holding.get("averageTradedPrice")),
+        "close": holding.get("last_close"),
+        "running_high": holding.get("running_high"),
+        "atr": holding.get("atr_value"),
+        "stop": holding.get("trailing_stop_loss"),
+        "floor_armed": holding.get("floor_armed"),
+        "action": holding.get("action"),
+    }
+
+def _frame(rows):
+    table = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+    return table.astype(HISTORY_DTYPES)
+
+def append_decisions(rows, history_dir=HISTORY_DIR):
+    """Appends one run's decision rows to the year's history; earlier rows are never rewritten."""
+    if not rows:
+        return None
+    table = _frame(rows)
+    year = table["date"].iloc[0][:4]
+    if FORMAT == "parquet":
+        part_dir = os.path.join(history_dir, f"year={year}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{datetime.now():%Y%m%d-%H%M%S-%f}.parquet")
+        tmp_path = path + ".tmp"
+        pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    else:
+        os.makedirs(history_dir, exist_ok=True)
+        path = os.path.join(history_dir, f"{year}.csv.gz")
+        if os.path.exists(path) and _csv_header(path) != HISTORY_COLUMNS:
+            # Written with an older set of columns: start a new file for the year; the old one stays readable.
+            os.replace(path, os.path.join(history_dir, f"{year}-{datetime.now():%Y%m%d%H%M%S}.csv.gz"))
+        header = not os.path.exists(path)
+        # Each run is its own gzip member; readers see the members as one continuous CSV.
+        with gzip.open(path, "at", encoding="utf-8", newline="") as f:
+            table.to_csv(f, header=header, index=False)
+    logger.info(f"Appended {len(table)} ATR decisions to {path}")
+    return path
+
+def _year_files(history_dir):
+    """{year: [files]} for both storage formats, so history written before pyarrow was installed stays readable."""
+    years = {}
+    for path in glob.glob(os.path.join(history_dir, "*.csv.gz")):
+        years.setdefault(int(os.path.basename(path)[:4]), []).append(path)
+    for path in glob.glob(os.path.join(history_dir, "year=*", "*.parquet")):
+        years.setdefault(int(os.path.basename(os.path.dirname(path))[5:]), []).append(path)
+    return years
+
+def _csv_header(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return f.readline().strip().split(",")
+
+def _read(path):
+    # Rows written before a column was added read back with that column empty.
+    if path.endswith(".parquet"):
+        if pq is None:
+            logger.warning(f"Skipping {path}: pyarrow is not installed.")
+            return _frame([])
+        table = pd.read_parquet(path)
+    else:
+        table = pd.read_csv(path, dtype={c: t for c, t in HISTORY_DTYPES.items() if c != "floor_armed"})
+    return table.reindex(columns=HISTORY_COLUMNS).astype(HISTORY_DTYPES)
+
+def load_history(symbols=None, start=None, end=None, history_dir=HISTORY_DIR):
+    """
+    Decision rows in date order, optionally limited to symbols and to dates between start and end
+    (inclusive, date or 'YYYY-MM-DD'). Only the years overlapping the range are read.
+    """
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    frames = []
+    for year, paths in sorted(_year_files(history_dir).items()):
+        if (start and year < int(start[:4])) or (end and year > int(end[:4])):
+            continue
+        frames.extend(_read(p) for p in sorted(paths))
+    table = pd.concat(frames, ignore_index=True) if frames else _frame([])
+    if symbols is not None:
+        table = table[table["symbol"].isin(list(symbols))]
+    if start:
+        table = table[table["date"] >= start]
+    if end:
+        table = table[table["date"] <= end]
+    return table.sort_values(["date", "run_at"], kind="stable").reset_index(drop=True)
+
+def last_decisions(symbols, history_dir=HISTORY_DIR):
+    """{symbol: latest row as a dict}, reading back one year at a time until every symbol is found."""
+    wanted = set(symbols)
+    latest = {}
+    for year, paths in sorted(_year_files(history_dir).items(), reverse=True):
+        table = pd.concat([_read(p) for p in paths], ignore_index=True)
+        table = table[table["symbol"].isin(wanted - set(latest))]
+        for row in table.sort_values(["date", "run_at"], kind="stable").groupby("symbol").tail(1).to_dict("records"):
+            latest[row["symbol"]] = row
+        if wanted <= set(latest):
+            break
+    return latest
+
+def _trading_days(start, today):
+    """NSE trading days from start (a 'YYYY-MM-DD' date) up to, not including, today."""
+    holidays = sorted(d.isoformat() for d in trading_calendar.load_holidays())
+    return int(np.busday_count(start, today.isoformat(), holidays=holidays))
+
+def _purchase_price(holding):
+    return holding.get("purchase_price") or holding.get("averageTradedPrice") or 0
+
+def seed_running_high(holding, recent_highs=(), today=None):
+    """
+    Running high of a holding with no history to advance from: the highest daily high since it was
+    bought, taking the day the holdings sync first saw the position ('first_seen') as the purchase
+    date, and never below the purchase price. Without that date (positions held before the first
+    sync) the whole candle window counts; without candles, the larger of purchase price and last close.
+    """
+    purchase_price = _purchase_price(holding)
+    if not len(recent_highs):
+        return max(purchase_price, holding.get("last_close") or 0)
+    first_seen = holding.get("first_seen")
+    if first_seen:
+        today = today or date.today()
+        recent_highs = recent_highs[-max(1, _trading_days(first_seen, today) + 1):]
+    return max([purchase_price] + list(recent_highs))
+
+def floor_armed(last, holding):
+    """
+    Whether the holding's stop had already cleared its purchase price as of its last history row.
+    Rows logged before the flag existed count as not armed; the stop re-arms once it clears cost.
+    """
+    if not last or last.get("purchase_price") != _purchase_price(holding):
+        return False
+    armed = last.get("floor_armed")
+    return False if armed is None or pd.isna(armed) else bool(armed)
+
+def advance_running_high(last, recent_highs, holding, today=None):
+    """
+    High since purchase, advanced from the holding's last history row by the highs of the trading
+    days since that row, instead of being recovered from the full candle history. Without a usable
+    previous row (first run, or a changed position) it is seeded by seed_running_high.
+    """
+    if not last or pd.isna(last.get("running_high")) or last.get("purchase_price") != _purchase_price(holding):
+        return seed_running_high(holding, recent_highs, today)
+    today = today or date.today()
+    days = max(1, _trading_days(last["date"], today))
+    return max([last["running_high"]] + list(recent_highs[-days:]))
+
+def compact_history(year, history_dir=HISTORY_DIR):
+    """Merges a year's Parquet parts into a single file. Returns the number of parts merged."""
+    part_dir = os.path.join(history_dir, f"year={year}")
+    parts = sorted(glob.glob(os.path.join(part_dir, "*.parquet")))
+    if pq is None or len(parts) < 2:
+        return 0
+    table = pd.concat([_read(p) for p in parts], ignore_index=True).sort_values(["date", "run_at"], kind="stable")
+    merged = os.path.join(part_dir, f"part-{year}-compacted.parquet")
+    tmp_path = merged + ".tmp"
+    pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp_path, compression="zstd")
+    os.replace(tmp_path, merged)
+    for path in parts:
+        if path != merged:
+            os.remove(path)
+    logger.info(f"Compacted {len(parts)} ATR history parts for {year} into {merged}")
+    return len(parts)
+
+if __name__ == "__main__":
+    # Usage: python -m util.atr_history [symbol] [start] [end]
+    #        python -m util.atr_history compact <year>
+    if len(sys.argv) == 3 and sys.argv[1] == "compact":
+        print(f"Merged {compact_history(int(sys.argv[2]))} parts.")
+    else:
+        args = sys.argv[1:] + [None] * 3
+        history = load_history([args[0]] if args[0] else None, args[1], args[2])
+        print(history.to_string(index=False))
@@ -1,9 +1,15 @@
-import json
 import yfinance as yf
 import pandas as pd
 import os
+import sys
 import logging
 
+if __package__ in (None, ""):
+    # Run as a script (python util/backtest_nifty200.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
+
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
 os.makedirs(log_dir, exist_ok=True)
@@ -24,8 +30,7 @@ MOVING_AVG_WINDOW = 200    # 200-day moving average for trend filter
 
 # Load buy list
 buy_list_path = os.path.join("recommendations", "nifty200_buy.json")
-with open(buy_list_path, "r") as f:
-    buy_list = json.load(f)
+buy_list = json_store.read_json(buy_list_path)
 
 results = []
 
@@ -102,8 +107,6 @@ for stock_info in buy_list:
         logger.warning(f"{symbol}: Error in backtest: {e}")
 
 # Save results
-os.makedirs("files", exist_ok=True)
 backtest_output_path = os.path.join("files", "nifty200_backtest.json")
-with open(backtest_output_path, "w") as f:
-    json.dump(results, f, indent=2)
+json_store.write_json(backtest_output_path, results, pretty=True)
 logger.info(f"Backtest complete. Results saved to {backtest_output_path}")
\ No newline at end of file
@@ -1,8 +1,16 @@
-import json
+import hashlib
 import os # Keep os for path operations
 import pandas as pd
 import numpy as np
 import logging
+from datetime import datetime
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/calculate_atr.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import atr_history, candle_store, json_store
 
 # --- Configuration ---
 ATR_PERIOD = 14                  # Number of days to calculate ATR
@@ -12,6 +20,8 @@ ATR_MULTIPLIER = 2.5             # Multiplier for trailing stop loss
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 HOLDINGS_FILE = os.path.join(BASE_DIR, "..", "files", "holding.json")
 OUTPUT_FILE = os.path.join(BASE_DIR, "..", "files", "atr.json")
+MEMO_FILE = os.path.join(BASE_DIR, "..", "files", "atr_memo.json") # Last ATR result per holding, keyed by input fingerprint; shared with stream_pipeline
+HISTORY_DIR = atr_history.HISTORY_DIR # Append-only log of every run's decisions
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
@@ -51,19 +61,64 @@ def _calculate_atr_for_df(high_prices, low_prices, close_prices, period):
     atr_values = df['true_range'].rolling(window=period).mean()
     return atr_values.iloc[-1] if not atr_values.empty and pd.notna(atr_values.iloc[-1]) else 0
 
+def trailing_stop(running_high, atr, purchase_price, armed=False, multiplier=ATR_MULTIPLIER):
+    """
+    ATR trailing stop: running_high - atr * multiplier, floored at the purchase price only once armed.
+    The floor arms the first time the stop clears the purchase price and then stays armed, so a wider
+    ATR cannot pull the stop back below break-even, while a holding that never got there trails from
+    its high instead of being sold at its first close below cost. Returns (stop, armed).
+    """
+    stop = running_high - atr * multiplier
+    armed = bool(armed or stop >= purchase_price)
+    return (max(purchase_price, stop) if armed else stop), armed
+
+def memo_key(holding):
+    """Symbol the ATR memo stores a holding's result under."""
+    return holding.get("bseTradingSymbol") or holding.get("nseTradingSymbol", "Unknown")
+
+def holding_fingerprint(holding):
+    """
+    Hash of everything the ATR result depends on: the holding's candle cache version, position (purchase
+    price, quantity, first_seen) and the ATR parameters. The batch and streaming pipelines both use it,
+    so either reuses the other's memo entries. None when the holding has no candle cache to version.
+    """
+    symbol = holding.get("nseTradingSymbol", "")
+    signature = candle_store.candle_signatures([symbol])[0]
+    if signature is None:
+        return None
+    inputs = [symbol, signature, holding.get("averageTradedPrice", holding.get("purchase_price")), holding.get("totalQuantity"),
+              holding.get("first_seen"), ATR_PERIOD, ATR_MULTIPLIER]
+    return hashlib.sha1(repr(inputs).encode("utf-8")).hexdigest()
+
+def load_memo(path=None):
+    """Loads the ATR memo, or an empty one if it is missing or unreadable."""
+    path = path or MEMO_FILE
+    if not os.path.exists(path):
+        return {}
+    try:
+        return json_store.read_json(path)
+    except (json_store.JSONDecodeError, IOError) as e:
+        logger.warning(f"Ignoring unreadable ATR memo: {e}")
+        return {}
+
+def save_memo(memo, path=None):
+    try:
+        json_store.write_json(path or MEMO_FILE, memo, compression=json_store.ARTIFACT_COMPRESSION)
+    except IOError as e:
+        logger.warning(f"Failed to save ATR memo: {e}")
+
 def calculate_atr():
     """
     Loads holdings, calculates ATR and trailing stop loss for each, and saves the result.
     """
     logger.info("Starting ATR calculation process...")
     try:
-        with open(HOLDINGS_FILE, 'r', encoding='utf-8') as f:
-            holdings_data = json.load(f)
+        holdings_data = json_store.read_json(HOLDINGS_FILE)
     except FileNotFoundError:
         msg = f"Holdings file not found: {HOLDINGS_FILE}"
         logger.error(msg)
         return False, msg
-    except json.JSONDecodeError as e:
+    except json_store.JSONDecodeError as e:
         msg = f"Error decoding holdings JSON: {e}"
         logger.error(msg)
         return False, msg
@@ -75,13 +130,33 @@ def calculate_atr():
         return False, msg
 
     processed_count = 0
+    memo, fresh_memo = load_memo(), {}
+    try:
+        last_rows = atr_history.last_decisions([atr_history.holding_symbol(h) for h in holdings], HISTORY_DIR)
+    except Exception as e:
+        logger.warning(f"Could not read ATR history; running highs restart from the fetched period: {e}")
+        last_rows = {}
+    hits = misses = 0
     for holding in holdings:
-        symbol = holding.get("bseTradingSymbol") or holding.get("nseTradingSymbol", "Unknown")
+        symbol = memo_key(holding)
         
         # Check for required fields, now using 'historical_data' and 'highest_price_in_period'
         if not all(k in holding for k in ["purchase_price", "highest_price_in_period", "historical_data"]):
             logger.warning(f"Skipping {symbol}: missing required data (purchase_price, highest_price_in_period, or historical_data).")
             continue
+
+        # Reuse the previous result when none of the inputs changed since it was computed.
+        fingerprint = holding_fingerprint(holding)
+        cached = memo.get(symbol)
+        if fingerprint and cached and cached.get("fingerprint") == fingerprint:
+            holding["atr_value"], holding["trailing_stop_loss"], holding["action"] = cached["atr_value"], cached["trailing_stop_loss"], cached["action"]
+            holding["floor_armed"] = cached.get("floor_armed", False)
+            holding["running_high"] = cached.get("running_high") or atr_history.seed_running_high(holding)
+            fresh_memo[symbol] = cached
+            hits += 1
+            processed_count += 1
+            continue
+        misses += 1
         
         candle_data = holding["historical_data"] # Use the full historical data
         if not candle_data or len(candle_data) < ATR_PERIOD:
@@ -103,29 +178,46 @@ def calculate_atr():
         atr_value = _calculate_atr_for_df(df['high'], df['low'], df['close'], ATR_PERIOD)
         
         holding["atr_value"] = atr_value
-        
-        trailing_sl = holding["highest_price_in_period"] - (atr_value * ATR_MULTIPLIER)
-        trailing_sl = max(holding["purchase_price"], trailing_sl)
+
+        # The high since purchase advances from the last logged run, so a high that has rolled out of
+        # the fetched candle window still holds the stop up.
+        last = last_rows.get(atr_history.holding_symbol(holding))
+        running_high = atr_history.advance_running_high(last, df['high'].tolist(), holding)
+        holding["running_high"] = running_high
+        trailing_sl, holding["floor_armed"] = trailing_stop(running_high, atr_value, holding["purchase_price"],
+                                                            atr_history.floor_armed(last, holding))
         holding["trailing_stop_loss"] = trailing_sl
         
         current_price = df['close'].iloc[-1] if not df.empty else holding.get("last_close", holding["purchase_price"])
         
         holding["action"] = "SELL" if current_price <= trailing_sl else "HOLD"
         logger.debug(f"{symbol}: ATR={atr_value:.2f}, TSL={trailing_sl:.2f}, Action={holding['action']}")
+        fresh_memo[symbol] = {"fingerprint": fingerprint, "atr_value": float(atr_value), "running_high": float(running_high),
+                              "trailing_stop_loss": float(trailing_sl), "floor_armed": holding["floor_armed"],
+                              "action": holding["action"]}
         processed_count += 1
+
+    # Only rewrite the memo when something was recomputed or a holding dropped out.
+    if fresh_memo != memo:
+        save_memo(fresh_memo)
+    logger.info(f"ATR memo: {hits} hits, {misses} misses.")
     
     try:
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f_out:
-            json.dump(holdings, f_out, indent=4) # Dump the list of holdings directly
-        msg = f"ATR report ready. Processed {processed_count}/{len(holdings)} holdings."
-        logger.info(msg)
-        return True, msg
+        json_store.write_json(OUTPUT_FILE, holdings) # Served by /report, so stored uncompressed
     except IOError as e:
         msg = f"Failed to save ATR report: {e}"
         logger.error(msg)
         return False, msg
 
+    run_at = datetime.now()
+    try:
+        atr_history.append_decisions([atr_history.decision_row(h, run_at.date(), run_at) for h in holdings if "action" in h], HISTORY_DIR)
+    except Exception as e:
+        logger.error(f"Failed to append ATR decisions to history: {e}")
+    msg = f"ATR report ready. Processed {processed_count}/{len(holdings)} holdings ({hits} unchanged, {misses} recomputed)."
+    logger.info(msg)
+    return True, msg
+
 if __name__ == "__main__":
     success, message = calculate_atr()
     print(f"Success: {success}, Message: {message}")
\ No newline at end of file
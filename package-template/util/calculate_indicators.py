@@ -3,12 +3,18 @@ if not hasattr(np, "NaN"):
     np.NaN = np.nan
 
 import os
-import json
+import sys
 import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
 import logging
 
+if __package__ in (None, ""):
+    # Run as a script (python util/calculate_indicators.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
+
 try:
     # For Python 3.8+ use importlib.metadata
     from importlib.metadata import version as get_distribution, PackageNotFoundError as DistributionNotFound
@@ -26,8 +32,7 @@ logger = logging.getLogger(__name__)
 def load_holdings(holdings_file):
     """Load holdings from a JSON file."""
     try:
-        with open(holdings_file, "r") as f:
-            data = json.load(f)
+        data = json_store.read_json(holdings_file)
         logger.info(f"Successfully loaded holdings from {holdings_file}")
         return data
     except Exception as e:
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import logging
+import requests
+import pandas as pd
+from datetime import datetime, timedelta
+
+from util import json_store, single_flight
+
+# --- Constants and Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CANDLE_DIR = os.path.join(BASE_DIR, "..", "files")
+CANDLE_FILE_SUFFIX = "_candles.json"
+EQUITY_SUFFIX = "-EQ"  # NSE equity series; other caches (e.g. the NIFTY benchmark) are not tradable symbols
+HISTORY_DAYS = 3 * 365 + 90  # ~3 years and 3 months of calendar days
+CANDLE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def candle_path(trading_symbol):
+    """Path of the cached candle file for a trading symbol, e.g. files/RELIANCE-EQ_candles.json."""
+    return os.path.join(CANDLE_DIR, f"{trading_symbol}{CANDLE_FILE_SUFFIX}")
+
+def cached_symbols():
+    """Trading symbols that have a cached candle file."""
+    if not os.path.isdir(CANDLE_DIR):
+        return []
+    return [name[:-len(CANDLE_FILE_SUFFIX)] for name in os.listdir(CANDLE_DIR) if name.endswith(CANDLE_FILE_SUFFIX)]
+
+def is_equity(trading_symbol):
+    return trading_symbol.endswith(EQUITY_SUFFIX)
+
+def equity_symbols():
+    """Cached symbols of NSE equities, leaving out index caches such as the NIFTY benchmark."""
+    return [s for s in cached_symbols() if is_equity(s)]
+
+def _candles_to_frame(candles_raw):
+    """Converts IIFL candles ([timestamp, open, high, low, close, volume]) to a date-indexed DataFrame."""
+    rows = [c[:6] + [None] * (6 - len(c[:6])) for c in candles_raw if len(c) >= 5]
+    df = pd.DataFrame(rows, columns=CANDLE_COLUMNS)
+    if df.empty:
+        return df.set_index("timestamp")
+    timestamps = df["timestamp"]
+    if pd.api.types.is_numeric_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, unit="ms", utc=True)
+    else:
+        timestamps = pd.to_datetime(timestamps, errors="coerce", utc=True)
+    # Candles are daily, so keep only the trading date in exchange time.
+    df["timestamp"] = timestamps.dt.tz_convert("Asia/Kolkata").dt.tz_localize(None).dt.normalize()
+    for col in CANDLE_COLUMNS[1:]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=["timestamp", "close"]).drop_duplicates("timestamp", keep="last")
+    return df.set_index("timestamp").sort_index()
+
+def load_candles(trading_symbol):
+    """Loads the cached candles for a symbol as a DataFrame, or None if there is no cache."""
+    path = candle_path(trading_symbol)
+    if not os.path.exists(path):
+        return None
+    try:
+        data = json_store.read_json(path)
+        return _candles_to_frame(data["result"][0]["candles"])
+    except (json_store.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable candle cache {path}: {e}")
+        return None
+
+def save_candles(trading_symbol, response_data):
+    """Stores a raw historical-data API response as the symbol's candle cache."""
+    return json_store.write_json(candle_path(trading_symbol), response_data, compression=json_store.ARTIFACT_COMPRESSION)
+
+@single_flight.coalesce(single_flight.fetches, key=lambda url, headers, trading_symbol, *args, **kwargs: ("candles", trading_symbol))
+def fetch_candles(url, headers, trading_symbol, instrument_id, days=HISTORY_DAYS, timeout=30):
+    """
+    Fetches daily candles for one instrument from the IIFL API and caches them. Returns the raw candle list.
+    Concurrent fetches of the same symbol share one request.
+    """
+    to_date = datetime.now()
+    from_date = to_date - timedelta(days=days)
+    payload = {
+        "exchange": "NSEEQ",
+        "instrumentId": str(instrument_id),
+        "interval": "1 day",
+        "fromDate": from_date.strftime("%d-%b-%Y").lower(),
+        "toDate": to_date.strftime("%d-%b-%Y").lower()
+    }
+    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    save_candles(trading_symbol, data)
+    return data.get("result", [{}])[0].get("candles", [])
+
+# In-process panel cache: (symbols, fields) -> (file signatures, panel)
+_panel_cache = {}
+
+def candle_signatures(symbols):
+    """(mtime_ns, size) of each symbol's candle file, or None where there is no cache."""
+    signatures = []
+    for symbol in symbols:
+        try:
+            st = os.stat(candle_path(symbol))
+            signatures.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signatures.append(None)
+    return tuple(signatures)
+
+def panel_version(symbols):
+    """A short hash that changes whenever any of the symbols' candle caches changes."""
+    signatures = candle_signatures(sorted(symbols))
+    return hashlib.sha1(repr(list(zip(sorted(symbols), signatures))).encode("utf-8")).hexdigest()[:16]
+
+def load_panel(symbols=None, fields=("close", "high")):
+    """
+    Loads cached candles into a panel: {field: DataFrame indexed by date with one column per symbol}.
+    Symbols without a cache are left out; the default is every cached equity. The panel is reused
+    while no candle file has changed.
+    """
+    symbols = tuple(sorted(symbols if symbols is not None else equity_symbols()))
+    key = (symbols, tuple(fields))
+    signatures = candle_signatures(symbols)
+    cached = _panel_cache.get(key)
+    if cached and cached[0] == signatures:
+        return cached[1]
+
+    frames = {}
+    for symbol, signature in zip(symbols, signatures):
+        if signature is None:
+            continue
+        df = load_candles(symbol)
+        if df is not None and not df.empty:
+            frames[symbol] = df
+    panel = {field: pd.DataFrame({s: df[field] for s, df in frames.items()}).sort_index() for field in fields}
+    _panel_cache[key] = (signatures, panel)
+    logger.info(f"Loaded candle panel for {len(frames)}/{len(symbols)} symbols.")
+    return panel
@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+import logging
+
+# --- Configuration ---
+FAILURE_THRESHOLD = 3            # Consecutive failures that open the circuit
+RESET_TIMEOUT_SECONDS = 300      # How long an open circuit rejects calls before one trial call is let through
+
+# Breaker names of the IIFL endpoints the pipelines call.
+IIFL_HOLDINGS = "iifl_holdings"
+IIFL_HISTORICAL_DATA = "iifl_historical_data"
+IIFL_CONTRACT_FILES = "iifl_contract_files"
+IIFL_ORDERS = "iifl_orders"
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing. Closed: calls go through and consecutive failures
+    are counted. Open (after failure_threshold failures): calls are rejected without being made until
+    reset_timeout has passed. Half-open: one trial call is let through; success closes the circuit,
+    failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT_SECONDS, clock=time.time):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def allow(self):
+        """True if a call may be made now; moves an expired open circuit to half-open for one trial."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                logger.info(f"Circuit {self.name} half-open; letting one trial call through.")
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit {self.name} closed after a successful call.")
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = None
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} failure(s): {error}")
+                self.state = "open"
+                self.opened_at = self._clock()
+
+    def retry_in(self):
+        """Seconds until an open circuit lets a trial call through (0 when not open)."""
+        with self._lock:
+            if self.state != "open":
+                return 0
+            return max(0, self.reset_timeout - (self._clock() - self.opened_at))
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Calls a (success, message) function through the breaker. A False result or an exception
+        counts as a failure. While the circuit is open the function is not called and
+        (False, message) is returned.
+        """
+        if not self.allow():
+            msg = f"{self.name} is unavailable after repeated failures ({self.last_error}); retrying in {self.retry_in():.0f}s."
+            logger.info(msg)
+            return False, msg
+        try:
+            success, message = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        if success:
+            self.record_success()
+        else:
+            self.record_failure(message)
+        return success, message
+
+    def status(self):
+        return {"state": self.state, "failures": self.failures, "last_error": self.last_error, "retry_in": round(self.retry_in())}
+
+# One breaker per external endpoint, shared by everything in the process that calls it.
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker(name):
+    """Returns the process-wide breaker for an endpoint, creating it on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def breaker_status():
+    """{name: status} for every breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.status() for b in breakers}
@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from util import candle_store, json_store
+
+# --- Configuration ---
+WINDOW = 126                     # Trading days of daily returns in the rolling window (~6 months)
+MIN_PERIODS = 60                 # Overlapping days a pair needs before its correlation is reported
+MAX_PAIR_CORRELATION = 0.8       # Candidates at least this correlated with a holding or pick are skipped
+REBUILD_EVERY = 63               # Incremental updates before a full rebuild resets accumulated rounding
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(BASE_DIR, "..", "files", "correlation_state.npz")
+HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+class RollingCorrelation:
+    """
+    Pairwise correlation of daily returns over a rolling window, kept as running sums so a new day
+    adds one row and the day leaving the window subtracts one, instead of recomputing the window.
+    For each pair the sums cover only the days on which both symbols have a return (missing days
+    are NaN), matching pandas' pairwise-complete DataFrame.corr.
+    """
+
+    def __init__(self, symbols, window=WINDOW):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.window = window
+        self.dates = []
+        self.returns = np.empty((0, n))
+        self.count = np.zeros((n, n))    # Days both symbols have a return
+        self.sum_x = np.zeros((n, n))    # [i, j]: sum of i's returns on days j also has one
+        self.sum_xx = np.zeros((n, n))   # [i, j]: sum of i's squared returns on those days
+        self.sum_xy = np.zeros((n, n))   # [i, j]: sum of the products of i's and j's returns
+        self.updates = 0
+        self._corr = None
+
+    def _accumulate(self, rows, sign):
+        present = ~np.isnan(rows)
+        x = np.where(present, rows, 0.0)
+        m = present.astype(float)
+        self.count += sign * (m.T @ m)
+        self.sum_x += sign * (x.T @ m)
+        self.sum_xx += sign * ((x * x).T @ m)
+        self.sum_xy += sign * (x.T @ x)
+
+    def append(self, dates, rows):
+        """Adds days of returns (one row per date, one column per symbol) and drops those that leave the window."""
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(self.symbols))
+        if not len(rows):
+            return
+        self._accumulate(rows, 1)
+        self.returns = np.vstack([self.returns, rows])
+        self.dates.extend(dates)
+        excess = len(self.dates) - self.window
+        if excess > 0:
+            self._accumulate(self.returns[:excess], -1)
+            self.returns = self.returns[excess:]
+            self.dates = self.dates[excess:]
+        self.updates += 1
+        self._corr = None
+
+    def resize(self, symbols, new_returns):
+        """
+        Changes the symbol set in place: dropped symbols lose their rows and columns, and added ones
+        get theirs from new_returns (one row per window date, one column per added symbol). Only the
+        new symbols' pairs are summed, O(W * N * K) for K new symbols instead of a full rebuild.
+        """
+        kept = [s for s in symbols if s in self.index]
+        added = [s for s in symbols if s not in self.index]
+        keep = [self.index[s] for s in kept]
+        block = np.ix_(keep, keep)
+        sums = [self.count[block], self.sum_x[block], self.sum_xx[block], self.sum_xy[block]]
+        self.returns = self.returns[:, keep]
+        if added:
+            new_rows = np.asarray(new_returns, dtype=float).reshape(len(self.dates), len(added))
+            self.returns = np.hstack([self.returns, new_rows])
+            present = ~np.isnan(self.returns)
+            x = np.where(present, self.returns, 0.0)
+            m = present.astype(float)
+            xn, mn = x[:, len(kept):], m[:, len(kept):]
+            # [all, new] and [new, all] blocks of each sum, in the same orientation as _accumulate.
+            blocks = [(m.T @ mn, mn.T @ m), (x.T @ mn, xn.T @ m), ((x * x).T @ mn, (xn * xn).T @ m), (x.T @ xn, xn.T @ x)]
+            n = len(symbols)
+            for i, (right, bottom) in enumerate(blocks):
+                grown = np.zeros((n, n))
+                grown[:len(kept), :len(kept)] = sums[i]
+                grown[:, len(kept):] = right
+                grown[len(kept):, :] = bottom
+                sums[i] = grown
+        self.count, self.sum_x, self.sum_xx, self.sum_xy = sums
+        self.symbols = kept + added
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self._corr = None
+
+    def matrix(self):
+        """The N x N correlation matrix; NaN for pairs with fewer than MIN_PERIODS common days."""
+        if self._corr is None:
+            c = self.count
+            var = c * self.sum_xx - self.sum_x ** 2
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = (c * self.sum_xy - self.sum_x * self.sum_x.T) / np.sqrt(var * var.T)
+            corr[(c < MIN_PERIODS) | ~np.isfinite(corr)] = np.nan
+            self._corr = np.clip(corr, -1.0, 1.0)
+        return self._corr
+
+    def frame(self, symbols=None):
+        """The matrix as a DataFrame, optionally limited to the given symbols."""
+        corr = pd.DataFrame(self.matrix(), index=self.symbols, columns=self.symbols)
+        if symbols is not None:
+            symbols = [s for s in symbols if s in self.index]
+            corr = corr.loc[symbols, symbols]
+        return corr
+
+    def strongest(self, symbol, others):
+        """(other, correlation) for the one of others most correlated with symbol, or (None, nan)."""
+        columns = [self.index[o] for o in others if o in self.index and o != symbol]
+        if symbol not in self.index or not columns:
+            return None, float("nan")
+        row = self.matrix()[self.index[symbol], columns]
+        if np.isnan(row).all():
+            return None, float("nan")
+        best = int(np.nanargmax(row))
+        return self.symbols[columns[best]], float(row[best])
+
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, symbols=np.array(self.symbols, dtype=str), dates=np.array(self.dates, dtype=str),
+                 returns=self.returns, count=self.count, sum_x=self.sum_x, sum_xx=self.sum_xx, sum_xy=self.sum_xy,
+                 window=self.window, updates=self.updates)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path) as data:
+            state = cls(data["symbols"].tolist(), int(data["window"]))
+            state.dates = data["dates"].tolist()
+            state.returns = data["returns"]
+            state.count, state.sum_x, state.sum_xx, state.sum_xy = data["count"], data["sum_x"], data["sum_xx"], data["sum_xy"]
+            state.updates = int(data["updates"])
+        return state
+
+# In-process cache: path -> (file signature, state)
+_state_cache = {}
+
+def load_correlations(path=STATE_PATH):
+    """The saved correlation state, reused while the file is unchanged; None if there is none yet."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _state_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    state = RollingCorrelation.load(path)
+    _state_cache[path] = (signature, state)
+    return state
+
+def refresh_correlations(symbols=None, path=STATE_PATH):
+    """
+    Brings the rolling correlation matrix up to date with the candle caches: only the days after the
+    saved window's last date are added. Symbols whose candle cache appeared or disappeared are added
+    to or dropped from the saved state; the matrix is rebuilt from the window only when there is no
+    saved state or every REBUILD_EVERY updates. The default universe is the cached equities.
+    Returns (success, message).
+    """
+    started = time.perf_counter()
+    try:
+        symbols = sorted(symbols if symbols is not None else candle_store.equity_symbols())
+        close = candle_store.load_panel(symbols, fields=("close",))["close"]
+        if close.empty:
+            return False, "No cached candles to correlate."
+        returns = close.pct_change(fill_method=None).iloc[1:]
+        returns.index = returns.index.strftime("%Y-%m-%d")
+        try:
+            state = load_correlations(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable correlation state {path}: {e}")
+            state = None
+
+        resized = False
+        if state is None or state.window != WINDOW or state.updates >= REBUILD_EVERY:
+            state = RollingCorrelation(returns.columns, WINDOW)
+            new = returns.tail(WINDOW)
+            mode = "rebuilt"
+        else:
+            if set(state.symbols) != set(returns.columns):
+                dropped = len(set(state.symbols) - set(returns.columns))
+                added = [s for s in returns.columns if s not in state.index]
+                state.resize(list(returns.columns), returns.reindex(state.dates)[added].to_numpy())
+                resized = True
+            new = returns[returns.index > state.dates[-1]] if state.dates else returns.tail(WINDOW)
+            mode = f"incremental (+{len(added)}/-{dropped} symbols)" if resized else "incremental"
+            # The state keeps its own column order; added symbols sit at the end.
+            new = new[state.symbols]
+        if new.empty and not resized:
+            msg = f"Correlation matrix for {len(state.symbols)} symbols already up to date ({state.dates[-1]})."
+            logger.info(msg)
+            return True, msg
+        state.append(new.index.tolist(), new.to_numpy())
+        state.save(path)
+        st = os.stat(path)
+        _state_cache[path] = ((st.st_mtime_ns, st.st_size), state)
+    except Exception as e:
+        msg = f"Correlation refresh failed: {e}"
+        logger.exception(msg)
+        return False, msg
+    msg = (f"Correlation matrix for {len(state.symbols)} symbols over {len(state.dates)} days {mode} "
+           f"with {len(new)} new day(s) in {time.perf_counter() - started:.2f}s.")
+    logger.info(msg)
+    return True, msg
+
+def holding_symbols(path=HOLDING_PATH):
+    """NSE trading symbols of the current holdings."""
+    holdings = json_store.read_json(path).get("result", [])
+    return [h["nseTradingSymbol"] for h in holdings if h.get("nseTradingSymbol")]
+
+def most_correlated(holdings, top_n=20, state=None):
+    """
+    The symbols outside holdings most correlated with any holding, strongest first:
+    [{"symbol", "correlation", "with"}]. Also lists the holding pairs above MAX_PAIR_CORRELATION.
+    """
+    state = state or load_correlations()
+    if state is None:
+        return {"as_of": None, "universe": [], "holding_pairs": []}
+    held = [h for h in holdings if h in state.index]
+    corr = state.matrix()
+    columns = [state.index[h] for h in held]
+    block = pd.DataFrame(corr[:, columns], index=state.symbols, columns=held).drop(index=held)
+    strongest = block.max(axis=1).dropna().sort_values(ascending=False, kind="stable").head(top_n)
+    partners = block.loc[strongest.index].idxmax(axis=1)
+    universe = [{"symbol": s, "correlation": round(float(v), 4), "with": partners[s]} for s, v in strongest.items()]
+    pairs = []
+    for a in range(len(held)):
+        for b in range(a + 1, len(held)):
+            value = corr[columns[a], columns[b]]
+            if value >= MAX_PAIR_CORRELATION:
+                pairs.append({"symbols": [held[a], held[b]], "correlation": round(float(value), 4)})
+    pairs.sort(key=lambda p: -p["correlation"])
+    return {"as_of": state.dates[-1] if state.dates else None, "universe": universe, "holding_pairs": pairs}
+
+def select_diversified(candidates, holdings=(), max_correlation=MAX_PAIR_CORRELATION, state=None):
+    """
+    Walks the candidates in order (best first) and keeps each one unless it is at least
+    max_correlation correlated with a holding or an already kept candidate. Candidates without
+    enough history to correlate are kept. Returns (kept, {skipped symbol: (other, correlation)}).
+    """
+    state = state or load_correlations()
+    kept, skipped = [], {}
+    for symbol in candidates:
+        if state is not None:
+            other, value = state.strongest(symbol, list(holdings) + kept)
+            if other is not None and value >= max_correlation:
+                skipped[symbol] = (other, value)
+                continue
+        kept.append(symbol)
+    return kept, skipped
+
+if __name__ == "__main__":
+    # Usage: python -m util.correlation [top_n]
+    success, message = refresh_correlations()
+    print(f"Success: {success}, Message: {message}")
+    if success and os.path.exists(HOLDING_PATH):
+        report = most_correlated(holding_symbols(), int(sys.argv[1]) if len(sys.argv) > 1 else 20)
+        for row in report["universe"]:
+            print(f"{row['symbol']:<20} {row['correlation']:6.2f}  with {row['with']}")
@@ -1,8 +1,14 @@
 import pandas as pd
-import json
 import os
+import sys
 import logging
 
+if __package__ in (None, ""):
+    # Run as a script (python util/csv_to_json.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
+
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
 os.makedirs(log_dir, exist_ok=True)
@@ -28,9 +34,7 @@ except Exception as e:
     raise
 
 try:
-    os.makedirs("files", exist_ok=True)
-    with open(output_path, "w") as f:
-        json.dump(symbols, f, indent=2)
+    json_store.write_json(output_path, symbols, pretty=True)
     logger.info(f"Saved {len(symbols)} symbols to {output_path}")
 except Exception as e:
     logger.error(f"Error saving JSON file: {e}")
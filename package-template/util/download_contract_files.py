@@ -1,22 +1,135 @@
+import hashlib
 import os
+import logging
 import requests
+from datetime import datetime
+import sys
 
-files_dir = os.path.join(os.path.dirname(__file__), "../files")
-os.makedirs(files_dir, exist_ok=True)
+if __package__ in (None, ""):
+    # Run as a script (python util/download_contract_files.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-urls = {
+from util import instruments, json_store
+
+# --- Constants and Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTRACT_DIR = os.path.join(BASE_DIR, "..", "static") # Single location for contract files; instruments.py reads NSEEQ.json from here
+CONTRACT_META_PATH = os.path.join(CONTRACT_DIR, "contract_files.json") # ETag, Last-Modified and SHA-256 of each synced file
+NSEEQ_PATH = os.path.join(CONTRACT_DIR, "NSEEQ.json")
+CONTRACT_URLS = {
     "NSEEQ.json": "https://api.iiflcapital.com/v1/contractfiles/NSEEQ.json",
     "BSEEQ.json": "https://api.iiflcapital.com/v1/contractfiles/BSEEQ.json"
 }
+CHUNK_SIZE = 1024 * 1024
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
 
-for filename, url in urls.items():
-    output_path = os.path.join(files_dir, filename)
+setup_logging()
+
+def load_contract_meta():
+    if not os.path.exists(CONTRACT_META_PATH):
+        return {}
     try:
-        print(f"Downloading {filename} ...")
-        response = requests.get(url)
+        return json_store.read_json(CONTRACT_META_PATH)
+    except (json_store.JSONDecodeError, IOError) as e:
+        logger.warning(f"Ignoring unreadable contract metadata: {e}")
+        return {}
+
+def save_contract_meta(meta):
+    json_store.write_json(CONTRACT_META_PATH, meta, pretty=True)
+
+def _validate_contract_file(path):
+    """Checks the downloaded file is a non-empty JSON list of contracts with trading symbols."""
+    contracts = json_store.read_json(path)
+    if not isinstance(contracts, list) or not contracts or not any(c.get('tradingSymbol') for c in contracts[:100]):
+        raise ValueError("contract file is empty or not a list of contracts")
+    return len(contracts)
+
+def sync_contract_file(filename, url, meta, timeout=60):
+    """
+    Downloads one contract file only if the server copy changed since the last sync.
+    Sends If-None-Match / If-Modified-Since from the stored metadata and accepts gzip. The body is written
+    to a temporary file, validated and compared by SHA-256 before atomically replacing the current file.
+    Returns "not_modified", "unchanged" or "updated".
+    """
+    output_path = os.path.join(CONTRACT_DIR, filename)
+    previous = meta.get(filename, {}) if os.path.exists(output_path) else {}
+    headers = {"Accept-Encoding": "gzip"}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            logger.info(f"{filename}: not modified since last sync.")
+            return "not_modified"
         response.raise_for_status()
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-        print(f"Saved {filename} to {output_path}")
-    except Exception as e:
-        print(f"Failed to download {filename}: {e}")
\ No newline at end of file
+        tmp_path = output_path + ".tmp"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE): # Decompressed transparently when served gzipped
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            contract_count = _validate_contract_file(tmp_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        sha256 = digest.hexdigest()
+        meta[filename] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "size": size,
+            "contracts": contract_count,
+            "synced_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if previous.get("sha256") == sha256:
+            os.remove(tmp_path)
+            logger.info(f"{filename}: downloaded but content unchanged ({size} bytes).")
+            return "unchanged"
+        os.replace(tmp_path, output_path)
+        logger.info(f"{filename}: updated with {contract_count} contracts ({size} bytes, encoding {response.headers.get('Content-Encoding', 'identity')}).")
+        return "updated"
+
+def sync_contract_files(filenames=None):
+    """Syncs the contract files and rebuilds the instrument index if NSEEQ.json changed. Returns (success, message)."""
+    os.makedirs(CONTRACT_DIR, exist_ok=True)
+    meta = load_contract_meta()
+    statuses, errors = {}, []
+    for filename in filenames or CONTRACT_URLS:
+        try:
+            statuses[filename] = sync_contract_file(filename, CONTRACT_URLS[filename], meta)
+        except Exception as e:
+            logger.error(f"Failed to sync {filename}: {e}")
+            errors.append(filename)
+    save_contract_meta(meta)
+    if statuses.get("NSEEQ.json") == "updated":
+        instruments.invalidate_instrument_index()
+        instruments.load_instrument_index(NSEEQ_PATH)
+    summary = ", ".join(f"{name}: {status}" for name, status in statuses.items())
+    if errors:
+        return False, f"Failed to sync {', '.join(errors)}. {summary}".strip()
+    return True, f"Contract files synced. {summary}"
+
+if __name__ == "__main__":
+    success, message = sync_contract_files()
+    print(f"Success: {success}, Message: {message}")
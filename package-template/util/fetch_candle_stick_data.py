@@ -1,8 +1,15 @@
 import os
-import json
 import requests
 import logging
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/fetch_candle_stick_data.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import candle_store, circuit_breaker, instruments, json_store
 
 # --- Constants and Path Setup ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,6 +18,21 @@ AUTH_TOKEN_PATH = os.path.join(BASE_DIR, "..", "files", "auth_token.txt")
 HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json") # This path remains in files
 NSEEQ_PATH = os.path.join(BASE_DIR, "..", "static", "NSEEQ.json") # Updated path to static
 
+# Periods for percentage change calculations (approximate trading days)
+PERCENTAGE_PERIODS = {
+    "1w": 5,
+    "14d": 10, # Changed from 14 to 10 for more accurate trading days in 2 weeks
+    "1m": 21,
+    "3m": 63,
+    "6m": 126,
+    "1y": 252,
+    "3y": 756
+}
+MAX_CONCURRENT_FETCHES = 4  # Candle requests in flight at once when filling the store for symbols outside the holdings
+# A run whose candle fetches failed for more than this share of the holdings fetched is a failed run:
+# its output is left next to the previous file (as <file>.tmp) instead of replacing it.
+MAX_FETCH_FAILURE_RATIO = 0.5
+
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
 
@@ -32,26 +54,54 @@ setup_logging()
 def load_json_file(file_path, description):
     """Generic function to load a JSON file with proper error handling."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_store.read_json(file_path)
     except FileNotFoundError:
         logger.error(f"{description} file not found at: {file_path}")
         raise
-    except json.JSONDecodeError:
+    except json_store.JSONDecodeError:
         logger.error(f"Error decoding JSON from {description} file: {file_path}")
         raise
 
 def get_instrument_id_map():
-    """Loads NSEEQ.json and creates a mapping from trading symbol to instrumentId."""
+    """Returns the mapping from trading symbol to instrumentId from the shared instrument index."""
     try:
-        contracts = load_json_file(NSEEQ_PATH, "NSE contracts")
-        id_map = {c['tradingSymbol']: c.get('instrumentId') for c in contracts if c.get('tradingSymbol') and c.get('exchange') == 'NSEEQ'}
+        id_map = instruments.get_instrument_id_map(NSEEQ_PATH)
         logger.info(f"Created instrument ID map with {len(id_map)} entries.")
         return id_map
     except Exception as e:
         logger.error(f"Failed to create instrument ID map: {e}")
         return {}
 
+def percentage_changes(closes):
+    """Percentage change of the last close against the close each period ago, or None without enough data."""
+    changes = {}
+    current_close = closes[-1] if closes else None
+    for label, days_count in PERCENTAGE_PERIODS.items():
+        if len(closes) > days_count:
+            past_close = closes[-days_count-1] # -1 for 0-indexed, -1 for previous day
+            if past_close != 0:
+                changes[label] = round(((current_close - past_close) / past_close) * 100, 2)
+            else:
+                changes[label] = None # Avoid division by zero
+        else:
+            changes[label] = None # Not enough data
+    return changes
+
+def too_many_fetch_failures(failed, attempted):
+    """True when more than MAX_FETCH_FAILURE_RATIO of the attempted candle fetches failed."""
+    return attempted > 0 and failed > attempted * MAX_FETCH_FAILURE_RATIO
+
+def is_candle_cache_current(trading_symbol):
+    """True when the symbol's candle cache was written today."""
+    path = candle_store.candle_path(trading_symbol)
+    return os.path.exists(path) and date.fromtimestamp(os.path.getmtime(path)) == date.today()
+
+def is_candle_data_current(holding):
+    """True when the holdings sync left the position unchanged and its candles were already fetched today."""
+    if holding.get("sync_state") != "unchanged" or not holding.get("historical_data"):
+        return False
+    return is_candle_cache_current(holding.get("nseTradingSymbol", ""))
+
 def fetch_candle_stick_data():
     """Fetches historical candle data for each holding and updates the holding file."""
     logger.info("Starting to fetch candle stick data for holdings...")
@@ -80,35 +130,39 @@ def fetch_candle_stick_data():
     if not isinstance(holdings, list):
         return False, "Holdings data is not in the expected list format."
 
-    # Define periods for percentage change calculations (approximate trading days)
-    periods = {
-        "1w": 5,
-        "14d": 10, # Changed from 14 to 10 for more accurate trading days in 2 weeks
-        "1m": 21,
-        "3m": 63,
-        "6m": 126,
-        "1y": 252,
-        "3y": 756
-    }
-
     to_date = datetime.now()
     from_date = to_date - timedelta(days=3*365 + 90) # ~3 years and 3 months of calendar days
     to_date_str, from_date_str = to_date.strftime("%d-%b-%Y").lower(), from_date.strftime("%d-%b-%Y").lower()
 
+    # Every fetch goes through the historical-data breaker, so an endpoint that is down opens the
+    # circuit and the remaining holdings are not requested until it has had time to recover.
+    breaker = circuit_breaker.breaker(circuit_breaker.IIFL_HISTORICAL_DATA)
+    skipped = attempted = failed = 0
     for holding in holdings:
         trading_symbol = holding.get("nseTradingSymbol")
         if not trading_symbol or not (instrument_id := instrument_id_map.get(trading_symbol)):
             logger.warning(f"Skipping holding due to missing symbol or instrumentId: {holding.get('bseTradingSymbol', 'N/A')}")
             continue
+        if is_candle_data_current(holding):
+            skipped += 1
+            continue
             
         payload = {"exchange": "NSEEQ", "instrumentId": str(instrument_id), "interval": "1 day", "fromDate": from_date_str, "toDate": to_date_str}
-        
+        attempted += 1
+        if not breaker.allow():
+            logger.warning(f"Skipping candles for {trading_symbol}: {breaker.name} circuit is open ({breaker.last_error})")
+            failed += 1
+            continue
+
         try:
             logger.debug(f"Fetching data for {trading_symbol} (ID: {instrument_id})")
             response = requests.post(url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
+            breaker.record_success()
             
-            candles_raw = response.json().get("result", [{}])[0].get("candles", []) # Candles are [timestamp, open, high, low, close, volume]
+            response_data = response.json()
+            candle_store.save_candles(trading_symbol, response_data) # Keep a per-symbol copy for panel-based analytics
+            candles_raw = response_data.get("result", [{}])[0].get("candles", []) # Candles are [timestamp, open, high, low, close, volume]
             formatted_candles = [{"high": c[2], "low": c[3], "close": c[4]} for c in candles_raw if len(c) >= 5]
             
             holding["historical_data"] = formatted_candles # Store all fetched candles
@@ -123,42 +177,86 @@ def fetch_candle_stick_data():
             holding["purchase_price"] = holding.get("averageTradedPrice", 0)
 
             # Calculate percentage changes for various periods
-            holding["percentage_changes"] = {}
-            current_close = holding["last_close"]
-
-            for label, days_count in periods.items():
-                if len(formatted_candles) > days_count:
-                    past_close = formatted_candles[-days_count-1]['close'] # -1 for 0-indexed, -1 for previous day
-                    if past_close != 0:
-                        pct_change = ((current_close - past_close) / past_close) * 100
-                        holding["percentage_changes"][label] = round(pct_change, 2)
-                    else:
-                        holding["percentage_changes"][label] = None # Avoid division by zero
-                else:
-                    holding["percentage_changes"][label] = None # Not enough data
+            holding["percentage_changes"] = percentage_changes([c['close'] for c in formatted_candles])
 
             logger.info(f"Successfully fetched {len(formatted_candles)} candles for {trading_symbol}. Calculated percentage changes: {holding['percentage_changes']}")
 
         except requests.exceptions.RequestException as e:
             logger.error(f"API error fetching data for {trading_symbol}: {e}")
+            breaker.record_failure(e)
+            failed += 1
             holding["historical_data"] = [] # Clear data on error
             holding["percentage_changes"] = {} # Clear changes on error
             holding["highest_price_in_period"] = holding.get("previousDayClose", 0) # Fallback
         except Exception as e:
             logger.error(f"Unexpected error processing {trading_symbol} candle data: {e}")
+            failed += 1
             holding["historical_data"] = []
             holding["percentage_changes"] = {}
             holding["highest_price_in_period"] = holding.get("previousDayClose", 0) # Fallback
 
+    if too_many_fetch_failures(failed, attempted):
+        # Keep the last good holdings (and the ATR report built from them) instead of placeholders.
+        try:
+            json_store.write_json(HOLDING_PATH + ".tmp", holdings_data)
+        except IOError as e:
+            logger.error(f"Failed to save the partial holdings file: {e}")
+        msg = f"Candle fetch failed for {failed}/{attempted} holdings; kept the previous {HOLDING_PATH}."
+        logger.error(msg)
+        return False, msg
     try:
-        with open(HOLDING_PATH, 'w', encoding='utf-8') as f:
-            json.dump(holdings_data, f, indent=2)
-        logger.info(f"Updated holdings data with candle information and percentage changes saved to {HOLDING_PATH}")
-        return True, "Successfully fetched candle stick data and calculated percentage changes."
+        json_store.write_json(HOLDING_PATH, holdings_data)
+        logger.info(f"Updated holdings data with candle information and percentage changes saved to {HOLDING_PATH} ({skipped} unchanged holdings already current)")
+        return True, f"Successfully fetched candle stick data and calculated percentage changes ({failed}/{attempted} fetches failed)."
     except IOError as e:
         logger.error(f"Failed to save updated holdings file: {e}")
         return False, "Failed to save updated holdings file."
 
+def fetch_symbol_candles(trading_symbols, max_workers=MAX_CONCURRENT_FETCHES):
+    """
+    Fills the candle store for symbols outside the holdings (the universe screen, Nifty 200 candidates),
+    fetching only those whose cache was not written today, a few at a time.
+    Returns (success, message); fails only when candles were needed and none could be fetched.
+    """
+    trading_symbols = list(dict.fromkeys(trading_symbols))
+    stale = [s for s in trading_symbols if not is_candle_cache_current(s)]
+    if not stale:
+        return True, f"Candles for all {len(trading_symbols)} symbols already fetched today."
+    try:
+        config = load_json_file(CONFIG_PATH, "Config")
+        with open(AUTH_TOKEN_PATH, 'r') as f:
+            token = f.read().strip()
+        if not token:
+            return False, "Auth token is missing or empty."
+    except Exception as e:
+        return False, f"Failed during initial setup: {e}"
+    base_url = config.get("IIFL_BASE_URL")
+    endpoint = config.get("HISTORICAL_DATA_ENDPOINT")
+    if not base_url or not endpoint:
+        return False, "Historical data API URL or endpoint not found in config."
+    url = base_url + endpoint
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    instrument_id_map = get_instrument_id_map()
+
+    def fetch(trading_symbol):
+        instrument_id = instrument_id_map.get(trading_symbol)
+        if not instrument_id:
+            logger.warning(f"Skipping candle fetch for {trading_symbol}: instrumentId not found")
+            return False
+        try:
+            candle_store.fetch_candles(url, headers, trading_symbol, instrument_id)
+            return True
+        except Exception as e:
+            logger.error(f"API error fetching candles for {trading_symbol}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fetched = sum(pool.map(fetch, stale))
+    msg = (f"Fetched candles for {fetched}/{len(stale)} symbols without a cache from today "
+           f"({len(trading_symbols) - len(stale)} already current).")
+    logger.info(msg)
+    return fetched > 0, msg
+
 if __name__ == "__main__":
     success, message = fetch_candle_stick_data()
     print(f"Success: {success}, Message: {message}")
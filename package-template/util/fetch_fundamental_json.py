@@ -1,13 +1,18 @@
-import json
 import yfinance as yf
 import os
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/fetch_fundamental_json.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
 
 base_dir = os.path.dirname(__file__)
 holding_path = os.path.join(base_dir, '../files/holding.json')
 
 # Load your holdings
-with open(holding_path, "r", encoding="utf-8") as f:
-    holdings = json.load(f)["result"]
+holdings = json_store.read_json(holding_path)["result"]
 
 # Prepare a list of NSE symbols (add .NS for yfinance)
 symbols = []
@@ -46,7 +51,6 @@ for sym in symbols:
 
 # Save as JSON
 output_path = os.path.join(os.path.dirname(__file__), "../files/fundamental_holdings.json")
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(fundamentals, f, indent=2)
+json_store.write_json(output_path, fundamentals, pretty=True)
 
 print(f"Fundamental data saved to {output_path}")
\ No newline at end of file
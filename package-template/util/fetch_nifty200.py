@@ -1,11 +1,17 @@
 import requests
 import pandas as pd
-import json
 import os
+import sys
 import logging
 import yfinance as yf
 from datetime import datetime, timedelta
 
+if __package__ in (None, ""):
+    # Run as a script (python util/fetch_nifty200.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
+
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
 os.makedirs(log_dir, exist_ok=True)
@@ -79,9 +85,7 @@ for symbol in symbols:
         logger.warning(f"{symbol}: Error fetching or processing data: {e}")
 
 try:
-    os.makedirs("files", exist_ok=True)
-    with open(output_path, "w") as f:
-        json.dump(results, f, indent=2)
+    json_store.write_json(output_path, results, pretty=True)
     logger.info(f"Saved {len(results)} Nifty 200 stocks with change stats to {output_path}")
 except Exception as e:
     logger.error(f"Failed to save JSON file: {e}")
@@ -0,0 +1,100 @@
+import os
+import logging
+
+from util import json_store
+
+# --- Constants and Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNDAMENTALS_PATH = os.path.join(BASE_DIR, "..", "files", "fundamental_holdings.json")
+UNIVERSE_FUNDAMENTALS_PATH = os.path.join(BASE_DIR, "..", "files", "fundamental_universe.json")
+
+# yfinance .info keys kept for screening the wider universe.
+UNIVERSE_INFO_KEYS = [
+    "sector", "industry", "marketCap", "trailingPE", "priceToBook",
+    "earningsQuarterlyGrowth", "revenueGrowth", "returnOnEquity", "debtToEquity",
+]
+
+# Columns shown in the fundamentals report, as (key in fundamentals JSON, column header).
+REPORT_COLUMNS = [
+    ("symbol", "Symbol"),
+    ("name", "Name"),
+    ("currentPrice", "CMP"),
+    ("peRatio", "P/E"),
+    ("marketCap", "Market Cap"),
+    ("dividendYield", "Div Yld"),
+    ("netProfit", "Net Profit"),
+    ("roe", "ROE"),
+    ("debtToEquity", "Debt/Eq"),
+    ("pbRatio", "P/B"),
+    ("eps", "EPS"),
+]
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# In-process cache: path -> (file signature, parsed data, report rows)
+_cache = {}
+
+def file_signature(path):
+    """Returns (mtime_ns, size) for a file, used to detect when its content changed."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _load(path):
+    """Parses the fundamentals file, reusing the cached result while the file is unchanged."""
+    signature = file_signature(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == signature:
+        return cached
+
+    logger.debug(f"Loading fundamentals from {path}")
+    fundamentals = json_store.read_json(path)
+
+    # Pre-build the report rows once per file version so rendering is a plain loop.
+    rows = []
+    for yf_symbol, fund in fundamentals.items():
+        cells = [fund.get(key, "") for key, _ in REPORT_COLUMNS]
+        if not cells[0]:
+            cells[0] = yf_symbol
+        rows.append(tuple(cells))
+
+    cached = (signature, fundamentals, rows)
+    _cache[path] = cached
+    logger.info(f"Loaded fundamentals for {len(fundamentals)} symbols from {path}")
+    return cached
+
+def load_fundamentals(path=FUNDAMENTALS_PATH):
+    """Returns the fundamentals dict keyed by yfinance symbol (e.g. 'RELIANCE.NS')."""
+    return _load(path)[1]
+
+def load_universe_fundamentals(path=UNIVERSE_FUNDAMENTALS_PATH):
+    """Returns the cached universe fundamentals keyed by trading symbol, or {} if none were saved yet."""
+    if not os.path.exists(path):
+        return {}
+    return _load(path)[1]
+
+def save_universe_fundamentals(fundamentals, path=UNIVERSE_FUNDAMENTALS_PATH):
+    """Writes the universe fundamentals cache."""
+    json_store.write_json(path, fundamentals, compression=json_store.ARTIFACT_COMPRESSION)
+    logger.info(f"Saved fundamentals for {len(fundamentals)} symbols to {path}")
+
+def fundamental_report_rows(path=FUNDAMENTALS_PATH):
+    """Returns (version, rows) for the fundamentals report; version changes with the source file."""
+    signature, _, rows = _load(path)
+    version = f"{signature[0]:x}-{signature[1]:x}"
+    return version, rows
@@ -1,106 +1,31 @@
-import json
-import yfinance as yf
-import os
-
-# Load your holdings
-with open("../files/holding.json", "r") as f:
-    holdings = json.load(f)["result"]
-
-# Prepare a list of NSE symbols (add .NS for yfinance)
-symbols = []
-symbol_map = {}
-for h in holdings:
-    symbol = h.get("nseTradingSymbol", "")
-    if symbol:
-        yf_symbol = symbol.replace("-EQ", "") + ".NS"
-        symbols.append(yf_symbol)
-        symbol_map[yf_symbol] = h
-
-# Fetch data from yfinance
-fundamentals = {}
-for sym in symbols:
-    try:
-        t = yf.Ticker(sym)
-        info = t.info
-        fundamentals[sym] = {
-            "name": info.get("shortName", ""),
-            "currentPrice": info.get("currentPrice", ""),
-            "peRatio": info.get("trailingPE", ""),
-            "marketCap": info.get("marketCap", ""),
-            "dividendYield": info.get("dividendYield", ""),
-            "netProfit": info.get("netIncomeToCommon", ""),
-            "roe": info.get("returnOnEquity", ""),
-            "debtToEquity": info.get("debtToEquity", ""),
-            "pbRatio": info.get("priceToBook", ""),
-            "eps": info.get("trailingEps", ""),
-            "promoterHolding": "",  # Not available in yfinance
-        }
-    except Exception as e:
-        fundamentals[sym] = {"name": sym, "error": str(e)}
-
-# Generate HTML
-html = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Fundamental Analysis</title>
-    <style>
-        table { border-collapse: collapse; width: 100%; }
-        th, td { border: 1px solid #ccc; padding: 8px; }
-        th { background: #0074d9; color: #fff; }
-        tr:nth-child(even) { background: #f2f7fb; }
-        tr:nth-child(odd) { background: #fff; }
-    </style>
-</head>
-<body>
-<h2>Fundamental Analysis of Holdings</h2>
-<table>
-<thead>
-<tr>
-    <th>Symbol</th>
-    <th>Name</th>
-    <th>CMP</th>
-    <th>P/E</th>
-    <th>Market Cap</th>
-    <th>Div Yld</th>
-    <th>Net Profit</th>
-    <th>ROE</th>
-    <th>Debt/Eq</th>
-    <th>P/B</th>
-    <th>EPS</th>
-</tr>
-</thead>
-<tbody>
-"""
-
-for sym in symbols:
-    f = fundamentals.get(sym, {})
-    h = symbol_map[sym]
-    html += "<tr>"
-    html += f"<td>{h.get('nseTradingSymbol','')}</td>"
-    html += f"<td>{f.get('name','')}</td>"
-    html += f"<td>{f.get('currentPrice','')}</td>"
-    html += f"<td>{f.get('peRatio','')}</td>"
-    html += f"<td>{f.get('marketCap','')}</td>"
-    html += f"<td>{f.get('dividendYield','')}</td>"
-    html += f"<td>{f.get('netProfit','')}</td>"
-    html += f"<td>{f.get('roe','')}</td>"
-    html += f"<td>{f.get('debtToEquity','')}</td>"
-    html += f"<td>{f.get('pbRatio','')}</td>"
-    html += f"<td>{f.get('eps','')}</td>"
-    html += "</tr>"
-
-html += """
-</tbody>
-</table>
-</body>
-</html>
-"""
-
-# Save HTML
-output_path = os.path.join(os.path.dirname(__file__), "../files/fundamental_holdings.html")
-with open(output_path, "w", encoding="utf-8") as f:
-    f.write(html)
-
-print(f"Fundamental analysis HTML generated at {output_path}")
\ No newline at end of file
+import os
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/generate_fundamental_html.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.fundamentals import FUNDAMENTALS_PATH, REPORT_COLUMNS, fundamental_report_rows
+
+# Renders the same template the Flask app serves at /fundamentals, from the JSON
+# written by fetch_fundamental_json.py, so no data is fetched again here.
+# Run from the project root: python -m util.generate_fundamental_html
+base_dir = os.path.dirname(os.path.abspath(__file__))
+templates_dir = os.path.join(base_dir, "..", "templates")
+output_path = os.path.join(base_dir, "../files/fundamental_holdings.html")
+
+if not os.path.exists(FUNDAMENTALS_PATH):
+    print("Fundamentals not available yet. Run util/fetch_fundamental_json.py first.")
+elif os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(FUNDAMENTALS_PATH):
+    print(f"Fundamental analysis HTML is up to date at {output_path}")
+else:
+    env = Environment(loader=FileSystemLoader(templates_dir), autoescape=select_autoescape(["html"]))
+    template = env.get_template("fundamental_report.html")
+    _, rows = fundamental_report_rows()
+
+    # Stream the rendered chunks straight to disk instead of building one big string.
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(template.generate(columns=REPORT_COLUMNS, rows=rows))
+
+    print(f"Fundamental analysis HTML generated at {output_path}")
@@ -1,7 +1,14 @@
 import os
 import requests
-import json
 import logging
+from datetime import date
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/getPortfolioHoldings.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
 
 # --- Constants and Path Setup ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -9,6 +16,11 @@ CONFIG_PATH = os.path.join(BASE_DIR, "..", "configs", "config.json")
 AUTH_TOKEN_PATH = os.path.join(BASE_DIR, "..", "files", "auth_token.txt")
 HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json")
 
+# A position counts as changed when any of these broker fields differ; market fields such as
+# previousDayClose are refreshed in place without marking the position for reprocessing.
+POSITION_FIELDS = ("totalQuantity", "averageTradedPrice", "product", "nseTradingSymbol", "bseTradingSymbol")
+MAX_CLOSED_POSITIONS = 200 # Most recent closed positions kept in holding.json
+
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
 
@@ -31,15 +43,85 @@ setup_logging()
 def load_config():
     """Load configuration from JSON file."""
     try:
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
+        return json_store.read_json(CONFIG_PATH)
     except FileNotFoundError:
         logger.error(f"Configuration file not found at {CONFIG_PATH}")
         raise
-    except json.JSONDecodeError:
+    except json_store.JSONDecodeError:
         logger.error(f"Error decoding JSON from {CONFIG_PATH}")
         raise
 
+def load_stored_holdings():
+    """Returns the previously saved holdings file, or None if there is none or it is unreadable."""
+    if not os.path.exists(HOLDING_PATH):
+        return None
+    try:
+        return json_store.read_json(HOLDING_PATH)
+    except (json_store.JSONDecodeError, IOError) as e:
+        logger.warning(f"Ignoring unreadable stored holdings: {e}")
+        return None
+
+def _trading_symbol(position):
+    return position.get("nseTradingSymbol") or position.get("bseTradingSymbol")
+
+def merge_holdings(stored, fresh, today=None):
+    """
+    Merges a fresh holdings response into the stored holdings by ISIN, or by trading symbol where
+    either side has no ISIN. Stored positions keep their derived fields (historical_data, percentage_changes, status, ...) and take
+    the fresh broker fields; each gets a sync_state of "new", "changed" or "unchanged", and positions new since the
+    last sync a first_seen date that later runs keep. On the first sync (nothing stored) first_seen
+    is left null, since those positions may have been bought long before. Positions no longer held move to the "closed" list with the
+    date they disappeared.
+    Returns (merged holdings data, {state: count}).
+    """
+    today = (today or date.today()).isoformat()
+    first_sync = not stored
+    stored = stored or {}
+    previous = stored.get("result", [])
+    by_isin = {h["isin"]: i for i, h in enumerate(previous) if h.get("isin")}
+    by_symbol = {_trading_symbol(h): i for i, h in enumerate(previous) if _trading_symbol(h)}
+    for h in previous:
+        if not h.get("isin") and not _trading_symbol(h):
+            logger.warning(f"Stored position without ISIN or trading symbol cannot be matched; moving it to closed: {h}")
+    matched = set()
+    merged_positions = []
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "closed": 0}
+    for item in fresh.get("result", []):
+        index = by_isin.get(item.get("isin")) if item.get("isin") else None
+        if index is None:
+            candidate = by_symbol.get(_trading_symbol(item))
+            # Fall back to the symbol only when an ISIN is missing; two different ISINs are different instruments.
+            if candidate is not None and not (item.get("isin") and previous[candidate].get("isin")):
+                index = candidate
+        old = None
+        if index is not None and index not in matched:
+            matched.add(index)
+            old = previous[index]
+        if old is None:
+            # The broker reports no purchase date; the day a position first shows up stands in for it.
+            position, state = dict(item), "new"
+            position["first_seen"] = None if first_sync else today
+        else:
+            state = "unchanged" if all(old.get(k) == item.get(k) for k in POSITION_FIELDS) else "changed"
+            position = {**old, **item}
+            if state == "changed" and "purchase_price" in position:
+                position["purchase_price"] = item.get("averageTradedPrice", position["purchase_price"])
+        position["sync_state"] = state
+        counts[state] += 1
+        merged_positions.append(position)
+
+    closed = []
+    for old in (h for i, h in enumerate(previous) if i not in matched):
+        # Derived data is dropped for closed positions; only the broker fields are kept for reference.
+        entry = {k: v for k, v in old.items() if k not in ("historical_data", "percentage_changes", "sync_state")}
+        entry["closed_on"] = today
+        closed.append(entry)
+    counts["closed"] = len(closed)
+
+    merged = {**fresh, "result": merged_positions}
+    merged["closed"] = (closed + stored.get("closed", []))[:MAX_CLOSED_POSITIONS]
+    return merged, counts
+
 def get_portfolio_holdings():
     """
     Fetches portfolio holdings from the IIFL API and saves them to a file.
@@ -86,13 +168,17 @@ def get_portfolio_holdings():
         logger.error(f"Error while fetching Portfolio Holdings: {e}")
         return False, f"API error while fetching holdings: {e}"
 
-    # 4. Save the holdings data to a file
+    if not isinstance(holdings_data.get("result"), list):
+        logger.error(f"Unexpected holdings response: {holdings_data.get('message')}")
+        return False, "Holdings response is not in the expected list format."
+
+    # 4. Merge with the stored holdings and save atomically
     try:
-        os.makedirs(os.path.dirname(HOLDING_PATH), exist_ok=True)
-        with open(HOLDING_PATH, "w") as f:
-            json.dump(holdings_data, f, indent=2)
-        logger.info(f"Portfolio holdings saved to {HOLDING_PATH}")
-        return True, "Portfolio holdings fetched and saved successfully."
+        merged, counts = merge_holdings(load_stored_holdings(), holdings_data)
+        json_store.write_json(HOLDING_PATH, merged)
+        summary = ", ".join(f"{n} {state}" for state, n in counts.items())
+        logger.info(f"Portfolio holdings merged and saved to {HOLDING_PATH}: {summary}")
+        return True, f"Portfolio holdings fetched and saved successfully ({summary})."
     except (IOError, TypeError) as e:
         logger.error(f"Error while saving Portfolio Holdings: {e}")
         return False, "Error while saving portfolio holdings to file."
@@ -1,9 +1,15 @@
-import json
 import os
 import hashlib
 import requests
 import logging
 import datetime
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/getUserSession.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store
 
 # --- Constants and Path Setup ---
 # Construct absolute paths from the script's location to avoid relative path issues.
@@ -39,12 +45,11 @@ def load_config():
     """Load configuration from JSON file."""
     try:
         logger.debug(f"Loading config from {CONFIG_PATH}")
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
+        return json_store.read_json(CONFIG_PATH)
     except FileNotFoundError:
         logger.error(f"Configuration file not found at {CONFIG_PATH}")
         raise
-    except json.JSONDecodeError:
+    except json_store.JSONDecodeError:
         logger.error(f"Error decoding JSON from {CONFIG_PATH}")
         raise
     except Exception as e:
@@ -55,8 +60,7 @@ def save_config(config):
     """Save configuration to JSON file."""
     try:
         logger.debug(f"Saving config to {CONFIG_PATH}")
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(config, f, indent=2)
+        json_store.write_json(CONFIG_PATH, config, pretty=True) # Edited by hand, so kept readable
         logger.info(f"Config saved successfully to {CONFIG_PATH}")
     except Exception as e:
         logger.error(f"Failed to save config: {e}")
@@ -79,7 +83,7 @@ def get_user_session(config, auth_code):
     logger.debug(f"Request payload: {payload}")
     
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+        response = requests.post(url, headers=headers, data=json_store.dumps(payload), timeout=30)
         logger.info(f"Session request response status: {response.status_code}")
         logger.debug(f"Session response text: {response.text}")
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
@@ -0,0 +1,64 @@
+import os
+import logging
+
+from util import json_store
+
+# --- Constants and Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NSEEQ_PATH = os.path.join(BASE_DIR, "..", "static", "NSEEQ.json")
+EQUITY_SERIES_SUFFIX = "-EQ"
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# In-process index: path -> (file signature, {tradingSymbol: contract})
+_index_cache = {}
+
+def load_instrument_index(path=NSEEQ_PATH):
+    """
+    Returns {tradingSymbol: contract} for NSEEQ contracts.
+    The contract file is parsed once and re-read only when it changes on disk.
+    """
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _index_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    contracts = json_store.read_json(path)
+    index = {c['tradingSymbol']: c for c in contracts if c.get('tradingSymbol') and c.get('exchange') == 'NSEEQ'}
+    _index_cache[path] = (signature, index)
+    logger.info(f"Built instrument index with {len(index)} entries from {path}")
+    return index
+
+def invalidate_instrument_index():
+    """Drops the in-process index so the next lookup re-reads the contract file."""
+    _index_cache.clear()
+
+def get_instrument_id_map(path=NSEEQ_PATH):
+    """Returns {tradingSymbol: instrumentId} for NSEEQ contracts."""
+    return {symbol: c.get('instrumentId') for symbol, c in load_instrument_index(path).items()}
+
+def get_instrument_id(trading_symbol, path=NSEEQ_PATH):
+    """Returns the instrumentId for a trading symbol (e.g. 'RELIANCE-EQ'), or None if unknown."""
+    contract = load_instrument_index(path).get(trading_symbol)
+    return contract.get('instrumentId') if contract else None
+
+def equity_universe(path=NSEEQ_PATH):
+    """Returns the trading symbols of every equity-series (-EQ) NSE instrument."""
+    return [symbol for symbol in load_instrument_index(path) if symbol.endswith(EQUITY_SERIES_SUFFIX)]
@@ -0,0 +1,179 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from util import instruments, json_store, market_snapshot, relative_strength, screening_rules
+from util.fundamentals import UNIVERSE_FUNDAMENTALS_PATH, file_signature, load_universe_fundamentals
+
+# --- Configuration ---
+# Threshold parameters accepted by /screen as (query name, type, default). Defaults match the
+# nifty200_fundamentals and nifty200_technicals rules and the sector cap of mark_nifty200_buy.
+SCREEN_PARAMS = [
+    ("min_eps_growth", float, 0.05),     # earningsQuarterlyGrowth, as a fraction
+    ("min_roe", float, 0.10),            # returnOnEquity, as a fraction
+    ("max_debt_to_equity", float, 1.0),  # debtToEquity
+    ("max_pct_from_high", float, 10.0),  # Percent below the 52-week high
+    ("max_per_sector", int, 15),
+    ("min_rs_score", float, None),     # Composite relative-strength percentile, 0-100; not applied when omitted
+]
+UNIVERSES = ("all", "nifty200")
+RESULT_CACHE_SIZE = 128          # Parameter sets kept per process
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NIFTY200_PATH = os.path.join(BASE_DIR, "..", "static", "nifty200.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# In-process caches: the joined screening table for the current data version, and screen results
+# keyed by (data version, universe, parameters), least recently used evicted first.
+_table_cache = {}
+_results = OrderedDict()
+_lock = threading.Lock()
+
+def parse_screen_params(args):
+    """
+    Reads the thresholds and universe from a mapping of query arguments, filling in defaults.
+    Raises ValueError for values that do not parse, are not finite (nan, inf) or are out of range.
+    """
+    params = {}
+    for name, kind, default in SCREEN_PARAMS:
+        raw = args.get(name)
+        if raw is None or raw == "":
+            params[name] = default
+            continue
+        try:
+            params[name] = kind(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"Parameter '{name}' must be a {kind.__name__}, got '{raw}'.")
+        # float() accepts "nan" and "inf", which would slip past the range checks and into the rule.
+        if isinstance(params[name], float) and not math.isfinite(params[name]):
+            raise ValueError(f"Parameter '{name}' must be a finite number, got '{raw}'.")
+    if params["max_per_sector"] < 1:
+        raise ValueError("Parameter 'max_per_sector' must be at least 1.")
+    if params["min_rs_score"] is not None and not 0 <= params["min_rs_score"] <= 100:
+        raise ValueError("Parameter 'min_rs_score' must be between 0 and 100.")
+    if params["max_pct_from_high"] < 0:
+        raise ValueError("Parameter 'max_pct_from_high' must not be negative.")
+    universe = args.get("universe") or "all"
+    if universe not in UNIVERSES:
+        raise ValueError(f"Parameter 'universe' must be one of {', '.join(UNIVERSES)}.")
+    params["universe"] = universe
+    return params
+
+def screen_rule(params):
+    """The screening rule expression for a parameter set."""
+    rule = (f"earningsQuarterlyGrowth >= {params['min_eps_growth']!r} and returnOnEquity >= {params['min_roe']!r}"
+            f" and debtToEquity <= {params['max_debt_to_equity']!r} and pct_from_high >= {-params['max_pct_from_high']!r}")
+    if params.get("min_rs_score") is not None:
+        rule += f" and rs_score >= {params['min_rs_score']!r}"
+    return rule
+
+def data_version(snapshot_path=market_snapshot.SNAPSHOT_DB_PATH, fundamentals_path=UNIVERSE_FUNDAMENTALS_PATH):
+    """Changes whenever the market snapshot or the universe fundamentals cache is rewritten."""
+    try:
+        mtime_ns, size = file_signature(fundamentals_path)
+        fundamentals = f"{mtime_ns:x}-{size:x}"
+    except FileNotFoundError:
+        fundamentals = "none"
+    return f"{market_snapshot.snapshot_version(snapshot_path)}/{fundamentals}"
+
+def screening_table(version, snapshot_path=market_snapshot.SNAPSHOT_DB_PATH, fundamentals_path=UNIVERSE_FUNDAMENTALS_PATH):
+    """
+    Snapshot rows joined with the cached universe fundamentals, built once per data version.
+    Only symbols present in both are screenable; the fundamentals cache holds the symbols the
+    universe screen has looked up.
+    """
+    cached = _table_cache.get("table")
+    if cached and cached[0] == version:
+        return cached[1]
+    snapshot = relative_strength.with_scores(market_snapshot.load_snapshot(path=snapshot_path), snapshot_path)
+    fundamentals = pd.DataFrame.from_dict(load_universe_fundamentals(fundamentals_path), orient="index")
+    table = snapshot.join(fundamentals, how="inner") if not fundamentals.empty else snapshot.iloc[0:0]
+    # Closest to the 52-week high first, which is also the order the sector cap keeps.
+    table = table.sort_values("pct_from_high", ascending=False, kind="stable")
+    _table_cache["table"] = (version, table)
+    logger.info(f"Built screening table for data version {version}: {len(table)} symbols.")
+    return table
+
+def _nifty200_symbols(path=NIFTY200_PATH):
+    return {s + instruments.EQUITY_SERIES_SUFFIX for s in json_store.read_json(path)}
+
+def _value(x):
+    """JSON-safe cell value: missing numbers become None."""
+    return None if x is None or (isinstance(x, float) and pd.isna(x)) else x
+
+def _apply_screen(table, params):
+    if params["universe"] == "nifty200":
+        table = table[table.index.isin(_nifty200_symbols())]
+    passed = table[screening_rules.compile_rule(screen_rule(params)).evaluate(table)["passed"]]
+    results = []
+    sector_counts = {}
+    for symbol, row in passed.iterrows():
+        sector = _value(row.get("sector")) or "Unknown"
+        if sector_counts.get(sector, 0) >= params["max_per_sector"]:
+            continue
+        sector_counts[sector] = sector_counts.get(sector, 0) + 1
+        results.append({
+            "Symbol": symbol.replace(instruments.EQUITY_SERIES_SUFFIX, ""),
+            "Sector": sector,
+            "Last Close": _value(row["close"]),
+            "52W High": _value(row["high52w"]),
+            "Pct from High": _value(row["pct_from_high"]),
+            "EPS Growth": _value(row.get("earningsQuarterlyGrowth")),
+            "ROE": _value(row.get("returnOnEquity")),
+            "Debt/Equity": _value(row.get("debtToEquity")),
+            "RS Score": _value(row.get("rs_score")),
+            "As Of": row["as_of"],
+        })
+    return results
+
+def run_screen(params, snapshot_path=market_snapshot.SNAPSHOT_DB_PATH, fundamentals_path=UNIVERSE_FUNDAMENTALS_PATH):
+    """
+    Screens the locally stored snapshot and fundamentals with the given parameters (see
+    parse_screen_params). Results are cached per parameter set and data version, so repeating a
+    query, or going back to an earlier one, does not re-evaluate the screen until the data changes.
+    Returns a dict with the data version, parameters, results and whether they came from the cache.
+    """
+    started = time.perf_counter()
+    version = data_version(snapshot_path, fundamentals_path)
+    key = (version,) + tuple(sorted(params.items()))
+    with _lock:
+        results = _results.get(key)
+        cached = results is not None
+        if cached:
+            _results.move_to_end(key)
+        else:
+            table = screening_table(version, snapshot_path, fundamentals_path)
+            results = _apply_screen(table, params)
+            _results[key] = results
+            # Entries for an older data version can no longer be hit, so drop those first.
+            for stale in [k for k in _results if k[0] != version]:
+                del _results[stale]
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Screen {params} -> {len(results)} results in {elapsed_ms:.1f} ms ({'cached' if cached else 'evaluated'}).")
+    return {"data_version": version, "params": params, "count": len(results), "cached": cached,
+            "elapsed_ms": round(elapsed_ms, 2), "results": results}
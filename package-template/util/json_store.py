@@ -0,0 +1,232 @@
+import glob
+import gzip
+import json
+import math
+import os
+import sys
+import stat
+import time
+import logging
+import tempfile
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# --- Configuration ---
+# Compression for stored artifacts (candle caches, fundamentals, news, memos): "", "gzip" or "zstd".
+# Readers detect the format from the file's first bytes, so files keep their names and switching
+# this setting never strands existing caches. zstd needs the zstandard package and falls back to gzip.
+COMPRESSION_ENV = "STOCKAUTO_JSON_COMPRESSION"
+ARTIFACT_COMPRESSION = os.environ.get(COMPRESSION_ENV, "").lower()
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BACKEND = "orjson" if orjson is not None else "json"
+
+# mkstemp creates files as 0600; new files get the mode open() would give them instead. Read once at
+# import, since reading the umask means setting it.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+BENCHMARK_PATTERNS = ["files/holding.json", "files/atr.json", "static/NSEEQ.json", "files/*_candles.json",
+                      "recommendations/*.json"]
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+
+def _default(obj):
+    """Serializes the numpy scalars the pipelines produce; anything else is an error, as with json."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _finite(obj):
+    """obj with NaN and infinite floats replaced by None, which orjson does by itself (it writes null)."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _finite(obj.tolist())
+    if isinstance(obj, np.floating):
+        return _finite(float(obj))
+    return obj
+
+def dumps(obj, pretty=False):
+    """
+    Serializes obj to UTF-8 bytes: compact by default, two-space indented when pretty. NaN and
+    infinities are written as null with either backend, so the files stay valid JSON.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    obj = _finite(obj)
+    if pretty:
+        return json.dumps(obj, indent=2, default=_default, allow_nan=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), default=_default, allow_nan=False).encode("utf-8")
+
+def loads(data):
+    """Parses JSON from bytes or str."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Files written by json.dump may contain NaN/Infinity, which only the stdlib accepts.
+            pass
+    return json.loads(data)
+
+def _codec(compression):
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstd compression requested but zstandard is not installed; using gzip.")
+        return "gzip"
+    if compression not in ("", "gzip", "zstd"):
+        raise ValueError(f"Unknown compression '{compression}'")
+    return compression
+
+def compress(data, compression):
+    """Compresses bytes with the given codec ("" leaves them as they are)."""
+    codec = _codec(compression)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return data
+
+def decompress(data):
+    """Returns the raw JSON bytes of a plain, gzip or zstd file's content."""
+    try:
+        if data[:2] == GZIP_MAGIC:
+            return gzip.decompress(data)
+        if data[:4] == ZSTD_MAGIC:
+            if zstandard is None:
+                raise JSONDecodeError("zstd-compressed file but zstandard is not installed", "", 0)
+            return zstandard.ZstdDecompressor().decompress(data, max_output_size=1 << 31)
+    except (OSError, EOFError) as e:
+        raise JSONDecodeError(f"Corrupt compressed data: {e}", "", 0) from e
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise JSONDecodeError(f"Corrupt compressed data: {e}", "", 0) from e
+        raise
+    return data
+
+def read_json(path):
+    """
+    Loads a JSON file, plain or compressed. Raises FileNotFoundError if it is missing and
+    JSONDecodeError if it cannot be parsed, as json.load does.
+    """
+    with open(path, "rb") as f:
+        return loads(decompress(f.read()))
+
+def write_json(path, obj, pretty=False, compression=""):
+    """
+    Writes obj to path atomically (a uniquely named temporary file in the same directory, then
+    rename), compact unless pretty, and compressed when compression is "gzip" or "zstd". Concurrent
+    writers of the same file never share a temporary file; the last rename wins. A rewritten file keeps
+    its permissions; a new one gets 0666 less the umask, as with open(). Pass
+    ARTIFACT_COMPRESSION for stored artifacts that only this project reads; files served to browsers
+    or edited by hand stay plain.
+    """
+    data = compress(dumps(obj, pretty), compression)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def benchmark(paths=None, repeat=3):
+    """
+    Times reading and writing each file with the stdlib (indent=2, as the files used to be written)
+    against this layer (compact, plus each available compression codec). Writes go to memory so the
+    files themselves are untouched. Returns one dict per file with times in milliseconds and sizes in bytes.
+    """
+    if paths is None:
+        paths = sorted({p for pattern in BENCHMARK_PATTERNS for p in glob.glob(os.path.join(PROJECT_DIR, pattern))})
+    codecs = ["gzip"] + (["zstd"] if zstandard is not None else [])
+    results = []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = decompress(f.read())
+        obj = loads(raw)
+        text = raw.decode("utf-8")
+        row = {"file": os.path.relpath(path, PROJECT_DIR), "size": len(raw)}
+        row["stdlib_read_ms"], _ = _timed(lambda: json.loads(text), repeat)
+        row["stdlib_write_ms"], pretty = _timed(lambda: json.dumps(obj, indent=2), repeat)
+        row["stdlib_write_size"] = len(pretty.encode("utf-8"))
+        row[f"{BACKEND}_read_ms"], _ = _timed(lambda: loads(raw), repeat)
+        row[f"{BACKEND}_write_ms"], compact = _timed(lambda: dumps(obj), repeat)
+        row[f"{BACKEND}_write_size"] = len(compact)
+        for codec in codecs:
+            row[f"{codec}_write_ms"], packed = _timed(lambda: compress(dumps(obj), codec), repeat)
+            row[f"{codec}_read_ms"], _ = _timed(lambda: loads(decompress(packed)), repeat)
+            row[f"{codec}_size"] = len(packed)
+        results.append(row)
+    return results
+
+def print_benchmark(results):
+    """Prints benchmark() results as one line per file and measurement."""
+    for row in results:
+        print(f"{row['file']} ({row['size'] / 1024:.0f} KB)")
+        labels = ["stdlib", BACKEND] + [c for c in ("gzip", "zstd") if f"{c}_read_ms" in row]
+        for label in labels:
+            size = row.get(f"{label}_write_size", row.get(f"{label}_size"))
+            print(f"  {label:<7} read {row[f'{label}_read_ms']:8.2f} ms  write {row[f'{label}_write_ms']:8.2f} ms  "
+                  f"size {size / 1024:8.0f} KB")
+
+if __name__ == "__main__":
+    # Usage: python -m util.json_store [file ...]   (defaults to today's holdings, reports, contracts and candles)
+    print_benchmark(benchmark(sys.argv[1:] or None))
@@ -1,9 +1,18 @@
-import json
 import yfinance as yf
 import pandas as pd
 import os
 import logging
-import requests
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/mark_nifty200_buy.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import correlation, json_store, market_snapshot, relative_strength, screening_rules
+from util.candle_store import candle_path
+from util.download_contract_files import NSEEQ_PATH, sync_contract_files
+from util.fetch_candle_stick_data import fetch_symbol_candles
+from util.news_sentiment import get_sentiments
 
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
@@ -30,113 +39,136 @@ logger.addHandler(console_handler)
 if logger.hasHandlers():
     logger.handlers = [file_handler, console_handler]
 
-# Ensure NSEEQ.json exists, else download
-nseeq_json_path = os.path.join("static", "NSEEQ.json") # Updated path to static
-if not os.path.exists(nseeq_json_path):
-    url = "https://api.iiflcapital.com/v1/contractfiles/NSEEQ.json"
-    try:
-        resp = requests.get(url, timeout=60)
-        resp.raise_for_status()
-        with open(nseeq_json_path, "wb") as f:
-            f.write(resp.content)
-        logger.info(f"Downloaded NSEEQ.json to {nseeq_json_path}")
-    except Exception as e:
-        logger.error(f"Failed to download NSEEQ.json: {e}")
+# Ensure NSEEQ.json exists, else sync it through the shared contract-file downloader
+if not os.path.exists(NSEEQ_PATH):
+    success, message = sync_contract_files(["NSEEQ.json"])
+    if not success:
+        logger.error(message)
         raise SystemExit(1)
+    logger.info(message)
 
 # Load Nifty 200 symbols
-with open("files/nifty200.json", "r") as f:
-    symbols = json.load(f)
+symbols = json_store.read_json("files/nifty200.json")
 
-NEAR_HIGH_THRESHOLD = 0.10  # 10% within 52-week high
-MIN_EPS_GROWTH = 0.05
-MIN_SALES_GROWTH = 0.05
-MIN_ROE = 0.10
-MAX_DEBT_TO_EQUITY = 1.0
+NEAR_HIGH_THRESHOLD = 0.10  # 10% within 52-week high (also encoded in the 'nifty200_technicals' rule)
 MAX_PER_SECTOR = 15  # Max stocks per sector
 
-# News sentiment analysis
-POSITIVE_WORDS = ["growth", "profit", "record", "expansion", "approval", "acquisition", "strong", "beats", "upgrade"]
-NEGATIVE_WORDS = ["loss", "decline", "drop", "fraud", "investigation", "lawsuit", "weak", "misses", "downgrade"]
+# Fundamental and technical thresholds live in configs/screening_rules.json, with the values used for
+# fundamentals yfinance does not report (banks have no debtToEquity).
+FUNDAMENTALS_RULE = "nifty200_fundamentals"
+TECHNICALS_RULE = "nifty200_technicals"
+
+stocks = {}
+
+# Stage 1: fundamentals for every symbol, screened as one table.
+fundamental_rows = {}
+for symbol in symbols:
+    try:
+        stock = yf.Ticker(symbol + ".NS")
+        info = stock.info
+        stocks[symbol] = stock
+        fundamental_rows[symbol] = {
+            "sector": info.get('sector', 'Unknown'),
+            "earningsQuarterlyGrowth": info.get('earningsQuarterlyGrowth'),
+            "revenueGrowth": info.get('revenueGrowth'),
+            "returnOnEquity": info.get('returnOnEquity'),
+            "debtToEquity": info.get('debtToEquity'),
+        }
+    except Exception as e:
+        logger.warning(f"Error processing {symbol}: {e}")
 
-def get_news_sentiment(headlines):
-    score = 0
-    for headline in headlines:
-        h = headline.lower()
-        if any(word in h for word in POSITIVE_WORDS):
-            score += 1
-        if any(word in h for word in NEGATIVE_WORDS):
-            score -= 1
-    if score > 0:
-        return "Positive"
-    elif score < 0:
-        return "Negative"
-    else:
-        return "Neutral"
+fundamentals_table = pd.DataFrame.from_dict(fundamental_rows, orient='index')
+fundamentals_screen = screening_rules.evaluate(FUNDAMENTALS_RULE, fundamentals_table)
+for symbol, clauses in screening_rules.failed_clauses(fundamentals_screen).items():
+    logger.info(f"{symbol} failed fundamentals: {', '.join(clauses)}")
+
+# Stage 2: technicals for the fundamental survivors, screened as one table. Symbols with cached
+# candles read their row from the market snapshot; only the rest download a year of prices.
+fundamental_survivors = list(fundamentals_table.index[fundamentals_screen['passed']])
+survivor_symbols = [f"{s}-EQ" for s in fundamental_survivors]
+market_snapshot.refresh_snapshot(survivor_symbols)
+snapshot = market_snapshot.load_snapshot(survivor_symbols)
+histories = {}
+technical_rows = {}
+for symbol in fundamental_survivors:
+    if f"{symbol}-EQ" in snapshot.index:
+        row = snapshot.loc[f"{symbol}-EQ"]
+        technical_rows[symbol] = {"close": row["close"], "sma200": row["sma200"], "high52w": row["high52w"]}
+        continue
+    try:
+        hist = stocks[symbol].history(period='1y')
+        close = hist['Close']
+        histories[symbol] = close
+        technical_rows[symbol] = {
+            # The 200DMA is NaN with less than 200 days of data, which fails the rule. The 52-week high
+            # is the intraday high, as in the market snapshot, not the highest close.
+            "close": close.iloc[-1] if len(close) else None,
+            "sma200": close.rolling(200).mean().iloc[-1] if len(close) else None,
+            "high52w": hist['High'].max() if len(close) else None,
+        }
+    except Exception as e:
+        logger.warning(f"Error processing {symbol}: {e}")
 
+technicals_table = pd.DataFrame.from_dict(technical_rows, orient='index')
+technicals_screen = screening_rules.evaluate(TECHNICALS_RULE, technicals_table)
+for symbol, clauses in screening_rules.failed_clauses(technicals_screen).items():
+    logger.info(f"{symbol} failed technicals: {', '.join(clauses)}")
+
+# Rank the technical survivors by universe-wide relative strength, strongest first, so the sector
+# caps keep the leaders and the buy list comes out in score order. Their candles are fetched (those
+# not already fetched today) and the snapshot refreshed first, so a fresh run scores them too;
+# symbols still without a score go last.
+technical_survivors = list(technicals_table.index[technicals_screen['passed']])
+success, message = fetch_symbol_candles([f"{s}-EQ" for s in technical_survivors])
+if not success:
+    logger.warning(f"Candles for the ranking not fetched, using the cached ones: {message}")
+success, message = relative_strength.refresh_scores()
+if not success:
+    logger.warning(f"Relative strength not refreshed: {message}")
+rs_scores = relative_strength.latest_scores()["rs_score"].dropna()
+technical_survivors.sort(key=lambda s: rs_scores.get(f"{s}-EQ", -1), reverse=True)
+
+# News sentiment for the technical survivors in one batch; headlines are cached for the day.
+sentiments = get_sentiments(technical_survivors, lambda s: stocks[s].news)
+
+# Stage 3: sector caps, correlation, news and multi-timeframe changes, in relative-strength order.
+# The rolling correlation matrix is kept up to date by the scheduler's post-close job.
 buy_list = []
 sector_counts = {}
+unchecked = []   # Candidates kept without a correlation check: not in the matrix (no cached candles)
+correlations = correlation.load_correlations()
+held_symbols = correlation.holding_symbols() if os.path.exists(correlation.HOLDING_PATH) else []
+if correlations is None:
+    logger.warning("No correlation matrix yet; buy list is diversified by sector caps only.")
 
-for symbol in symbols:
+for symbol in technical_survivors:
     try:
-        yf_symbol = symbol + ".NS"
-        stock = yf.Ticker(yf_symbol)
-        info = stock.info
-        sector = info.get('sector', 'Unknown')
+        sector = fundamentals_table.at[symbol, 'sector']
         sector_counts.setdefault(sector, 0)
         if sector_counts[sector] >= MAX_PER_SECTOR:
             logger.info(f"{symbol} skipped: sector cap reached for {sector}")
             continue
 
-        # Fundamental checks
-        eps_growth = info.get('earningsQuarterlyGrowth', 0)
-        sales_growth = info.get('revenueGrowth', 0)
-        roe = info.get('returnOnEquity', 0)
-        debt_to_equity = info.get('debtToEquity', 1)
-
-        if eps_growth < MIN_EPS_GROWTH:
-            logger.info(f"{symbol} failed EPS growth: {eps_growth}")
-            continue
-        if sales_growth < MIN_SALES_GROWTH:
-            logger.info(f"{symbol} failed Sales growth: {sales_growth}")
-            continue
-        if roe < MIN_ROE:
-            logger.info(f"{symbol} failed ROE: {roe}")
-            continue
-        if debt_to_equity > MAX_DEBT_TO_EQUITY:
-            logger.info(f"{symbol} failed Debt/Equity: {debt_to_equity}")
+        # Skip candidates that move with a holding or a stronger pick, whatever their sector.
+        picks = [f"{b['Symbol']}-EQ" for b in buy_list]
+        kept, skipped = correlation.select_diversified([f"{symbol}-EQ"], held_symbols + picks, state=correlations)
+        if not kept:
+            other, value = skipped[f"{symbol}-EQ"]
+            logger.info(f"{symbol} skipped: correlation {value:.2f} with {other}")
             continue
+        if correlations is not None and f"{symbol}-EQ" not in correlations.index:
+            unchecked.append(symbol)
 
-        # Technical checks
-        hist = stock.history(period='1y')
-        if len(hist) < 200:
-            logger.info(f"{symbol} failed: Not enough data for 200DMA/52W high")
-            continue
-
-        close = hist['Close']
-        dma_200 = close.rolling(200).mean()
-        last_close = close.iloc[-1]
-        high_52w = close.max()
-
-        if last_close < dma_200.iloc[-1]:
-            logger.info(f"{symbol} failed 200DMA: Last close {last_close} < 200DMA {dma_200.iloc[-1]}")
-            continue
-        if last_close < (1 - NEAR_HIGH_THRESHOLD) * high_52w:
-            logger.info(f"{symbol} not near 52W high: Last close {last_close}, 52W high {high_52w}")
-            continue
+        close = histories.get(symbol)
+        last_close = technicals_table.at[symbol, 'close']
+        high_52w = technicals_table.at[symbol, 'high52w']
 
         # News filter
-        try:
-            news_items = stock.news
-            headlines = [item['title'] for item in news_items if 'title' in item][:5]
-            sentiment = get_news_sentiment(headlines)
-            logger.info(f"{symbol} news sentiment: {sentiment}")
-            if sentiment == "Negative":
-                logger.info(f"{symbol} skipped due to negative news sentiment.")
-                continue
-        except Exception as e:
-            logger.warning(f"{symbol} news fetch failed: {e}")
-            sentiment = "Unknown"
+        sentiment = sentiments[symbol]
+        logger.info(f"{symbol} news sentiment: {sentiment}")
+        if sentiment == "Negative":
+            logger.info(f"{symbol} skipped due to negative news sentiment.")
+            continue
 
         # Calculate multi-timeframe percentage changes using candle data file if available
         periods = {
@@ -150,89 +182,20 @@ for symbol in symbols:
             "3y": 756
         }
         pct_changes = {}
-        candle_file = os.path.join("files", f"{symbol}-EQ_candles.json")
+        candle_file = candle_path(f"{symbol}-EQ")
         close_series = None
-        # If candle file does not exist, fetch from IIFL API
-        if not os.path.exists(candle_file):
-            # Parse NSEEQ.json to get instrumentId
-            instrument_id = None
-            logger.debug(f"Looking up instrumentId for symbol: {symbol}")
-            try:
-                with open(nseeq_json_path, "r", encoding="utf-8") as jf:
-                    contracts = json.load(jf)
-                    for row in contracts:
-                        trading_symbol = f"{symbol}-EQ"
-                        if row.get('tradingSymbol') == trading_symbol and row.get('exchange') == 'NSEEQ':
-                            instrument_id = row.get('instrumentId')
-                            logger.debug(f"Found instrumentId {instrument_id} for tradingSymbol {trading_symbol}")
-                            break
-            except Exception as e:
-                logger.warning(f"Error reading NSEEQ.json: {e}")
-            if not instrument_id:
-                logger.warning(f"InstrumentId not found for symbol: {symbol}")
-            if instrument_id:
-                # Read auth token
-                auth_token_path = os.path.join("files", "auth_token.txt")
-                try:
-                    with open(auth_token_path, "r", encoding="utf-8") as f:
-                        raw_token = f.read().strip()
-                        if not raw_token.lower().startswith("bearer "):
-                            AUTH_TOKEN = f"Bearer {raw_token}"
-                        else:
-                            AUTH_TOKEN = raw_token
-                    logger.debug(f"Read auth token for IIFL API")
-                except Exception as e:
-                    logger.error(f"Could not read auth token: {e}")
-                    AUTH_TOKEN = None
-                if AUTH_TOKEN:
-                    from datetime import datetime, timedelta
-                    URL = "https://api.iiflcapital.com/v1/marketdata/historicaldata"
-                    HEADERS = {
-                        "Content-Type": "application/json",
-                        "Authorization": AUTH_TOKEN
-                    }
-                    to_date = datetime.now()
-                    from_date = to_date - timedelta(days=3*365)
-                    to_date_str = to_date.strftime("%d-%b-%Y").lower()
-                    from_date_str = from_date.strftime("%d-%b-%Y").lower()
-                    payload = {
-                        "exchange": "NSEEQ",
-                        "instrumentId": str(instrument_id),
-                        "interval": "1 day",
-                        "fromDate": from_date_str,
-                        "toDate": to_date_str
-                    }
-                    logger.debug(f"Requesting candle data for {symbol} (instrumentId={instrument_id}) from {from_date_str} to {to_date_str}")
-                    logger.info(f"IIFL API Request: URL={URL}, HEADERS={HEADERS}, PAYLOAD={payload}")
-                    print(f"IIFL API Request: URL={URL}, HEADERS={HEADERS}, PAYLOAD={payload}")
-                    try:
-                        resp = requests.post(URL, headers=HEADERS, json=payload, timeout=60)
-                        logger.info(f"IIFL API Response: status_code={resp.status_code}, body={resp.text}")
-                        print(f"IIFL API Response: status_code={resp.status_code}, body={resp.text}")
-                        resp.raise_for_status()
-                        data = resp.json()
-                        with open(candle_file, "w", encoding="utf-8") as outf:
-                            json.dump(data, outf, indent=2)
-                        logger.info(f"Fetched and saved candle data for {symbol} to {candle_file}")
-                    except Exception as e:
-                        logger.error(f"Failed to fetch candle data for {symbol}: {e}")
-                else:
-                    logger.warning(f"No valid auth token for IIFL API, skipping candle fetch for {symbol}")
-            else:
-                logger.warning(f"Skipping candle fetch for {symbol} due to missing instrumentId")
         try:
             if os.path.exists(candle_file):
                 logger.debug(f"Reading candle data from {candle_file}")
-                with open(candle_file, "r", encoding="utf-8") as cf:
-                    candle_data = json.load(cf)
-                    candles = candle_data["result"][0]["candles"]
-                    close_series = [c[4] for c in candles]
-            else:
+                candle_data = json_store.read_json(candle_file)
+                candles = candle_data["result"][0]["candles"]
+                close_series = [c[4] for c in candles]
+            elif close is not None:
                 logger.debug(f"Candle file not found for {symbol}, falling back to yfinance data")
                 close_series = close.reset_index(drop=True).tolist()
         except Exception as e:
             logger.warning(f"{symbol} candle file read failed: {e}")
-            close_series = close.reset_index(drop=True).tolist()
+            close_series = close.reset_index(drop=True).tolist() if close is not None else None
         for label, days in periods.items():
             if close_series and len(close_series) > days:
                 past_close = close_series[-days-1]
@@ -248,6 +211,7 @@ for symbol in symbols:
             "52W High": high_52w,
             "Pct from High": (last_close / high_52w - 1) * 100,
             "News Sentiment": sentiment,
+            "RS Score": rs_scores.get(f"{symbol}-EQ"),
             "BUY": True
         }
         buy_entry.update(pct_changes)
@@ -257,8 +221,9 @@ for symbol in symbols:
     except Exception as e:
         logger.warning(f"Error processing {symbol}: {e}")
 
+if unchecked:
+    logger.warning(f"{len(unchecked)} candidate(s) not in the correlation matrix were not checked for correlation: {', '.join(unchecked)}")
+
 # Save buy list
-os.makedirs("recommendations", exist_ok=True)
-with open("recommendations/nifty200_buy.json", "w") as f:
-    json.dump(buy_list, f, indent=2)
+json_store.write_json("recommendations/nifty200_buy.json", buy_list)
 logger.info(f"Saved {len(buy_list)} stocks marked as BUY to recommendations/nifty200_buy.json")
@@ -0,0 +1,161 @@
+import os
+import time
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+
+from util import candle_store
+from util.fetch_candle_stick_data import PERCENTAGE_PERIODS
+
+# --- Configuration ---
+SMA_WINDOWS = (50, 200)
+HIGH_WINDOW = 252                # Trading days in the 52-week high/low
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DB_PATH = os.path.join(BASE_DIR, "..", "files", "market_snapshot.db")
+
+# One row per instrument; candle_mtime_ns/candle_size record which candle file the row was built from.
+CHANGE_COLUMNS = [f"change_{label}" for label in PERCENTAGE_PERIODS]
+SNAPSHOT_COLUMNS = (["symbol", "as_of", "close", "prev_close", "volume", "high52w", "low52w", "pct_from_high"]
+                    + [f"sma{w}" for w in SMA_WINDOWS] + CHANGE_COLUMNS + ["candle_count", "candle_mtime_ns", "candle_size"])
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshot (
+    symbol TEXT PRIMARY KEY,
+    as_of TEXT,
+    {", ".join(f"{c} REAL" for c in SNAPSHOT_COLUMNS[2:-3])},
+    candle_count INTEGER,
+    candle_mtime_ns INTEGER,
+    candle_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshot_as_of ON snapshot (as_of);
+CREATE INDEX IF NOT EXISTS snapshot_pct_from_high ON snapshot (pct_from_high);
+"""
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def connect(path=SNAPSHOT_DB_PATH):
+    """Opens the snapshot database, creating the table and indexes if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _value(x):
+    return None if x is None or (isinstance(x, float) and np.isnan(x)) else float(x)
+
+def snapshot_row(symbol, candles, signature):
+    """Computes one snapshot row from a symbol's date-indexed candle DataFrame."""
+    close = candles["close"].to_numpy(dtype=float)
+    high = candles["high"].to_numpy(dtype=float)
+    low = candles["low"].to_numpy(dtype=float)
+    last = close[-1]
+    high52w = np.nanmax(high[-HIGH_WINDOW:])
+    row = {
+        "symbol": symbol,
+        "as_of": candles.index[-1].strftime("%Y-%m-%d"),
+        "close": last,
+        "prev_close": close[-2] if len(close) > 1 else None,
+        "volume": candles["volume"].iloc[-1] if "volume" in candles else None,
+        "high52w": high52w,
+        "low52w": np.nanmin(low[-HIGH_WINDOW:]),
+        "pct_from_high": (last / high52w - 1) * 100 if high52w else None,
+    }
+    for window in SMA_WINDOWS:
+        # Like the screens, an average needs a full window of candles; shorter histories get NULL and fail rules.
+        row[f"sma{window}"] = close[-window:].mean() if len(close) >= window else None
+    for label, days in PERCENTAGE_PERIODS.items():
+        past = close[-days - 1] if len(close) > days else None
+        row[f"change_{label}"] = (last / past - 1) * 100 if past else None
+    row["candle_count"] = len(close)
+    row["candle_mtime_ns"], row["candle_size"] = signature
+    return {k: (_value(v) if k not in ("symbol", "as_of", "candle_count", "candle_mtime_ns", "candle_size") else v)
+            for k, v in row.items()}
+
+def refresh_snapshot(symbols=None, path=SNAPSHOT_DB_PATH):
+    """
+    Brings the snapshot up to date with the candle caches. Only symbols whose candle file changed since
+    their row was built are recomputed; rows whose candle file is gone are removed. A full refresh
+    covers the cached equities only, so index caches such as the NIFTY benchmark never get a row.
+    Returns (success, message).
+    """
+    started = time.perf_counter()
+    full_refresh = symbols is None
+    symbols = candle_store.equity_symbols() if full_refresh else symbols
+    conn = None
+    try:
+        conn = connect(path)
+        with conn:
+            stored = {s: (m, z) for s, m, z in conn.execute("SELECT symbol, candle_mtime_ns, candle_size FROM snapshot")}
+            # A full refresh also visits stored symbols whose candle cache has since been removed,
+            # and rows left by non-equity caches that earlier full refreshes picked up.
+            symbols = sorted(set(symbols) | set(stored)) if full_refresh else sorted(symbols)
+            rows, removed = [], []
+            for symbol, signature in zip(symbols, candle_store.candle_signatures(symbols)):
+                if signature is None or (full_refresh and not candle_store.is_equity(symbol)):
+                    if symbol in stored:
+                        removed.append((symbol,))
+                    continue
+                if stored.get(symbol) == signature:
+                    continue
+                candles = candle_store.load_candles(symbol)
+                if candles is None or candles.empty:
+                    continue
+                rows.append(snapshot_row(symbol, candles, signature))
+            if rows:
+                placeholders = ", ".join("?" for _ in SNAPSHOT_COLUMNS)
+                conn.executemany(f"INSERT OR REPLACE INTO snapshot ({', '.join(SNAPSHOT_COLUMNS)}) VALUES ({placeholders})",
+                                 [tuple(r[c] for c in SNAPSHOT_COLUMNS) for r in rows])
+            if removed:
+                conn.executemany("DELETE FROM snapshot WHERE symbol = ?", removed)
+    except sqlite3.Error as e:
+        msg = f"Snapshot refresh failed: {e}"
+        logger.error(msg)
+        return False, msg
+    finally:
+        if conn is not None:
+            conn.close()
+    msg = (f"Snapshot refreshed in {time.perf_counter() - started:.2f}s: {len(rows)} updated, "
+           f"{len(symbols) - len(rows) - len(removed)} unchanged or skipped, {len(removed)} removed.")
+    logger.info(msg)
+    return True, msg
+
+def load_snapshot(symbols=None, path=SNAPSHOT_DB_PATH):
+    """Returns the snapshot as a DataFrame indexed by trading symbol, optionally limited to the given symbols."""
+    conn = connect(path)
+    try:
+        table = pd.read_sql_query("SELECT * FROM snapshot", conn, index_col="symbol")
+    finally:
+        conn.close()
+    if symbols is not None:
+        table = table[table.index.isin(list(symbols))]
+    return table
+
+def snapshot_version(path=SNAPSHOT_DB_PATH):
+    """Changes whenever the snapshot database is written; used to key caches built on top of it."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "none"
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+if __name__ == "__main__":
+    success, message = refresh_snapshot()
+    print(f"Success: {success}, Message: {message}")
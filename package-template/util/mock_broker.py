@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime
+
+from flask import Flask, jsonify, request
+
+# --- Configuration ---
+# A local stand-in for the IIFL order API, so order placement can be run, tested and timed offline:
+#   python -m util.mock_broker [port]
+#   python -m util.place_orders --live --broker http://127.0.0.1:5001/v1
+DEFAULT_PORT = 5001
+LATENCY_MS = float(os.environ.get("MOCK_BROKER_LATENCY_MS", "0"))   # Simulated exchange round trip per order
+REQUIRED_FIELDS = ("instrumentId", "exchange", "transactionType", "quantity", "product", "orderType", "validity")
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def create_app(latency_ms=LATENCY_MS, reject_instruments=()):
+    """
+    Flask app serving POST /v1/orders and GET /v1/orders in the IIFL response shape. Orders carrying
+    an orderTag already seen get the original broker order id back instead of a second order; orders
+    for reject_instruments are rejected, as the exchange would for e.g. insufficient holdings.
+    """
+    app = Flask(__name__)
+    orders = []
+    by_tag = {}
+    lock = threading.Lock()
+    reject_instruments = {str(i) for i in reject_instruments}
+
+    @app.route('/v1/orders', methods=['POST'])
+    def place_order():
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return jsonify({"status": "Error", "message": "Missing bearer token."}), 401
+        payload = request.get_json(silent=True) or {}
+        missing = [f for f in REQUIRED_FIELDS if not payload.get(f)]
+        if missing:
+            return jsonify({"status": "Error", "message": f"Missing fields: {', '.join(missing)}"}), 400
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        if str(payload["instrumentId"]) in reject_instruments:
+            return jsonify({"status": "Error", "message": "Order rejected: insufficient holdings."}), 200
+        with lock:
+            tag = payload.get("orderTag")
+            if tag and tag in by_tag:
+                return jsonify({"status": "Ok", "message": "Duplicate order tag.", "result": [{"brokerOrderId": by_tag[tag]}]})
+            order_id = f"MOCK{len(orders) + 1:08d}"
+            orders.append({**payload, "brokerOrderId": order_id, "receivedAt": datetime.now().isoformat(timespec="milliseconds")})
+            if tag:
+                by_tag[tag] = order_id
+        logger.info(f"Mock broker accepted {payload['transactionType']} {payload['quantity']} of {payload['instrumentId']} as {order_id}")
+        return jsonify({"status": "Ok", "message": "Order placed.", "result": [{"brokerOrderId": order_id}]})
+
+    @app.route('/v1/orders', methods=['GET'])
+    def order_book():
+        with lock:
+            return jsonify({"status": "Ok", "result": list(orders)})
+
+    return app
+
+if __name__ == "__main__":
+    # Usage: python -m util.mock_broker [port]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    create_app().run(host="127.0.0.1", port=port, threaded=True)
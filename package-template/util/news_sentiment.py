@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import logging
+from datetime import datetime
+
+from util import json_store
+
+# --- Configuration ---
+# Keyword lists used to score news headlines for buy candidates.
+POSITIVE_WORDS = ["growth", "profit", "record", "expansion", "approval", "acquisition", "strong", "beats", "upgrade"]
+NEGATIVE_WORDS = ["loss", "decline", "drop", "fraud", "investigation", "lawsuit", "weak", "misses", "downgrade"]
+NEWS_HEADLINES = 5                 # Latest headlines that make up a symbol's sentiment
+NEWS_TTL_SECONDS = 24 * 3600       # Cached news is reused for this long, and never past the day it was fetched
+MAX_ITEMS_PER_SYMBOL = 50          # Older headlines beyond this are dropped from the cache
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NEWS_CACHE_PATH = os.path.join(BASE_DIR, "..", "files", "news_cache.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# One pass over each headline finds every keyword of both polarities.
+# Matching is substring-based like the original `word in headline` check, so "profitable" counts as "profit".
+_KEYWORDS = {word: 1 for word in POSITIVE_WORDS}
+_KEYWORDS.update({word: -1 for word in NEGATIVE_WORDS})
+_KEYWORD_PATTERN = re.compile("|".join(re.escape(w) for w in sorted(_KEYWORDS, key=len, reverse=True)))
+
+def score_headline(headline):
+    """+1 if the headline has a positive keyword, -1 for a negative one (both can apply, netting to 0)."""
+    polarities = set()
+    for match in _KEYWORD_PATTERN.finditer(headline.lower()):
+        polarities.add(_KEYWORDS[match.group()])
+        if len(polarities) == 2:
+            break
+    return sum(polarities)
+
+def score_headlines(headlines):
+    """Scores a batch of headlines."""
+    return [score_headline(h) for h in headlines]
+
+def sentiment_from_score(score):
+    if score > 0:
+        return "Positive"
+    elif score < 0:
+        return "Negative"
+    else:
+        return "Neutral"
+
+def get_news_sentiment(headlines):
+    return sentiment_from_score(sum(score_headlines(headlines)))
+
+def normalize_news_item(item):
+    """
+    Reduces a yfinance news item to {id, title, link, published}.
+    Handles both the flat layout (title/link/uuid) and the newer nested 'content' layout.
+    """
+    content = item.get("content") or item
+    title = content.get("title") or item.get("title")
+    if not title:
+        return None
+    link = (content.get("canonicalUrl") or {}).get("url") or content.get("link") or item.get("link")
+    published = content.get("pubDate") or item.get("providerPublishTime")
+    item_id = item.get("id") or item.get("uuid") or link or title
+    return {"id": str(item_id), "title": title, "link": link, "published": published}
+
+def load_news_cache(path=NEWS_CACHE_PATH):
+    """Loads the news cache, or an empty cache if none exists or it is unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        return json_store.read_json(path)
+    except (json_store.JSONDecodeError, IOError) as e:
+        logger.warning(f"Ignoring unreadable news cache {path}: {e}")
+        return {}
+
+def save_news_cache(cache, path=NEWS_CACHE_PATH):
+    json_store.write_json(path, cache, compression=json_store.ARTIFACT_COMPRESSION)
+
+def _is_fresh(entry, now):
+    fetched_at = entry.get("fetched_at", 0)
+    same_day = datetime.fromtimestamp(fetched_at).date() == datetime.fromtimestamp(now).date()
+    return same_day and now - fetched_at < NEWS_TTL_SECONDS
+
+def _merge_items(entry, raw_items):
+    """Adds unseen headlines (by id or link) in front of the cached ones and scores only those. Returns the new count."""
+    items = entry.get("items", [])
+    seen = {i["id"] for i in items} | {i["link"] for i in items if i.get("link")}
+    new_items = []
+    for raw in raw_items:
+        item = normalize_news_item(raw)
+        if not item or item["id"] in seen or (item["link"] and item["link"] in seen):
+            continue
+        seen.update(k for k in (item["id"], item["link"]) if k)
+        new_items.append(item)
+    for item, score in zip(new_items, score_headlines([i["title"] for i in new_items])):
+        item["score"] = score
+    entry["items"] = (new_items + items)[:MAX_ITEMS_PER_SYMBOL]
+    return len(new_items)
+
+def get_sentiments(symbols, fetch_news, path=NEWS_CACHE_PATH, now=None):
+    """
+    Returns {symbol: sentiment} for the symbols.
+    fetch_news(symbol) is called only for symbols whose cached news is older than the TTL;
+    its raw items are de-duplicated against the cache and only new headlines are scored.
+    Symbols whose fetch fails get "Unknown" and keep their previous cache entry.
+    """
+    now = now if now is not None else time.time()
+    cache = load_news_cache(path)
+    sentiments = {}
+    reused = fetched = new_headlines = 0
+    for symbol in symbols:
+        entry = cache.get(symbol, {})
+        if entry and _is_fresh(entry, now):
+            sentiments[symbol] = entry["sentiment"]
+            reused += 1
+            continue
+        try:
+            raw_items = fetch_news(symbol) or []
+        except Exception as e:
+            logger.warning(f"{symbol} news fetch failed: {e}")
+            sentiments[symbol] = "Unknown"
+            continue
+        fetched += 1
+        new_headlines += _merge_items(entry, raw_items)
+        latest = entry["items"][:NEWS_HEADLINES]
+        entry["sentiment"] = sentiment_from_score(sum(i["score"] for i in latest))
+        entry["fetched_at"] = now
+        cache[symbol] = entry
+        sentiments[symbol] = entry["sentiment"]
+
+    if fetched:
+        save_news_cache(cache, path)
+    logger.info(f"News sentiment for {len(symbols)} symbols: {reused} from cache, "
+                f"{fetched} fetched with {new_headlines} new headlines.")
+    return sentiments
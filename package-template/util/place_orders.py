@@ -0,0 +1,281 @@
+import os
+import sys
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import requests
+
+from util import circuit_breaker, instruments, json_store, trading_calendar
+from util.calculate_atr import OUTPUT_FILE as ATR_REPORT_PATH
+
+# --- Configuration ---
+MAX_CONCURRENT_ORDERS = 8        # Orders in flight at once
+ORDER_TIMEOUT_SECONDS = 10
+JOURNAL_RETENTION_DAYS = 30      # Journal entries older than this are dropped on the next write
+# An acknowledged SELL keeps the position in the holdings until it settles (T+1, over a weekend at
+# most 3 days), so an ATR report rebuilt meanwhile repeats the signal under a new date.
+SETTLEMENT_DAYS = 3
+# A key already in one of these states is never sent again; "submitted" without an acknowledgement
+# means the outcome is unknown and has to be checked with the broker before retrying by hand.
+FINAL_STATES = ("submitted", "acknowledged")
+ORDER_DEFAULTS = {"exchange": "NSEEQ", "orderComplexity": "REGULAR", "orderType": "MARKET", "validity": "DAY"}
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "..", "configs", "config.json")
+AUTH_TOKEN_PATH = os.path.join(BASE_DIR, "..", "files", "auth_token.txt")
+JOURNAL_PATH = os.path.join(BASE_DIR, "..", "files", "order_journal.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def idempotency_key(signal_date, symbol, side, quantity):
+    """
+    Same signal, same key: a SELL of the same quantity of a symbol on the same day is one order, however
+    often the batch is rerun. Sent as the order tag so the broker's order book can be matched back.
+    """
+    raw = f"{signal_date}|{symbol}|{side}|{quantity}"
+    return "sa" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:14]
+
+def build_sell_orders(report, signal_date=None):
+    """Market SELL orders for the full quantity of every holding the ATR report marks SELL."""
+    signal_date = (signal_date or date.today()).isoformat()
+    orders = []
+    for holding in report:
+        if holding.get("action") != "SELL":
+            continue
+        symbol = holding.get("nseTradingSymbol")
+        quantity = int(holding.get("totalQuantity") or 0)
+        instrument_id = holding.get("nseInstrumentId") or (instruments.get_instrument_id(symbol) if symbol else None)
+        if not symbol or not instrument_id or quantity <= 0:
+            logger.warning(f"Skipping SELL without symbol, instrumentId or quantity: {holding.get('bseTradingSymbol', symbol)}")
+            continue
+        key = idempotency_key(signal_date, symbol, "SELL", quantity)
+        orders.append({
+            "key": key,
+            "symbol": symbol,
+            "payload": {**ORDER_DEFAULTS, "instrumentId": str(instrument_id), "transactionType": "SELL",
+                        "quantity": str(quantity), "product": holding.get("product") or "DELIVERY", "orderTag": key},
+        })
+    return orders
+
+class OrderJournal:
+    """
+    Every live order by idempotency key with its state (submitted, acknowledged, rejected, failed),
+    broker order id and timings, in files/order_journal.json. Written after every state change.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self.entries = json_store.read_json(path)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def _settling_sale(self, order):
+        """Key of an acknowledged SELL of the same symbol and quantity within SETTLEMENT_DAYS, or None."""
+        cutoff = (datetime.now() - timedelta(days=SETTLEMENT_DAYS)).isoformat()
+        for key, entry in self.entries.items():
+            if (entry["state"] == "acknowledged" and entry["symbol"] == order["symbol"]
+                    and entry["payload"]["transactionType"] == order["payload"]["transactionType"] == "SELL"
+                    and entry["payload"]["quantity"] == order["payload"]["quantity"]
+                    and entry.get("acknowledged_at", "") >= cutoff):
+                return key
+        return None
+
+    def claim(self, order):
+        """
+        Marks an order as submitted unless its key already reached a final state, or the same SELL was
+        acknowledged under another key and has not settled yet. Returns True if claimed.
+        """
+        with self._lock:
+            entry = self.entries.get(order["key"])
+            if entry and entry["state"] in FINAL_STATES:
+                return False
+            settling = self._settling_sale(order)
+            if settling:
+                logger.info(f"{order['symbol']}: SELL {order['payload']['quantity']} already acknowledged under key {settling}, "
+                            f"not sent again before it settles")
+                return False
+            self.entries[order["key"]] = {"symbol": order["symbol"], "payload": order["payload"], "state": "submitted",
+                                          "attempts": (entry or {}).get("attempts", 0) + 1,
+                                          "submitted_at": datetime.now().isoformat(timespec="milliseconds")}
+            self._save()
+            return True
+
+    def update(self, key, **fields):
+        with self._lock:
+            self.entries[key].update(fields)
+            self._save()
+
+    def _save(self):
+        cutoff = (datetime.now() - timedelta(days=JOURNAL_RETENTION_DAYS)).isoformat()
+        self.entries = {k: e for k, e in self.entries.items() if e.get("submitted_at", cutoff) >= cutoff}
+        json_store.write_json(self.path, self.entries, pretty=True)
+
+def _broker_order_id(body):
+    """Broker order id from an order response, whether result is a list or a single object."""
+    result = body.get("result")
+    if isinstance(result, list):
+        result = result[0] if result else {}
+    if isinstance(result, dict):
+        return result.get("brokerOrderId") or result.get("orderId")
+    return None
+
+def iifl_sender(url, token, session=None):
+    """
+    Returns send(payload) -> (success, response body or error) posting orders to the IIFL place-order
+    endpoint (or a stand-in serving the same API, see util.mock_broker). success is False only when
+    the endpoint could not be reached or failed (5xx); a rejected order is a successful call.
+    """
+    session = session or requests.Session()
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    def send(payload):
+        try:
+            response = session.post(url, headers=headers, json=payload, timeout=ORDER_TIMEOUT_SECONDS)
+        except requests.exceptions.RequestException as e:
+            return False, f"Order request failed: {e}"
+        if response.status_code >= 500:
+            return False, f"Order endpoint returned HTTP {response.status_code}"
+        try:
+            body = response.json()
+            if not isinstance(body, dict):
+                body = {"result": body}
+        except ValueError:
+            body = {"message": f"HTTP {response.status_code} with a non-JSON body"}
+        body.setdefault("http_status", response.status_code)
+        return True, body
+    return send
+
+def _acknowledged(body):
+    return (body.get("http_status", 200) < 400 and str(body.get("status", "")).lower() in ("ok", "success")
+            and _broker_order_id(body) is not None)
+
+def submit_orders(orders, send, journal, signal_time=None, max_workers=MAX_CONCURRENT_ORDERS):
+    """
+    Sends the orders concurrently through the IIFL orders circuit breaker, skipping keys the journal
+    already has in a final state. Each acknowledgement is journaled with its broker order id, the
+    round trip and, given signal_time (when the SELL was decided), the signal-to-acknowledgement latency.
+    Returns {key: result dict}.
+    """
+    breaker = circuit_breaker.breaker(circuit_breaker.IIFL_ORDERS)
+
+    def place(order):
+        if not journal.claim(order):
+            return {**(journal.get(order["key"]) or {}), "symbol": order["symbol"], "state": "duplicate"}
+        started = time.perf_counter()
+        try:
+            reached, body = breaker.call(send, order["payload"])
+        except Exception as e:
+            reached, body = False, f"Order request raised: {e}"
+        acked_at = datetime.now()
+        fields = {"round_trip_ms": round((time.perf_counter() - started) * 1000, 1)}
+        if signal_time is not None:
+            fields["signal_to_ack_ms"] = round((acked_at - signal_time).total_seconds() * 1000, 1)
+        if reached and _acknowledged(body):
+            fields.update(state="acknowledged", broker_order_id=_broker_order_id(body),
+                          acknowledged_at=acked_at.isoformat(timespec="milliseconds"))
+            logger.info(f"{order['symbol']}: SELL {order['payload']['quantity']} acknowledged as {fields['broker_order_id']} "
+                        f"({fields['round_trip_ms']} ms, key {order['key']})")
+        else:
+            # Rejected by the broker, or never reached it (open circuit, network error); both may be retried.
+            error = (body.get("message") or f"HTTP {body.get('http_status')}") if reached else body
+            fields.update(state="rejected" if reached else "failed", error=str(error))
+            logger.error(f"{order['symbol']}: SELL {order['payload']['quantity']} not placed: {error}")
+        journal.update(order["key"], **fields)
+        return {"symbol": order["symbol"], **fields}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(place, orders))
+    return {order["key"]: result for order, result in zip(orders, results)}
+
+def _load_config_and_token():
+    config = json_store.read_json(CONFIG_PATH)
+    with open(AUTH_TOKEN_PATH, "r") as f:
+        token = f.read().strip()
+    if not token:
+        raise ValueError("Auth token is missing or empty.")
+    return config["IIFL_BASE_URL"], config.get("PLACE_ORDER_ENDPOINT", "/orders"), token
+
+def place_sell_orders(dry_run=True, report_path=ATR_REPORT_PATH, base_url=None, token=None, journal_path=JOURNAL_PATH,
+                      allow_stale=False):
+    """
+    Turns the SELL actions of the ATR report into a batch of market orders. With dry_run (the default)
+    the orders are built and logged but nothing is sent. Otherwise they are submitted concurrently,
+    each at most once per signal, to base_url (the IIFL API from config.json unless given, e.g. a
+    util.mock_broker URL). A report written before the close of the last trading session (e.g. left
+    behind by a failed refresh) is not traded live unless allow_stale is set. Returns (success, message).
+    """
+    try:
+        report = json_store.read_json(report_path)
+        signal_time = datetime.fromtimestamp(os.path.getmtime(report_path))
+    except (FileNotFoundError, json_store.JSONDecodeError) as e:
+        return False, f"ATR report not available: {e}"
+    orders = build_sell_orders(report, signal_time.date())
+    if not orders:
+        return True, "No SELL actions in the ATR report."
+    if dry_run:
+        for order in orders:
+            logger.info(f"[dry run] {order['symbol']}: {order['payload']}")
+        return True, f"Dry run: {len(orders)} SELL order(s) built, none sent: {', '.join(o['symbol'] for o in orders)}."
+    last_close = trading_calendar.last_session_close()
+    report_time = datetime.fromtimestamp(os.path.getmtime(report_path), trading_calendar.IST)
+    if report_time < last_close and not allow_stale:
+        msg = (f"ATR report from {report_time:%Y-%m-%d %H:%M} IST predates the {last_close:%Y-%m-%d} session close; "
+               f"refusing to place live orders on it. Refresh the report or allow a stale report explicitly.")
+        logger.error(msg)
+        return False, msg
+
+    endpoint = "/orders"
+    if base_url is None or token is None:
+        try:
+            config_url, endpoint, config_token = _load_config_and_token()
+        except (FileNotFoundError, KeyError, ValueError, json_store.JSONDecodeError) as e:
+            return False, f"Cannot place orders: {e}"
+        base_url, token = base_url or config_url, token or config_token
+    send = iifl_sender(base_url + endpoint, token)
+    results = submit_orders(orders, send, OrderJournal(journal_path), signal_time)
+
+    counts = {}
+    for result in results.values():
+        counts[result["state"]] = counts.get(result["state"], 0) + 1
+    latencies = sorted(r["round_trip_ms"] for r in results.values() if r["state"] == "acknowledged")
+    summary = ", ".join(f"{n} {state}" for state, n in sorted(counts.items()))
+    msg = f"Placed {len(orders)} SELL order(s): {summary}."
+    if latencies:
+        msg += f" Round trip median {latencies[len(latencies) // 2]} ms, max {latencies[-1]} ms."
+    logger.info(msg)
+    return counts.get("rejected", 0) + counts.get("failed", 0) == 0, msg
+
+if __name__ == "__main__":
+    # Usage: python -m util.place_orders [--live] [--allow-stale] [--broker http://127.0.0.1:5001/v1]
+    live = "--live" in sys.argv
+    broker_url = sys.argv[sys.argv.index("--broker") + 1] if "--broker" in sys.argv else None
+    success, message = place_sell_orders(dry_run=not live, base_url=broker_url, token="mock" if broker_url else None,
+                                         allow_stale="--allow-stale" in sys.argv)
+    print(f"Success: {success}, Message: {message}")
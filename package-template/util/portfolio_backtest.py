@@ -0,0 +1,236 @@
+import os
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+from util import candle_store, instruments, json_store, screening_rules
+from util.calculate_atr import ATR_MULTIPLIER, ATR_PERIOD, trailing_stop
+from util.fundamentals import load_universe_fundamentals
+
+# --- Configuration ---
+INITIAL_CAPITAL = 1_000_000
+MAX_POSITIONS = 20               # Capital is split into this many equal slots
+MAX_PER_SECTOR = 15              # Same cap as mark_nifty200_buy
+REBALANCE_EVERY = 5              # Trading days between entry scans (weekly)
+COST_BPS = 10                    # Brokerage and slippage per side, in basis points
+ENTRY_RULE = "nifty200_technicals"
+DMA_WINDOW = 200
+HIGH_WINDOW = 252
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UNIVERSE_PATH = os.path.join(BASE_DIR, "..", "static", "nifty200.json")
+OUTPUT_PATH = os.path.join(BASE_DIR, "..", "files", "portfolio_backtest.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def indicators(panel):
+    """
+    Computes the rule inputs and ATR for every date and symbol of an open/high/low/close panel.
+    Every value on a date only uses candles up to and including that date.
+    """
+    close, high, low = panel["close"], panel["high"], panel["low"]
+    prev_close = close.shift(1)
+    true_range = np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+    return {
+        "sma200": close.rolling(DMA_WINDOW, min_periods=DMA_WINDOW).mean(),
+        "high52w": high.rolling(HIGH_WINDOW, min_periods=1).max(),
+        "atr": true_range.rolling(ATR_PERIOD, min_periods=ATR_PERIOD).mean(),
+    }
+
+def entry_signals(panel, ind, dates, rule=ENTRY_RULE):
+    """
+    Evaluates the screening rule as of each rebalance date in one pass over a (date, symbol) table.
+    Returns {date: [symbols that passed, in universe column order]}.
+    """
+    table = pd.DataFrame({
+        "close": panel["close"].loc[dates].stack(),
+        "sma200": ind["sma200"].loc[dates].stack(),
+        "high52w": ind["high52w"].loc[dates].stack(),
+    })
+    if table.empty:
+        return {}
+    passed = screening_rules.evaluate(rule, table)["passed"]
+    order = {symbol: i for i, symbol in enumerate(panel["close"].columns)}
+    signals = {}
+    for date, symbol in table.index[passed.to_numpy()]:
+        signals.setdefault(date, []).append(symbol)
+    return {date: sorted(symbols, key=order.get) for date, symbols in signals.items()}
+
+def run_backtest(panel, sectors, capital=INITIAL_CAPITAL, max_positions=MAX_POSITIONS, max_per_sector=MAX_PER_SECTOR,
+                 rebalance_every=REBALANCE_EVERY, atr_multiplier=ATR_MULTIPLIER, cost_bps=COST_BPS, rule=ENTRY_RULE):
+    """
+    Event-driven portfolio simulation over a preloaded panel ({field: DataFrame date x symbol}).
+
+    Each day, in order: open positions whose close is at or below yesterday's trailing stop are sold at
+    the close; the running high and ATR stop (calculate_atr.trailing_stop: floored at the entry price
+    once it has cleared it) are rolled forward; on rebalance days the rule is read from that day's close and new positions are
+    bought at the next day's open, one equal capital slot each, within MAX_PER_SECTOR per sector.
+    Returns (trades, equity curve Series).
+    """
+    close, high = panel["close"], panel["high"]
+    opens = panel.get("open", close)
+    ind = indicators(panel)
+    atr = ind["atr"]
+    dates = close.index
+    rebalance_dates = dates[DMA_WINDOW - 1::rebalance_every] if len(dates) >= DMA_WINDOW else dates[:0]
+    signals = entry_signals(panel, ind, rebalance_dates, rule)
+    cost = cost_bps / 10000
+
+    close_values, high_values, open_values, atr_values = close.to_numpy(), high.to_numpy(), opens.to_numpy(), atr.to_numpy()
+    column = {symbol: i for i, symbol in enumerate(close.columns)}
+
+    cash = float(capital)
+    positions = {}   # symbol -> {quantity, entry_price, entry_date, running_high, stop, floor_armed}
+    pending = []     # Symbols to buy at the next open
+    trades = []
+    equity = np.empty(len(dates))
+
+    for t, date in enumerate(dates):
+        # Entries decided on the previous rebalance close fill at today's open.
+        if pending:
+            slot = (cash + sum(p["quantity"] * _last(close_values, t - 1, column[s]) for s, p in positions.items())) / max_positions
+            for symbol in pending:
+                price = open_values[t, column[symbol]]
+                if np.isnan(price):
+                    price = close_values[t, column[symbol]]
+                if np.isnan(price) or price <= 0 or len(positions) >= max_positions:
+                    continue
+                quantity = int(min(slot, cash) // (price * (1 + cost)))
+                if quantity <= 0:
+                    continue
+                cash -= quantity * price * (1 + cost)
+                positions[symbol] = {"quantity": quantity, "entry_price": price, "entry_date": date,
+                                     "running_high": price, "stop": np.nan, "floor_armed": False}  # No stop before an ATR
+            pending = []
+
+        for symbol in list(positions):
+            p = positions[symbol]
+            i = column[symbol]
+            price = close_values[t, i]
+            if np.isnan(price):
+                continue
+            if price <= p["stop"] and date != p["entry_date"]:
+                cash += p["quantity"] * price * (1 - cost)
+                trades.append(_trade(symbol, sectors, p, date, price, "ATR stop hit", cost))
+                del positions[symbol]
+                continue
+            day_high = high_values[t, i]
+            if not np.isnan(day_high) and day_high > p["running_high"]:
+                p["running_high"] = day_high
+            if not np.isnan(atr_values[t, i]):
+                p["stop"], p["floor_armed"] = trailing_stop(p["running_high"], atr_values[t, i], p["entry_price"],
+                                                            p["floor_armed"], atr_multiplier)
+
+        if date in signals and t + 1 < len(dates):
+            sector_counts = {}
+            for symbol in positions:
+                sector = sectors.get(symbol, "Unknown")
+                sector_counts[sector] = sector_counts.get(sector, 0) + 1
+            free_slots = max_positions - len(positions)
+            for symbol in signals[date]:
+                if free_slots <= 0:
+                    break
+                sector = sectors.get(symbol, "Unknown")
+                if symbol in positions or sector_counts.get(sector, 0) >= max_per_sector:
+                    continue
+                pending.append(symbol)
+                sector_counts[sector] = sector_counts.get(sector, 0) + 1
+                free_slots -= 1
+
+        equity[t] = cash + sum(p["quantity"] * _last(close_values, t, column[s]) for s, p in positions.items())
+
+    # Close whatever is still open at the last close so every position shows up in the trade list.
+    for symbol, p in positions.items():
+        price = _last(close_values, len(dates) - 1, column[symbol])
+        trades.append(_trade(symbol, sectors, p, dates[-1], price, "End of test", cost))
+    return trades, pd.Series(equity, index=dates, name="equity")
+
+def _last(values, t, i):
+    """Latest non-missing close for column i at or before row t."""
+    while t >= 0 and np.isnan(values[t, i]):
+        t -= 1
+    return values[t, i] if t >= 0 else 0.0
+
+def _trade(symbol, sectors, position, date, price, reason, cost):
+    entry_value = position["quantity"] * position["entry_price"] * (1 + cost)
+    exit_value = position["quantity"] * price * (1 - cost)
+    return {
+        "Symbol": symbol.replace(instruments.EQUITY_SERIES_SUFFIX, ""),
+        "Sector": sectors.get(symbol, "Unknown"),
+        "Quantity": position["quantity"],
+        "Entry Date": position["entry_date"].strftime("%Y-%m-%d"),
+        "Entry Price": float(position["entry_price"]),
+        "Exit Date": date.strftime("%Y-%m-%d"),
+        "Exit Price": float(price),
+        "Exit Reason": reason,
+        "Return %": (exit_value / entry_value - 1) * 100,
+    }
+
+def summarize(trades, equity, capital=INITIAL_CAPITAL):
+    """Total return, CAGR, max drawdown, trade count and win rate of a simulation."""
+    if equity.empty:
+        return {"trades": 0}
+    years = max((equity.index[-1] - equity.index[0]).days / 365.25, 1 / 365.25)
+    drawdown = equity / equity.cummax() - 1
+    wins = sum(1 for t in trades if t["Return %"] > 0)
+    return {
+        "start": equity.index[0].strftime("%Y-%m-%d"),
+        "end": equity.index[-1].strftime("%Y-%m-%d"),
+        "final_equity": round(float(equity.iloc[-1]), 2),
+        "total_return_pct": round(float(equity.iloc[-1] / capital - 1) * 100, 2),
+        "cagr_pct": round(float((equity.iloc[-1] / capital) ** (1 / years) - 1) * 100, 2),
+        "max_drawdown_pct": round(float(drawdown.min()) * 100, 2),
+        "trades": len(trades),
+        "win_rate_pct": round(wins / len(trades) * 100, 2) if trades else None,
+    }
+
+def run_portfolio_backtest(capital=INITIAL_CAPITAL):
+    """Backtests the Nifty 200 buy rules from the cached candles and saves trades, equity and summary."""
+    try:
+        started = time.perf_counter()
+        symbols = [s + instruments.EQUITY_SERIES_SUFFIX for s in json_store.read_json(UNIVERSE_PATH)]
+        panel = candle_store.load_panel(symbols, fields=("open", "high", "low", "close"))
+        if panel["close"].empty:
+            return False, "No cached candles for the Nifty 200 universe."
+        # Sectors come from today's fundamentals cache; they change rarely enough not to bias entries.
+        sectors = {s: (f.get("sector") or "Unknown") for s, f in load_universe_fundamentals().items()}
+        trades, equity = run_backtest(panel, sectors, capital=capital)
+        summary = summarize(trades, equity, capital)
+        result = {
+            "summary": summary,
+            "trades": trades,
+            "equity": {"dates": [d.strftime("%Y-%m-%d") for d in equity.index], "values": [round(float(v), 2) for v in equity]},
+        }
+        json_store.write_json(OUTPUT_PATH, result, compression=json_store.ARTIFACT_COMPRESSION)
+    except Exception as e:
+        msg = f"Portfolio backtest failed: {e}"
+        logger.exception(msg)
+        return False, msg
+    msg = (f"Backtest of {panel['close'].shape[1]} symbols over {len(equity)} days in {time.perf_counter() - started:.1f}s: "
+           f"return {summary['total_return_pct']}%, max drawdown {summary['max_drawdown_pct']}%, {summary['trades']} trades.")
+    logger.info(msg)
+    return True, msg
+
+if __name__ == "__main__":
+    # Usage: python -m util.portfolio_backtest [capital]
+    success, message = run_portfolio_backtest(float(sys.argv[1]) if len(sys.argv) > 1 else INITIAL_CAPITAL)
+    print(f"Success: {success}, Message: {message}")
@@ -0,0 +1,200 @@
+import json
+import os
+import logging
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from statistics import NormalDist
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+from util import candle_store, json_store
+
+# --- Configuration ---
+LOOKBACK_DAYS = 756              # ~3 years of daily returns, matching the candle history fetched for holdings
+CONFIDENCE_LEVELS = (0.95, 0.99)
+BENCHMARK_SYMBOL = "NIFTY"       # Candle cache name of the index used for beta (files/NIFTY_candles.json)
+BENCHMARK_TICKER = "^NSEI"       # yfinance ticker the benchmark candles are fetched from (Nifty 50)
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json")
+RISK_PATH = os.path.join(BASE_DIR, "..", "files", "risk.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def shrinkage_covariance(returns):
+    """
+    Ledoit-Wolf covariance: the sample covariance shrunk towards a scaled identity matrix.
+    Returns (covariance, shrinkage intensity). returns is a T x N array.
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+    delta = np.sum((sample - target) ** 2) / n
+    # Average squared distance of the per-observation outer products from the sample covariance.
+    beta = np.sum(((x ** 2).T @ (x ** 2)) / t - sample ** 2) / (n * t)
+    shrinkage = 0.0 if delta == 0 else min(1.0, max(0.0, beta / delta))
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+def value_at_risk(portfolio_returns, mean, sigma, confidence):
+    """Historical and parametric (normal) VaR/CVaR of one-day returns, as positive loss fractions."""
+    alpha = 1 - confidence
+    cutoff = np.quantile(portfolio_returns, alpha)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    z = NormalDist().inv_cdf(alpha)
+    return {
+        "historical_var": float(-cutoff),
+        "historical_cvar": float(-tail.mean()) if len(tail) else float(-cutoff),
+        "parametric_var": float(-(mean + z * sigma)),
+        "parametric_cvar": float(-(mean - sigma * NormalDist().pdf(z) / alpha)),
+    }
+
+def compute_risk(returns, weights, benchmark_returns=None):
+    """
+    Portfolio risk for a returns DataFrame (dates x holdings) and value weights (Series over the same holdings).
+    Computes the shrinkage covariance, VaR/CVaR, per-holding beta and marginal/percentage risk contributions.
+    """
+    r = returns.to_numpy()
+    w = weights.reindex(returns.columns).fillna(0).to_numpy()
+    cov, shrinkage = shrinkage_covariance(r)
+    sigma = float(np.sqrt(w @ cov @ w))
+    portfolio_returns = r @ w
+    mean = float(portfolio_returns.mean())
+
+    marginal = cov @ w / sigma if sigma else np.zeros_like(w)
+    contribution = w * marginal
+
+    betas = None
+    if benchmark_returns is not None:
+        b = benchmark_returns.reindex(returns.index).to_numpy()
+        valid = ~np.isnan(b)
+        xb = b[valid] - b[valid].mean()
+        xr = r[valid] - r[valid].mean(axis=0)
+        variance = xb @ xb
+        betas = (xr.T @ xb) / variance if variance else None
+
+    holdings = []
+    for i, symbol in enumerate(returns.columns):
+        holdings.append({
+            "symbol": symbol,
+            "weight": round(float(w[i]), 4),
+            "volatility": round(float(np.sqrt(cov[i, i])), 6),
+            "beta": round(float(betas[i]), 4) if betas is not None else None,
+            "marginal_risk": round(float(marginal[i]), 6),
+            "risk_contribution_pct": round(float(contribution[i] / sigma), 4) if sigma else 0.0,
+        })
+
+    return {
+        "observations": int(len(r)),
+        "shrinkage": round(float(shrinkage), 4),
+        "daily_volatility": sigma,
+        "annual_volatility": sigma * np.sqrt(252),
+        "portfolio_beta": round(float(w @ betas), 4) if betas is not None else None,
+        "var": {f"{int(c * 100)}": value_at_risk(portfolio_returns, mean, sigma, c) for c in CONFIDENCE_LEVELS},
+        "holdings": holdings,
+    }
+
+def fetch_benchmark():
+    """
+    Caches the benchmark's daily candles from yfinance in the IIFL candle format, so beta can be
+    computed like any cached symbol. Skipped when the cache was already written today.
+    Returns (success, message).
+    """
+    path = candle_store.candle_path(BENCHMARK_SYMBOL)
+    if os.path.exists(path) and date.fromtimestamp(os.path.getmtime(path)) == date.today():
+        return True, f"Benchmark {BENCHMARK_SYMBOL} candles already fetched today."
+    if yf is None:
+        return False, "yfinance is not installed; install it to fetch the benchmark for beta."
+    try:
+        start = (date.today() - timedelta(days=candle_store.HISTORY_DAYS)).isoformat()
+        hist = yf.Ticker(BENCHMARK_TICKER).history(start=start, auto_adjust=False)
+        if hist.empty:
+            return False, f"No benchmark candles returned for {BENCHMARK_TICKER}."
+        columns = hist[["Open", "High", "Low", "Close", "Volume"]]
+        candles = [[int(ts.timestamp() * 1000), *map(float, row)] for ts, row in zip(hist.index, columns.itertuples(index=False))]
+        candle_store.save_candles(BENCHMARK_SYMBOL, {"result": [{"candles": candles}]})
+    except Exception as e:
+        msg = f"Benchmark fetch failed: {e}"
+        logger.error(msg)
+        return False, msg
+    msg = f"Cached {len(candles)} {BENCHMARK_TICKER} candles as benchmark {BENCHMARK_SYMBOL}."
+    logger.info(msg)
+    return True, msg
+
+def _holding_quantities():
+    """Returns {nseTradingSymbol: quantity} from the holdings file."""
+    holdings = json_store.read_json(HOLDING_PATH).get("result", [])
+    return {h["nseTradingSymbol"]: h.get("totalQuantity", 0) for h in holdings if h.get("nseTradingSymbol")}
+
+def get_portfolio_risk():
+    """
+    Returns portfolio risk for the current holdings, recomputing only when the holdings' candle caches,
+    the benchmark cache or the quantities have changed since the cached result in files/risk.json.
+    """
+    quantities = _holding_quantities()
+    symbols = sorted(quantities)
+    key = json.dumps([candle_store.panel_version(symbols + [BENCHMARK_SYMBOL]), quantities, LOOKBACK_DAYS], sort_keys=True)
+    version = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    if os.path.exists(RISK_PATH):
+        try:
+            cached = json_store.read_json(RISK_PATH)
+            if cached.get("version") == version:
+                return cached
+        except (json_store.JSONDecodeError, IOError) as e:
+            logger.warning(f"Ignoring unreadable risk cache: {e}")
+
+    panel = candle_store.load_panel(symbols + [BENCHMARK_SYMBOL], fields=("close",))["close"]
+    benchmark = panel[BENCHMARK_SYMBOL] if BENCHMARK_SYMBOL in panel else None
+    panel = panel.drop(columns=[BENCHMARK_SYMBOL], errors="ignore")
+    if benchmark is None:
+        logger.warning(f"No candles cached for benchmark {BENCHMARK_SYMBOL} (see fetch_benchmark); betas will be omitted.")
+    if panel.empty:
+        return {"version": version, "error": "No candle data cached for holdings."}
+
+    returns = panel.pct_change(fill_method=None).iloc[1:].tail(LOOKBACK_DAYS).dropna(axis=1, how="all").dropna()
+    if len(returns) < 2:
+        # e.g. a single holding with one candle, or holdings whose histories do not overlap yet.
+        logger.warning(f"Only {len(returns)} day(s) of returns common to all holdings; risk not computed.")
+        return {"version": version, "observations": int(len(returns)), "error": "Not enough overlapping candle history to compute risk."}
+    last_close = panel.ffill().iloc[-1]
+    values = last_close.reindex(returns.columns) * pd.Series(quantities).reindex(returns.columns)
+    weights = values / values.sum()
+    benchmark_returns = benchmark.pct_change(fill_method=None) if benchmark is not None else None
+
+    risk = compute_risk(returns, weights, benchmark_returns)
+    risk["version"] = version
+    risk["portfolio_value"] = round(float(values.sum()), 2)
+    for c, figures in risk["var"].items():
+        figures["historical_var_amount"] = round(figures["historical_var"] * risk["portfolio_value"], 2)
+        figures["parametric_var_amount"] = round(figures["parametric_var"] * risk["portfolio_value"], 2)
+
+    json_store.write_json(RISK_PATH, risk, compression=json_store.ARTIFACT_COMPRESSION)
+    logger.info(f"Portfolio risk recomputed for {len(returns.columns)} holdings over {len(returns)} days (version {version}).")
+    return risk
+
+if __name__ == "__main__":
+    print(json.dumps(get_portfolio_risk(), indent=2))
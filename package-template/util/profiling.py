@@ -0,0 +1,188 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import time
+import threading
+import logging
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# --- Configuration ---
+PROFILE_ENV = "STOCKAUTO_PROFILE"       # Set to 1 to profile every wrapped stage and request
+ENABLED = os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+TRACEMALLOC_FRAMES = 5
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(BASE_DIR, "..", "log", "profiles")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# Profilers of the sessions currently running, innermost last. Only one cProfile can be active at a
+# time, so a nested stage pauses its parent: the parent's stats then cover only its own work.
+# Profiling is process-wide, so only one thread profiles at a time; others run unprofiled.
+_stack = []
+_owner = None
+_owner_lock = threading.Lock()
+_NOOP = nullcontext()
+
+class _Session:
+    __slots__ = ("name", "profiler", "started", "snapshot", "peak", "started_tracemalloc")
+
+def _pause_parent():
+    if not _stack:
+        return
+    parent = _stack[-1]
+    parent.profiler.disable()
+    parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+
+def _resume_parent():
+    if not _stack:
+        return
+    tracemalloc.reset_peak()
+    _stack[-1].profiler.enable()
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "profile"
+
+def _write_report(session, wall_seconds, snapshot):
+    """Writes the raw pstats dump and a readable summary to log/profiles/; returns the summary path."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{_safe_name(session.name)}")
+    session.profiler.dump_stats(base + ".prof")
+
+    out = io.StringIO()
+    out.write(f"Profile: {session.name}\n")
+    out.write(f"Wall time: {wall_seconds:.3f}s\n")
+    out.write(f"Peak traced memory: {session.peak / (1024 * 1024):.2f} MB\n\n")
+    out.write(f"=== Top {TOP_FUNCTIONS} functions by cumulative time ===\n")
+    pstats.Stats(session.profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    out.write(f"=== Top {TOP_ALLOCATIONS} allocation sites (net growth during the run) ===\n")
+    for stat in snapshot.compare_to(session.snapshot, "lineno")[:TOP_ALLOCATIONS]:
+        out.write(f"{stat}\n")
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    return base + ".txt"
+
+def _acquire():
+    """Returns True if the current thread may profile, claiming the profiler if it is free."""
+    global _owner
+    me = threading.get_ident()
+    if _owner == me:
+        return True
+    if not _owner_lock.acquire(blocking=False):
+        logger.info("Profiler busy in another thread; running unprofiled.")
+        return False
+    _owner = me
+    return True
+
+def _release():
+    global _owner
+    _owner = None
+    _owner_lock.release()
+
+@contextmanager
+def _profile(name):
+    if not _acquire():
+        yield None
+        return
+    session = _Session()
+    session.name = name
+    session.started_tracemalloc = not tracemalloc.is_tracing()
+    if session.started_tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    _pause_parent()
+    tracemalloc.reset_peak()
+    session.peak = 0
+    session.snapshot = tracemalloc.take_snapshot()
+    session.profiler = cProfile.Profile()
+    _stack.append(session)
+    session.started = time.perf_counter()
+    session.profiler.enable()
+    try:
+        yield session
+    finally:
+        session.profiler.disable()
+        wall_seconds = time.perf_counter() - session.started
+        _stack.pop()
+        session.peak = max(session.peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot()
+        if session.started_tracemalloc:
+            tracemalloc.stop()
+        try:
+            path = _write_report(session, wall_seconds, snapshot)
+            logger.info(f"Profiled {name}: {wall_seconds:.3f}s, peak {session.peak / (1024 * 1024):.2f} MB -> {path}")
+        except OSError as e:
+            logger.error(f"Could not write profile for {name}: {e}")
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, session.peak)
+            _resume_parent()
+        else:
+            _release()
+
+def profiled(name, force=False):
+    """
+    Context manager that profiles the enclosed block when profiling is on (the environment variable,
+    force=True, or an enclosing profiled block such as a ?profile=1 request). Otherwise it is a no-op.
+    """
+    if ENABLED or force or (_stack and _owner == threading.get_ident()):
+        return _profile(name)
+    return _NOOP
+
+def profile_stage(name=None):
+    """Decorator form of profiled() for pipeline stage functions."""
+    def decorator(func):
+        stage = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not (ENABLED or (_stack and _owner == threading.get_ident())):
+                return func(*args, **kwargs)
+            with _profile(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def list_profiles(limit=50):
+    """Most recent profile summaries as dicts with file name, name, time, wall time and peak memory."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".txt")), reverse=True)[:limit]
+    profiles = []
+    for file_name in names:
+        header = {}
+        with open(os.path.join(PROFILE_DIR, file_name), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    break
+                key, _, value = line.partition(": ")
+                header[key] = value.strip()
+        profiles.append({
+            "file": file_name,
+            "name": header.get("Profile", file_name),
+            "created": datetime.strptime(file_name[:22], "%Y%m%d-%H%M%S-%f").strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_time": header.get("Wall time", ""),
+            "peak_memory": header.get("Peak traced memory", ""),
+        })
+    return profiles
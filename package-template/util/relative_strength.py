@@ -0,0 +1,115 @@
+import os
+import sys
+import logging
+
+import pandas as pd
+
+from util import market_snapshot
+from util.fetch_candle_stick_data import PERCENTAGE_PERIODS
+
+# --- Configuration ---
+# Weight of each return horizon in the composite score. Every horizon is ranked across the universe
+# (percentile, 0-100) and the composite is the weighted mean of a symbol's horizon ranks.
+RS_WEIGHTS = {"1m": 0.1, "3m": 0.4, "6m": 0.3, "1y": 0.2}
+MIN_WEIGHT = 0.5                 # Share of RS_WEIGHTS a symbol needs history for to get a score
+RS_COLUMNS = [f"rs_{label}" for label in RS_WEIGHTS] + ["rs_score"]
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def _composite(ranks):
+    """Weighted mean of the available horizon ranks; NaN where less than MIN_WEIGHT of the weight is covered."""
+    total = sum(RS_WEIGHTS[label] * ranks[label].fillna(0) for label in RS_WEIGHTS)
+    covered = sum(RS_WEIGHTS[label] * ranks[label].notna() for label in RS_WEIGHTS)
+    return (total / covered).where(covered >= MIN_WEIGHT * sum(RS_WEIGHTS.values()))
+
+def score_table(returns):
+    """
+    Cross-sectional relative strength for one day: returns is a DataFrame indexed by symbol with one
+    return column per RS_WEIGHTS horizon. Returns rs_<horizon> percentile ranks and the composite rs_score.
+    """
+    ranks = {label: returns[label].rank(pct=True) * 100 for label in RS_WEIGHTS}
+    table = pd.DataFrame({f"rs_{label}": rank for label, rank in ranks.items()}, index=returns.index)
+    table["rs_score"] = _composite(ranks)
+    return table
+
+def _horizon_returns(close, periods):
+    """
+    Each symbol's return over its own last `periods` candles, like the snapshot's change columns. The
+    panel's dates are the union of every symbol's, so shifting the panel itself would count the days
+    a symbol did not trade (before listing, suspensions) as candles.
+    """
+    returns = {}
+    for symbol in close.columns:
+        own = close[symbol].dropna()
+        returns[symbol] = own / own.shift(periods) - 1
+    return pd.DataFrame(returns, index=close.index, columns=close.columns)
+
+def score_panel(close):
+    """
+    Composite score for every date and symbol of a close panel (dates x symbols), ranking each
+    horizon's returns across symbols date by date in one vectorized pass.
+    """
+    ranks = {label: _horizon_returns(close, PERCENTAGE_PERIODS[label]).rank(axis=1, pct=True) * 100
+             for label in RS_WEIGHTS}
+    return _composite(ranks)
+
+# In-process cache: (snapshot version, scores)
+_scores_cache = {}
+
+def latest_scores(path=market_snapshot.SNAPSHOT_DB_PATH):
+    """
+    Today's scores for every symbol in the market snapshot. The horizon returns come from the
+    snapshot, which only recomputes symbols whose candles changed, so the daily update is one rank
+    per horizon over the universe; the result is reused until the snapshot is rewritten.
+    """
+    version = market_snapshot.snapshot_version(path)
+    cached = _scores_cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    snapshot = market_snapshot.load_snapshot(path=path)
+    returns = snapshot[[f"change_{label}" for label in RS_WEIGHTS]]
+    returns.columns = list(RS_WEIGHTS)
+    scores = score_table(returns)
+    _scores_cache[path] = (version, scores)
+    logger.info(f"Relative strength scored {int(scores['rs_score'].notna().sum())}/{len(scores)} symbols for snapshot {version}.")
+    return scores
+
+def with_scores(table, path=market_snapshot.SNAPSHOT_DB_PATH):
+    """Adds the universe-wide rs_* columns to a table indexed by trading symbol, for screening rules."""
+    return table.drop(columns=RS_COLUMNS, errors="ignore").join(latest_scores(path))
+
+def refresh_scores(path=market_snapshot.SNAPSHOT_DB_PATH):
+    """Refreshes the snapshot from the candle caches, then the scores. Returns (success, message)."""
+    success, message = market_snapshot.refresh_snapshot(path=path)
+    if not success:
+        return False, message
+    scores = latest_scores(path)
+    msg = f"{message} Relative strength scored {int(scores['rs_score'].notna().sum())} symbols."
+    return True, msg
+
+if __name__ == "__main__":
+    # Usage: python -m util.relative_strength [top_n]
+    success, message = refresh_scores()
+    print(f"Success: {success}, Message: {message}")
+    if success:
+        top = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+        print(latest_scores().sort_values("rs_score", ascending=False).head(top).round(1).to_string())
@@ -0,0 +1,143 @@
+import glob
+import os
+import time
+import logging
+
+from util import json_store
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+HOLDING_PATH = os.path.join(PROJECT_DIR, "files", "holding.json")
+
+# --- Retention Policies ---
+# Each artifact class has glob patterns relative to the project directory, an age budget (files not used
+# for longer are evicted) and a size budget (least recently used files are evicted until the class fits).
+# None disables a budget.
+MB = 1024 * 1024
+RETENTION_POLICIES = [
+    {"name": "candles", "patterns": ["files/*_candles.json"], "max_age_days": 30, "max_bytes": 200 * MB},
+    {"name": "fundamentals", "patterns": ["files/fundamental_*.json"], "max_age_days": 14, "max_bytes": None},
+    {"name": "news", "patterns": ["files/news_cache.json"], "max_age_days": 7, "max_bytes": 20 * MB},
+    {"name": "reports", "patterns": ["files/*.html", "files/allocation.json", "files/risk.json", "files/portfolio_backtest.json",
+                                     "files/atr_memo.json", "files/market_snapshot.db", "files/correlation_state.npz", "recommendations/universe_buy.json"],
+     "max_age_days": 30, "max_bytes": 50 * MB},
+    # Whole exports age out together; a size budget could evict single partitions of a dataset.
+    {"name": "exports", "patterns": ["files/export/**/*.parquet", "files/export/*.arrow"], "max_age_days": 14, "max_bytes": None},
+    {"name": "logs", "patterns": ["log/*.log", "log/**/*.prof", "log/**/*.txt"], "max_age_days": 30, "max_bytes": 100 * MB},
+]
+# Never evicted: session state, the holdings snapshot and the live log file the handlers hold open.
+ALWAYS_PROTECTED = ["files/auth_token.txt", "files/holding.json", "files/atr.json", "log/app.log"]
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def collect_artifacts(patterns, root=PROJECT_DIR):
+    """
+    Returns [(path, size, last_used)] for files matching the patterns. last_used is the later of the
+    access and modification times, so a cache that is only read still counts as recently used where
+    the filesystem records access times.
+    """
+    artifacts = {}
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(root, pattern), recursive=True):
+            if not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            artifacts[os.path.abspath(path)] = (st.st_size, max(st.st_atime, st.st_mtime))
+    return [(path, size, last_used) for path, (size, last_used) in artifacts.items()]
+
+def plan_eviction(artifacts, max_age_days=None, max_bytes=None, protected=(), now=None):
+    """
+    Chooses which artifacts to delete: first everything unprotected that is older than the age budget,
+    then the least recently used unprotected files until the total size fits the size budget.
+    Protected files still count towards the size budget, so they can leave it exceeded.
+    """
+    now = now if now is not None else time.time()
+    protected = set(protected)
+    evict = []
+    kept = []
+    for artifact in sorted(artifacts, key=lambda a: a[2]):
+        path, _, last_used = artifact
+        if path not in protected and max_age_days is not None and now - last_used > max_age_days * 86400:
+            evict.append(artifact)
+        else:
+            kept.append(artifact)
+    if max_bytes is not None:
+        total = sum(size for _, size, _ in kept)
+        for artifact in kept:  # Oldest first
+            if total <= max_bytes:
+                break
+            if artifact[0] in protected:
+                continue
+            evict.append(artifact)
+            total -= artifact[1]
+    return evict
+
+def held_symbols(path=HOLDING_PATH):
+    """NSE trading symbols of the current holdings, or an empty set if the holdings file is missing."""
+    if not os.path.exists(path):
+        return set()
+    try:
+        holdings = json_store.read_json(path).get("result", [])
+    except (json_store.JSONDecodeError, IOError, AttributeError) as e:
+        logger.warning(f"Could not read holdings for retention: {e}")
+        return set()
+    return {h["nseTradingSymbol"] for h in holdings if h.get("nseTradingSymbol")}
+
+def protected_paths(root=PROJECT_DIR):
+    """Absolute paths that are never evicted, including the candle caches of held instruments."""
+    paths = {os.path.abspath(os.path.join(root, p)) for p in ALWAYS_PROTECTED}
+    for symbol in held_symbols(os.path.join(root, "files", "holding.json")):
+        paths.add(os.path.abspath(os.path.join(root, "files", f"{symbol}_candles.json")))
+    return paths
+
+def enforce_retention(policies=RETENTION_POLICIES, root=PROJECT_DIR, dry_run=False, now=None):
+    """
+    Applies every retention policy and deletes the evicted files (unless dry_run).
+    Returns (success, message) and logs a per-class summary.
+    """
+    protected = protected_paths(root)
+    removed_files = removed_bytes = 0
+    errors = []
+    for policy in policies:
+        artifacts = collect_artifacts(policy["patterns"], root)
+        evict = plan_eviction(artifacts, policy.get("max_age_days"), policy.get("max_bytes"), protected, now)
+        for path, size, _ in evict:
+            if dry_run:
+                logger.info(f"Would evict {path} ({size} bytes)")
+                continue
+            try:
+                os.remove(path)
+                removed_files += 1
+                removed_bytes += size
+            except OSError as e:
+                errors.append(f"{path}: {e}")
+                logger.error(f"Could not evict {path}: {e}")
+        total = sum(size for _, size, _ in artifacts)
+        logger.info(f"Retention [{policy['name']}]: {len(artifacts)} files, {total / MB:.1f} MB, "
+                    f"{len(evict)} {'to evict' if dry_run else 'evicted'}.")
+    if errors:
+        return False, f"Evicted {removed_files} files but {len(errors)} could not be removed."
+    if dry_run:
+        return True, "Dry run complete; see the log for files that would be evicted."
+    return True, f"Evicted {removed_files} files ({removed_bytes / MB:.1f} MB)."
+
+if __name__ == "__main__":
+    success, message = enforce_retention()
+    print(f"Success: {success}, Message: {message}")
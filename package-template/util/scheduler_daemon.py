@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timedelta
+
+from util import candle_store, circuit_breaker, correlation, fundamentals, instruments, json_store, single_flight
+from util.getUserSession import get_user_session_wrapper
+from util.download_contract_files import sync_contract_files
+from util.getPortfolioHoldings import get_portfolio_holdings
+from util.fetch_candle_stick_data import fetch_candle_stick_data
+from util.calculate_atr import calculate_atr
+from util.stream_pipeline import run_streaming_pipeline
+from util.universe_screener import fetch_universe_candles, run_universe_screen
+from util.portfolio_backtest import run_portfolio_backtest
+from util.portfolio_risk import fetch_benchmark
+from util.market_snapshot import refresh_snapshot
+from util.profiling import profiled
+from util.trading_calendar import IST, is_last_trading_day_of_week, is_trading_day, load_holidays
+
+# --- Configuration ---
+# Jobs run in-process on trading days at the given IST time (NSE closes at 15:30); each runs its stages in order and
+# stops at the first failure. 'weekly' jobs only run on the last trading day of the week.
+JOBS = [
+    {"name": "contracts", "at": "08:30", "stages": ["contract_sync"], "weekly": False},
+    {"name": "post_close", "at": "15:45", "stages": ["holdings_sync", "candles_atr_streaming", "snapshot", "correlation", "benchmark"], "weekly": False},
+    {"name": "screening", "at": "18:00", "stages": ["universe_candles", "screening"], "weekly": False},
+    {"name": "backtest", "at": "19:00", "stages": ["backtest"], "weekly": True},
+]
+MAX_SLEEP_SECONDS = 60
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(BASE_DIR, "..", "files", "scheduler_state.json")
+HOLDING_PATH = os.path.join(BASE_DIR, "..", "files", "holding.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def next_run(job, now, holidays):
+    """Returns the next IST datetime at or after now when the job is due."""
+    hour, minute = map(int, job["at"].split(":"))
+    day = now.date()
+    while True:
+        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=IST)
+        if candidate >= now and is_trading_day(day, holidays) and (not job["weekly"] or is_last_trading_day_of_week(day, holidays)):
+            return candidate
+        day += timedelta(days=1)
+
+def next_due(now, state, holidays, jobs=JOBS):
+    """
+    Returns (run time, job) for the job due soonest. A job already recorded in state as run today is
+    only due again from tomorrow; one whose time today has passed without a run is due immediately.
+    """
+    due = []
+    for job in jobs:
+        since = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if state.get(job["name"]) == now.date().isoformat():
+            since += timedelta(days=1)
+        due.append((next_run(job, since, holidays), job))
+    return min(due, key=lambda d: d[0])
+
+# --- Stages ---
+
+def _holdings_sync():
+    if not get_user_session_wrapper():
+        return False, "Could not obtain an auth token for today."
+    return get_portfolio_holdings()
+
+def _guarded(endpoint, stage):
+    """Runs a stage that calls an IIFL endpoint through that endpoint's circuit breaker."""
+    return lambda: circuit_breaker.breaker(endpoint).call(stage)
+
+STAGES = {
+    "contract_sync": _guarded(circuit_breaker.IIFL_CONTRACT_FILES, sync_contract_files),
+    "holdings_sync": _guarded(circuit_breaker.IIFL_HOLDINGS, _holdings_sync),
+    "candle_sync": _guarded(circuit_breaker.IIFL_HISTORICAL_DATA, fetch_candle_stick_data),
+    "atr": calculate_atr,
+    "candles_atr_streaming": _guarded(circuit_breaker.IIFL_HISTORICAL_DATA, run_streaming_pipeline),
+    "snapshot": refresh_snapshot,
+    "correlation": correlation.refresh_correlations,
+    "benchmark": fetch_benchmark,
+    "universe_candles": _guarded(circuit_breaker.IIFL_HISTORICAL_DATA, fetch_universe_candles),
+    "screening": run_universe_screen,
+    "backtest": run_portfolio_backtest,
+}
+
+def warm_caches():
+    """Loads the instrument index, holdings candle panel and fundamentals into memory up front."""
+    started = time.perf_counter()
+    try:
+        instruments.load_instrument_index()
+        if os.path.exists(HOLDING_PATH):
+            holdings = json_store.read_json(HOLDING_PATH).get("result", [])
+            symbols = [h["nseTradingSymbol"] for h in holdings if h.get("nseTradingSymbol")]
+            candle_store.load_panel(symbols)
+        if os.path.exists(fundamentals.FUNDAMENTALS_PATH):
+            fundamentals.load_fundamentals()
+        fundamentals.load_universe_fundamentals()
+    except Exception as e:
+        logger.warning(f"Cache warm-up incomplete: {e}")
+    logger.info(f"Caches warmed in {time.perf_counter() - started:.2f}s")
+
+def run_stage(name):
+    """Runs one stage in-process and returns (success, message). A run of the stage already in progress is joined."""
+    started = time.perf_counter()
+    try:
+        with profiled(f"stage_{name}"):
+            (success, message), _ = single_flight.pipelines.do(("stage", name), STAGES[name])
+    except Exception as e:
+        logger.exception(f"Stage {name} raised:")
+        success, message = False, str(e)
+    logger.info(f"Stage {name} {'succeeded' if success else 'failed'} in {time.perf_counter() - started:.1f}s: {message}")
+    return success, message
+
+def run_job(job):
+    for stage in job["stages"]:
+        success, _ = run_stage(stage)
+        if not success:
+            logger.error(f"Job {job['name']} stopped at stage {stage}.")
+            return False
+    return True
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    try:
+        return json_store.read_json(STATE_PATH)
+    except (json_store.JSONDecodeError, IOError):
+        return {}
+
+def _save_state(state):
+    json_store.write_json(STATE_PATH, state, pretty=True)
+
+def run_forever():
+    """Keeps the process alive, running each job once per due trading day."""
+    holidays = load_holidays()
+    state = _load_state()  # job name -> last date it ran, so a restart does not repeat today's jobs
+    warm_caches()
+    logger.info(f"Scheduler started with jobs: {[j['name'] for j in JOBS]}")
+    while True:
+        now = datetime.now(IST)
+        run_at, job = next_due(now, state, holidays)
+        if run_at > now:
+            time.sleep(min(MAX_SLEEP_SECONDS, (run_at - now).total_seconds()))
+            continue
+        logger.info(f"Running job {job['name']} scheduled for {run_at:%Y-%m-%d %H:%M} IST")
+        run_job(job)
+        state[job["name"]] = now.date().isoformat()
+        _save_state(state)
+
+if __name__ == "__main__":
+    # Usage: python -m util.scheduler_daemon            (run the schedule)
+    #        python -m util.scheduler_daemon <stage>    (run one stage now, e.g. candles_atr_streaming)
+    if len(sys.argv) > 1:
+        warm_caches()
+        success, message = run_stage(sys.argv[1])
+        print(f"Success: {success}, Message: {message}")
+    else:
+        run_forever()
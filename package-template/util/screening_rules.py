@@ -0,0 +1,218 @@
+import ast
+import operator
+import os
+import logging
+import pandas as pd
+
+from util import json_store
+
+# --- Constants and Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.join(BASE_DIR, "..", "configs", "screening_rules.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# Operators a rule may use. Anything else (calls, attributes, subscripts...) is rejected.
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+class RuleError(ValueError):
+    """Raised when a screening rule cannot be parsed or uses unsupported syntax."""
+
+def _column(table, name):
+    """
+    Returns a column as a Series. A column holding any numbers is numeric, with values that do not
+    parse (e.g. "N/A" from a data provider) as NaN, so they fail their clause instead of raising
+    TypeError; a column of text only is returned as is for comparisons with string constants.
+    """
+    if name not in table.columns:
+        logger.warning(f"Rule column '{name}' not found in table; treating as missing for all rows.")
+        return pd.Series(float("nan"), index=table.index)
+    series = table[name]
+    if series.dtype == object:
+        numeric = pd.to_numeric(series, errors="coerce")
+        present = series.notna() & (series != "")
+        if numeric[present].isna().all() and present.any():
+            return series
+        unparsed = present & numeric.isna()
+        if unparsed.any():
+            logger.debug(f"Rule column '{name}': {int(unparsed.sum())} non-numeric value(s) treated as missing.")
+        return numeric
+    return series
+
+def _with_defaults(table, defaults):
+    """Copy of the table with missing values (and missing columns) of the given columns filled in."""
+    table = table.copy()
+    for name, value in defaults.items():
+        table[name] = _column(table, name).fillna(value) if name in table.columns else value
+    return table
+
+def _logical_not(value):
+    """Python's 'not' over a mask, a column or a scalar: ~ is only defined for boolean masks, so a numeric column is compared with 0."""
+    if isinstance(value, pd.Series):
+        if pd.api.types.is_bool_dtype(value):
+            return ~value
+        if pd.api.types.is_numeric_dtype(value):
+            return value == 0
+        return ~value.astype(bool)
+    return not value
+
+def _compile_node(node, expression):
+    """Turns an AST node into a function of the table returning a Series or a scalar."""
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, expression) for v in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        def bool_op(table):
+            result = parts[0](table)
+            for part in parts[1:]:
+                result = combine(result, part(table))
+            return result
+        return bool_op
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_node(node.operand, expression)
+        return lambda table: _logical_not(operand(table))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        operand = _compile_node(node.operand, expression)
+        return lambda table: -operand(table)
+    if isinstance(node, ast.Compare):
+        # Chained comparisons (a < b < c) become (a < b) & (b < c), as in Python.
+        operands = [_compile_node(n, expression) for n in [node.left] + node.comparators]
+        ops = []
+        for op in node.ops:
+            if type(op) not in _COMPARE_OPS:
+                raise RuleError(f"Unsupported comparison in rule '{expression}'")
+            ops.append(_COMPARE_OPS[type(op)])
+        def compare(table):
+            values = [o(table) for o in operands]
+            result = ops[0](values[0], values[1])
+            for i, op in enumerate(ops[1:], start=1):
+                result = result & op(values[i], values[i + 1])
+            return result
+        return compare
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in _BIN_OPS:
+            raise RuleError(f"Unsupported arithmetic in rule '{expression}'")
+        left, right = _compile_node(node.left, expression), _compile_node(node.right, expression)
+        op = _BIN_OPS[type(node.op)]
+        return lambda table: op(left(table), right(table))
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda table: _column(table, name)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        value = node.value
+        return lambda table: value
+    raise RuleError(f"Unsupported syntax '{ast.unparse(node)}' in rule '{expression}'")
+
+class CompiledRule:
+    """
+    A screening rule split into its top-level 'and' clauses, each compiled to a mask function.
+    defaults maps columns to the value used where a row has none, e.g. a debt ratio banks do not report.
+    """
+
+    def __init__(self, expression, defaults=None):
+        self.expression = expression
+        self.defaults = dict(defaults or {})
+        try:
+            tree = ast.parse(expression, mode="eval").body
+        except SyntaxError as e:
+            raise RuleError(f"Invalid rule '{expression}': {e}") from e
+        if isinstance(tree, ast.BoolOp) and isinstance(tree.op, ast.And):
+            nodes = tree.values
+        else:
+            nodes = [tree]
+        self.clauses = [(ast.unparse(n), _compile_node(n, expression)) for n in nodes]
+
+    def evaluate(self, table):
+        """
+        Evaluates the rule over every row of the table at once.
+        Returns a DataFrame with one boolean column per clause plus a 'passed' column.
+        Missing values (NaN) fail the clause they appear in, unless the rule has a default for the column.
+        """
+        if self.defaults:
+            table = _with_defaults(table, self.defaults)
+        masks = {}
+        for text, fn in self.clauses:
+            mask = fn(table)
+            if not isinstance(mask, pd.Series):
+                mask = pd.Series(bool(mask), index=table.index)
+            masks[text] = mask.fillna(False).astype(bool)
+        result = pd.DataFrame(masks, index=table.index)
+        result["passed"] = result.all(axis=1) if self.clauses else True
+        return result
+
+_rules_cache = {}
+_compiled_cache = {}
+
+def load_rules(path=RULES_PATH):
+    """
+    Loads the named rules from the screening rules config file. A rule is an expression string, or
+    {"rule": expression, "defaults": {column: value}} to fill in values some rows lack.
+    """
+    mtime = os.path.getmtime(path)
+    cached = _rules_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    rules = json_store.read_json(path)
+    _rules_cache[path] = (mtime, rules)
+    logger.info(f"Loaded {len(rules)} screening rules from {path}")
+    return rules
+
+def compile_rule(expression, defaults=None):
+    """Compiles a rule expression, reusing the compiled form for repeated expressions."""
+    key = (expression, tuple(sorted((defaults or {}).items())))
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = CompiledRule(expression, defaults)
+        _compiled_cache[key] = compiled
+    return compiled
+
+def get_rule(name, path=RULES_PATH):
+    """Returns the compiled rule configured under the given name."""
+    rules = load_rules(path)
+    if name not in rules:
+        raise RuleError(f"Screening rule '{name}' is not defined in {path}")
+    rule = rules[name]
+    if isinstance(rule, dict):
+        return compile_rule(rule["rule"], rule.get("defaults"))
+    return compile_rule(rule)
+
+def evaluate(name, table, path=RULES_PATH):
+    """Evaluates the named rule over the table; see CompiledRule.evaluate."""
+    return get_rule(name, path).evaluate(table)
+
+def failed_clauses(result):
+    """Maps each row that did not pass to the list of clauses it failed."""
+    clause_masks = result.drop(columns="passed")
+    failures = {}
+    for index in result.index[~result["passed"]]:
+        row = clause_masks.loc[index]
+        failures[index] = [clause for clause, ok in row.items() if not ok]
+    return failures
@@ -0,0 +1,98 @@
+import functools
+import threading
+import logging
+import os
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, callers that
+    arrive while it is running wait for it and get the same result (or exception). Nothing is cached
+    once the call finishes, so the next call after that runs again. Coalescing is per process.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) unless a call with this key is in flight. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+        if not leader:
+            logger.info(f"[{self.name}] {key!r} already in flight; waiting for its result.")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"[{self.name}] {key!r} finished; shared with {call.waiters} waiting caller(s).")
+        return call.result, False
+
+    def in_flight(self, key):
+        """True while a call with this key is running."""
+        with self._lock:
+            return key in self._calls
+
+def coalesce(group, key=None):
+    """
+    Decorator that routes calls through group.do, keyed by key(*args, **kwargs) or, by default, by
+    the function name and arguments. The decorated function returns only the result.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (func.__name__, args, tuple(sorted(kwargs.items())))
+            return group.do(call_key, func, *args, **kwargs)[0]
+        return wrapper
+    return decorator
+
+# Shared groups: whole pipeline runs and stages, and per-symbol fetches from external APIs.
+pipelines = SingleFlight("pipelines")
+fetches = SingleFlight("fetches")
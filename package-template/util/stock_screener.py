@@ -2,6 +2,13 @@ import yfinance as yf
 import pandas as pd
 import logging
 import os
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/stock_screener.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import screening_rules
 
 # Setup logging to D:\Py_code\Stock_Trading_Auto\log
 log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', '..', 'log')
@@ -20,71 +27,52 @@ symbols = [
     "SBIN.NS", "LT.NS", "HINDUNILVR.NS", "KOTAKBANK.NS", "BAJFINANCE.NS"
 ]
 
-# Loosened screening thresholds
-MIN_EPS_GROWTH = 0.10
-MIN_SALES_GROWTH = 0.07
-MIN_ROE = 0.12
-MAX_DEBT_TO_EQUITY = 0.7
-MIN_PRICE_ABOVE_50DMA = False  # Only require above 200DMA
-MIN_PRICE_ABOVE_200DMA = True
+# Screening thresholds live in configs/screening_rules.json under 'growth_screener'.
+SCREEN_RULE = "growth_screener"
 
-results = []
+rows = {}
 
 for symbol in symbols:
     try:
         stock = yf.Ticker(symbol)
         info = stock.info
-
-        # Fundamental checks
-        eps_growth = info.get('earningsQuarterlyGrowth', 0)
-        sales_growth = info.get('revenueGrowth', 0)
-        roe = info.get('returnOnEquity', 0)
-        debt_to_equity = info.get('debtToEquity', 1)
-
-        if eps_growth < MIN_EPS_GROWTH:
-            logger.info(f"{symbol} failed EPS growth: {eps_growth}")
-            continue
-        if sales_growth < MIN_SALES_GROWTH:
-            logger.info(f"{symbol} failed Sales growth: {sales_growth}")
-            continue
-        if roe < MIN_ROE:
-            logger.info(f"{symbol} failed ROE: {roe}")
-            continue
-        if debt_to_equity > MAX_DEBT_TO_EQUITY:
-            logger.info(f"{symbol} failed Debt/Equity: {debt_to_equity}")
-            continue
-
-        # Technical checks
         hist = stock.history(period='6mo')
-        if len(hist) < 200:
-            logger.info(f"{symbol} failed: Not enough data for 200DMA")
-            continue  # Not enough data for 200DMA
-
         close = hist['Close']
-        dma_50 = close.rolling(50).mean()
-        dma_200 = close.rolling(200).mean()
-        last_close = close.iloc[-1]
-
-        if MIN_PRICE_ABOVE_50DMA and last_close < dma_50.iloc[-1]:
-            logger.info(f"{symbol} failed 50DMA: Last close {last_close} < 50DMA {dma_50.iloc[-1]}")
-            continue
-        if MIN_PRICE_ABOVE_200DMA and last_close < dma_200.iloc[-1]:
-            logger.info(f"{symbol} failed 200DMA: Last close {last_close} < 200DMA {dma_200.iloc[-1]}")
-            continue
 
-        results.append({
-            "Symbol": symbol,
-            "EPS Growth": eps_growth,
-            "Sales Growth": sales_growth,
-            "ROE": roe,
-            "Debt/Equity": debt_to_equity,
-            "Last Close": last_close,
-            "50DMA": dma_50.iloc[-1],
-            "200DMA": dma_200.iloc[-1]
-        })
+        rows[symbol] = {
+            "earningsQuarterlyGrowth": info.get('earningsQuarterlyGrowth'),
+            "revenueGrowth": info.get('revenueGrowth'),
+            "returnOnEquity": info.get('returnOnEquity'),
+            "debtToEquity": info.get('debtToEquity'),
+            # Moving averages are NaN when there is not enough history, which fails the rule.
+            "close": close.iloc[-1] if len(close) else None,
+            "sma50": close.rolling(50).mean().iloc[-1] if len(close) else None,
+            "sma200": close.rolling(200).mean().iloc[-1] if len(close) else None,
+        }
     except Exception as e:
         logger.warning(f"Error processing {symbol}: {e}")
 
+# Evaluate every clause of the rule over the whole table at once.
+table = pd.DataFrame.from_dict(rows, orient='index')
+screen = screening_rules.evaluate(SCREEN_RULE, table)
+for symbol, clauses in screening_rules.failed_clauses(screen).items():
+    logger.info(f"{symbol} failed: {', '.join(clauses)}")
+
+passed = table[screen['passed']]
+results = [
+    {
+        "Symbol": symbol,
+        "EPS Growth": row["earningsQuarterlyGrowth"],
+        "Sales Growth": row["revenueGrowth"],
+        "ROE": row["returnOnEquity"],
+        "Debt/Equity": row["debtToEquity"],
+        "Last Close": row["close"],
+        "50DMA": row["sma50"],
+        "200DMA": row["sma200"]
+    }
+    for symbol, row in passed.iterrows()
+]
+
 # Display results
 if results:
     df = pd.DataFrame(results)
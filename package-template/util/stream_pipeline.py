@@ -0,0 +1,269 @@
+import os
+import math
+import time
+import logging
+from datetime import date, datetime
+
+from util import atr_history, candle_store, circuit_breaker, json_store
+from util.calculate_atr import ATR_PERIOD, OUTPUT_FILE, holding_fingerprint, load_memo, memo_key, save_memo, trailing_stop
+from util.fetch_candle_stick_data import (
+    AUTH_TOKEN_PATH, CONFIG_PATH, HOLDING_PATH, get_instrument_id_map, load_json_file, percentage_changes,
+    too_many_fetch_failures,
+)
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array one element at a time to a temporary file and moves it into place on a clean
+    exit, so readers never see a half-written report and only the current element is held in memory.
+    Setting publish to False before the exit leaves the finished array in the temporary file instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.count = 0
+        self.publish = True
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(b"[")
+        return self
+
+    def write(self, item):
+        self._file.write(b",\n" if self.count else b"\n")
+        self._file.write(json_store.dumps(item))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self.tmp_path)
+            return False
+        self._file.write(b"\n]\n")
+        self._file.close()
+        if self.publish:
+            os.replace(self.tmp_path, self.path)
+        return False
+
+def _number(value):
+    """value as a finite float, or None for None, NaN, infinities and anything that does not parse."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def clean_candles(candles_raw):
+    """
+    (high, low, close) of each raw candle ([timestamp, open, high, low, close, volume]) whose high,
+    low and close are numbers. Like calculate_atr's coerce-and-drop, a bad candle is skipped instead
+    of failing the holding.
+    """
+    candles = []
+    for c in candles_raw:
+        if not isinstance(c, (list, tuple)) or len(c) < 5:
+            continue
+        high, low, close = _number(c[2]), _number(c[3]), _number(c[4])
+        if high is not None and low is not None and close is not None:
+            candles.append((high, low, close))
+    return candles
+
+def candle_atr(candles, period=ATR_PERIOD):
+    """Simple-average ATR over the last period (high, low, close) candles, as in calculate_atr, without building a DataFrame."""
+    total = 0.0
+    for i in range(len(candles) - period, len(candles)):
+        high, low = candles[i][0], candles[i][1]
+        true_range = high - low
+        if i > 0:
+            prev_close = candles[i - 1][2]
+            true_range = max(true_range, abs(high - prev_close), abs(low - prev_close))
+        total += true_range
+    return total / period
+
+def summarize_holding(holding, candles_raw, last=None, cached=None):
+    """
+    Builds the ATR report entry for one holding from its raw candles: last close, high of the period,
+    percentage changes, ATR, trailing stop and action, computed the same way as the batch pipeline
+    but without keeping the candle history in the entry. last is the holding's latest ATR history row,
+    from which the running high is advanced; cached is its ATR memo entry when the inputs are unchanged.
+    """
+    record = {k: v for k, v in holding.items() if k != "historical_data"}
+    purchase_price = holding.get("averageTradedPrice", 0)
+    record["purchase_price"] = purchase_price
+    candles = clean_candles(candles_raw)
+    if len(candles) < len(candles_raw):
+        logger.warning(f"{holding.get('nseTradingSymbol')}: skipped {len(candles_raw) - len(candles)} candle(s) without a numeric high, low or close.")
+    if candles:
+        record["last_close"] = candles[-1][2]
+        record["highest_price_in_period"] = max(c[0] for c in candles)
+    else:
+        record["last_close"] = holding.get("previousDayClose", 0)
+        record["highest_price_in_period"] = holding.get("previousDayClose", 0)
+    record["percentage_changes"] = percentage_changes([c[2] for c in candles])
+
+    if len(candles) < ATR_PERIOD:
+        record["atr_value"], record["trailing_stop_loss"], record["action"] = 0, purchase_price, "HOLD"
+        return record
+    if cached:
+        record["atr_value"], record["running_high"] = cached["atr_value"], cached["running_high"]
+        record["trailing_stop_loss"], record["action"] = cached["trailing_stop_loss"], cached["action"]
+        record["floor_armed"] = cached.get("floor_armed", False)
+        return record
+    atr_value = candle_atr(candles)
+    record["running_high"] = atr_history.advance_running_high(last, [c[0] for c in candles], record)
+    trailing_sl, record["floor_armed"] = trailing_stop(record["running_high"], atr_value, purchase_price,
+                                                      atr_history.floor_armed(last, record))
+    record["atr_value"] = atr_value
+    record["trailing_stop_loss"] = trailing_sl
+    record["action"] = "SELL" if record["last_close"] <= trailing_sl else "HOLD"
+    return record
+
+def _cached_today(trading_symbol):
+    """Raw candles from the symbol's cache if it was written today, so a rerun does not refetch them."""
+    path = candle_store.candle_path(trading_symbol)
+    if not os.path.exists(path) or date.fromtimestamp(os.path.getmtime(path)) != date.today():
+        return None
+    try:
+        return json_store.read_json(path)["result"][0]["candles"]
+    except (json_store.JSONDecodeError, KeyError, IndexError, TypeError):
+        return None
+
+def run_streaming_pipeline(fetch=None, holdings_path=HOLDING_PATH, output_path=OUTPUT_FILE, reuse_today=True,
+                           history_dir=atr_history.HISTORY_DIR, memo_path=None):
+    """
+    Fetches candles and computes the ATR report one holding at a time: fetch, persist the candle cache,
+    summarize, append to the report. Memory stays flat in the number of holdings because no candle
+    history is kept once its holding is written. fetch(trading_symbol, instrument_id) returns raw
+    candles and defaults to the IIFL historical-data API; each fetch goes through its circuit breaker.
+    Holdings whose candles and position are unchanged reuse their result from the ATR memo
+    (files/atr_memo.json, shared with calculate_atr). A holding that cannot be summarized is reported
+    as HOLD with its error instead of aborting the run. When more than MAX_FETCH_FAILURE_RATIO of the
+    fetches fail, the run fails and its report is left in <output>.tmp; the previous report stays.
+    """
+    logger.info("Starting streaming candle and ATR pipeline...")
+    started = time.perf_counter()
+    try:
+        holdings = load_json_file(holdings_path, "Holdings").get("result", [])
+        if not isinstance(holdings, list):
+            return False, "Holdings data is not in the expected list format."
+        instrument_id_map = get_instrument_id_map()
+        if fetch is None:
+            config = load_json_file(CONFIG_PATH, "Config")
+            with open(AUTH_TOKEN_PATH, 'r') as f:
+                token = f.read().strip()
+            if not token:
+                return False, "Auth token is missing or empty."
+            if not config.get("IIFL_BASE_URL") or not config.get("HISTORICAL_DATA_ENDPOINT"):
+                return False, "Historical data API URL or endpoint not found in config."
+            url = config["IIFL_BASE_URL"] + config["HISTORICAL_DATA_ENDPOINT"]
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            fetch = lambda symbol, instrument_id: candle_store.fetch_candles(url, headers, symbol, instrument_id)
+    except Exception as e:
+        return False, f"Failed during initial setup: {e}"
+
+    try:
+        last_rows = atr_history.last_decisions([atr_history.holding_symbol(h) for h in holdings], history_dir)
+    except Exception as e:
+        logger.warning(f"Could not read ATR history; running highs restart from the fetched period: {e}")
+        last_rows = {}
+
+    memo, fresh_memo = load_memo(memo_path), {}
+    breaker = circuit_breaker.breaker(circuit_breaker.IIFL_HISTORICAL_DATA)
+    fetched = reused = failed = fetch_failed = hits = 0
+    decisions = []
+    run_at = datetime.now()
+    try:
+        with JsonArrayWriter(output_path) as report:
+            for holding in holdings:
+                trading_symbol = holding.get("nseTradingSymbol")
+                candles_raw = []
+                instrument_id = instrument_id_map.get(trading_symbol) if trading_symbol else None
+                if not instrument_id:
+                    logger.warning(f"Skipping candles for holding with missing symbol or instrumentId: {holding.get('bseTradingSymbol', 'N/A')}")
+                else:
+                    try:
+                        candles_raw = _cached_today(trading_symbol) if reuse_today else None
+                        if candles_raw is None:
+                            fetched += 1
+                            if not breaker.allow():
+                                raise RuntimeError(f"{breaker.name} circuit is open ({breaker.last_error})")
+                            try:
+                                candles_raw = fetch(trading_symbol, instrument_id) or []
+                            except Exception as e:
+                                breaker.record_failure(e)
+                                raise
+                            breaker.record_success()
+                        else:
+                            reused += 1
+                    except Exception as e:
+                        logger.error(f"Error fetching candles for {trading_symbol}: {e}")
+                        candles_raw = []
+                        failed += 1
+                        fetch_failed += 1
+                key = memo_key(holding)
+                try:
+                    fingerprint = holding_fingerprint(holding)
+                    cached = memo.get(key) if fingerprint and memo.get(key, {}).get("fingerprint") == fingerprint else None
+                    record = summarize_holding(holding, candles_raw, last_rows.get(atr_history.holding_symbol(holding)), cached)
+                    if cached:
+                        hits += 1
+                    if "running_high" in record:
+                        fresh_memo[key] = {"fingerprint": fingerprint, **{k: record[k] for k in (
+                            "atr_value", "running_high", "trailing_stop_loss", "floor_armed", "action")}}
+                except Exception as e:
+                    logger.exception(f"Error summarizing {trading_symbol or key}:")
+                    record = {k: v for k, v in holding.items() if k != "historical_data"}
+                    record.update(atr_value=0, trailing_stop_loss=holding.get("averageTradedPrice", 0), action="HOLD", error=str(e))
+                    failed += 1
+                report.write(record)
+                decisions.append(atr_history.decision_row(record, run_at.date(), run_at))
+                del candles_raw, record
+            report.publish = not too_many_fetch_failures(fetch_failed, fetched)
+    except IOError as e:
+        msg = f"Failed to write ATR report: {e}"
+        logger.error(msg)
+        return False, msg
+
+    if not report.publish:
+        # Neither the report nor the memo and history take the placeholder rows of an outage.
+        msg = (f"Candle fetch failed for {fetch_failed}/{fetched} holdings; kept the previous {output_path} "
+               f"and left this run's report in {report.tmp_path}.")
+        logger.error(msg)
+        return False, msg
+    if fresh_memo != memo:
+        save_memo(fresh_memo, memo_path)
+    try:
+        atr_history.append_decisions(decisions, history_dir)
+    except Exception as e:
+        logger.error(f"Failed to append ATR decisions to history: {e}")
+    msg = (f"ATR report ready. Streamed {report.count} holdings in {time.perf_counter() - started:.1f}s "
+           f"({fetched} fetched, {reused} reused from today's cache, {failed} failed, {hits} unchanged).")
+    logger.info(msg)
+    return True, msg
+
+if __name__ == "__main__":
+    success, message = run_streaming_pipeline()
+    print(f"Success: {success}, Message: {message}")
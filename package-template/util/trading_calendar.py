@@ -0,0 +1,69 @@
+import os
+import logging
+from datetime import datetime, time, timedelta, timezone
+
+from util import json_store
+
+# --- Configuration ---
+IST = timezone(timedelta(hours=5, minutes=30))  # No DST, so a fixed offset avoids needing tzdata on Windows
+MARKET_CLOSE = time(15, 30)                      # NSE closing time, IST
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HOLIDAYS_PATH = os.path.join(BASE_DIR, "..", "configs", "nse_holidays.json")  # Optional list of "YYYY-MM-DD"
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+# In-process cache: path -> (file signature, holidays)
+_holidays_cache = {}
+
+def load_holidays(path=None):
+    """Returns the set of NSE holiday dates from configs/nse_holidays.json, if present; reused while the file is unchanged."""
+    path = path or HOLIDAYS_PATH
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return set()
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _holidays_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    holidays = {datetime.strptime(d, "%Y-%m-%d").date() for d in json_store.read_json(path)}
+    _holidays_cache[path] = (signature, holidays)
+    return holidays
+
+def is_trading_day(day, holidays):
+    return day.weekday() < 5 and day not in holidays
+
+def is_last_trading_day_of_week(day, holidays):
+    next_day = day + timedelta(days=1)
+    while not is_trading_day(next_day, holidays):
+        next_day += timedelta(days=1)
+    return next_day.isocalendar()[1] != day.isocalendar()[1]
+
+def last_session_close(now=None, holidays=None):
+    """IST datetime of the close of the most recent trading session that has closed by now."""
+    now = now or datetime.now(IST)
+    holidays = load_holidays() if holidays is None else holidays
+    day = now.astimezone(IST).date()
+    while True:
+        close = datetime.combine(day, MARKET_CLOSE, tzinfo=IST)
+        if close <= now and is_trading_day(day, holidays):
+            return close
+        day -= timedelta(days=1)
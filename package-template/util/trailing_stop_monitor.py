@@ -0,0 +1,194 @@
+import csv
+import os
+import sys
+import time
+import random
+import logging
+from collections import deque
+
+from util import atr_history, json_store
+from util.calculate_atr import ATR_MULTIPLIER, ATR_PERIOD, trailing_stop
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ATR_REPORT_PATH = os.path.join(BASE_DIR, "..", "files", "atr.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+class HoldingState:
+    """Running state for one monitored holding."""
+    __slots__ = ("symbol", "purchase_price", "quantity", "atr", "running_high", "stop", "floor_armed",
+                 "action", "prev_close", "true_ranges", "tr_sum")
+
+    def __init__(self, symbol, purchase_price, atr, running_high, quantity=0):
+        self.symbol = symbol
+        self.purchase_price = purchase_price
+        self.quantity = quantity
+        self.atr = atr
+        self.running_high = max(running_high, purchase_price)
+        self.stop = 0.0
+        self.floor_armed = False
+        self.action = "HOLD"
+        self.prev_close = None
+        self.true_ranges = deque(maxlen=ATR_PERIOD)
+        self.tr_sum = 0.0
+
+class TrailingStopMonitor:
+    """
+    Tracks the high since purchase and the ATR trailing stop for each holding, one tick at a time.
+    Each tick is a dict lookup and a couple of comparisons; the stop only moves when a new high is made.
+    A holding emits a SELL event once, the first time a tick trades at or below its stop.
+    The stop is floored at the purchase price only once the trailing stop has cleared it, i.e. the high
+    since purchase reached cost + ATR * multiplier. A holding still below that level trails from its
+    high like any other instead of selling on its first tick below cost.
+    """
+
+    def __init__(self, atr_multiplier=ATR_MULTIPLIER, on_sell=None):
+        self.atr_multiplier = atr_multiplier
+        self.on_sell = on_sell
+        self.states = {}
+        self.ticks = 0
+
+    def _update_stop(self, state):
+        state.stop, state.floor_armed = trailing_stop(state.running_high, state.atr, state.purchase_price,
+                                                      state.floor_armed, self.atr_multiplier)
+
+    def add_holding(self, symbol, purchase_price, atr, running_high=None, quantity=0, floor_armed=False):
+        """Starts monitoring a holding. running_high defaults to the purchase price."""
+        state = HoldingState(symbol, purchase_price, atr, running_high or purchase_price, quantity)
+        state.floor_armed = bool(floor_armed)
+        self._update_stop(state)
+        self.states[symbol] = state
+        return state
+
+    def on_tick(self, symbol, price, timestamp=None):
+        """Processes one trade price. Returns a SELL event dict on the HOLD -> SELL transition, else None."""
+        self.ticks += 1
+        state = self.states.get(symbol)
+        if state is None or state.action == "SELL":
+            return None
+        if price > state.running_high:
+            state.running_high = price
+            self._update_stop(state)
+        if price > state.stop:
+            return None
+        state.action = "SELL"
+        event = {
+            "symbol": symbol,
+            "action": "SELL",
+            "price": price,
+            "trailing_stop_loss": state.stop,
+            "running_high": state.running_high,
+            "atr_value": state.atr,
+            "quantity": state.quantity,
+            "timestamp": timestamp if timestamp is not None else time.time(),
+        }
+        logger.info(f"{symbol}: SELL at {price:.2f} (stop {state.stop:.2f}, high {state.running_high:.2f})")
+        if self.on_sell:
+            self.on_sell(event)
+        return event
+
+    def on_daily_bar(self, symbol, high, low, close):
+        """
+        Rolls the ATR forward with a completed daily bar, keeping a window of the last ATR_PERIOD
+        true ranges so the simple-average ATR is updated without recomputing the history.
+        """
+        state = self.states.get(symbol)
+        if state is None:
+            return
+        if state.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - state.prev_close), abs(low - state.prev_close))
+        if len(state.true_ranges) == state.true_ranges.maxlen:
+            state.tr_sum -= state.true_ranges[0]
+        state.true_ranges.append(true_range)
+        state.tr_sum += true_range
+        state.prev_close = close
+        if len(state.true_ranges) == state.true_ranges.maxlen:
+            state.atr = state.tr_sum / len(state.true_ranges)
+        if high > state.running_high:
+            state.running_high = high
+        self._update_stop(state)
+
+    def run(self, ticks):
+        """Consumes (timestamp, symbol, price) ticks and returns the SELL events in order."""
+        events = []
+        on_tick = self.on_tick
+        for timestamp, symbol, price in ticks:
+            event = on_tick(symbol, price, timestamp)
+            if event:
+                events.append(event)
+        return events
+
+    @classmethod
+    def from_atr_report(cls, path=ATR_REPORT_PATH, **kwargs):
+        """
+        Seeds a monitor from files/atr.json. The running high starts from the report's 'running_high',
+        or failing that from atr_history.seed_running_high (the high since purchase), rather than the
+        multi-year 'highest_price_in_period', and then advances with live prices.
+        """
+        holdings = json_store.read_json(path)
+        monitor = cls(**kwargs)
+        for h in holdings:
+            symbol = h.get("nseTradingSymbol") or h.get("bseTradingSymbol")
+            purchase_price = h.get("purchase_price") or h.get("averageTradedPrice")
+            if not symbol or not purchase_price:
+                continue
+            highs = [c["high"] for c in h.get("historical_data") or [] if isinstance(c.get("high"), (int, float))]
+            running_high = h.get("running_high") or atr_history.seed_running_high(h, highs)
+            monitor.add_holding(symbol, purchase_price, h.get("atr_value") or 0, running_high, h.get("totalQuantity", 0),
+                                h.get("floor_armed", False))
+        logger.info(f"Monitoring {len(monitor.states)} holdings from {path}")
+        return monitor
+
+def replay_ticks(path):
+    """Yields (timestamp, symbol, price) from a CSV file with timestamp,symbol,price columns."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield row["timestamp"], row["symbol"], float(row["price"])
+
+def simulated_ticks(start_prices, count, volatility=0.001, seed=None):
+    """Yields count random-walk ticks spread across the given {symbol: price} starting points."""
+    rng = random.Random(seed)
+    prices = dict(start_prices)
+    symbols = list(prices)
+    for i in range(count):
+        symbol = symbols[rng.randrange(len(symbols))]
+        prices[symbol] *= 1 + rng.gauss(0, volatility)
+        yield i, symbol, prices[symbol]
+
+if __name__ == "__main__":
+    # Usage: python -m util.trailing_stop_monitor simulate [tick_count]
+    #        python -m util.trailing_stop_monitor replay <ticks.csv>
+    mode = sys.argv[1] if len(sys.argv) > 1 else "simulate"
+    monitor = TrailingStopMonitor.from_atr_report(on_sell=lambda e: print(f"SELL {e['symbol']} at {e['price']:.2f} (stop {e['trailing_stop_loss']:.2f})"))
+    if not monitor.states:
+        sys.exit("No holdings with a purchase price found in the ATR report.")
+    if mode == "replay":
+        ticks = replay_ticks(sys.argv[2])
+    else:
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+        start = {s: max(st.running_high, st.stop) for s, st in monitor.states.items()}
+        ticks = simulated_ticks(start, count)
+    started = time.perf_counter()
+    events = monitor.run(ticks)
+    elapsed = time.perf_counter() - started
+    print(f"Processed {monitor.ticks} ticks for {len(monitor.states)} holdings in {elapsed:.3f}s "
+          f"({monitor.ticks / elapsed if elapsed else 0:,.0f} ticks/s), {len(events)} SELL signals.")
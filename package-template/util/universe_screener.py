@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import logging
+import pandas as pd
+from datetime import datetime
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+from util import candle_store, instruments, json_store, market_snapshot, relative_strength, screening_rules, single_flight
+from util.fetch_candle_stick_data import fetch_symbol_candles
+from util.fundamentals import UNIVERSE_INFO_KEYS, load_universe_fundamentals, save_universe_fundamentals
+from util.news_sentiment import get_sentiments
+
+# --- Configuration ---
+PREFILTER_RULE = "universe_prefilter"          # Cheap technical screen on cached candles
+FUNDAMENTALS_RULE = "universe_fundamentals"    # Screen on yfinance .info for prefilter survivors
+FUNDAMENTALS_MAX_AGE_DAYS = 7                  # Reuse cached .info for this long
+
+# --- Path Setup ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FILE = os.path.join(BASE_DIR, "..", "recommendations", "universe_buy.json")
+
+# --- Logging Setup ---
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """Configure logging for the module."""
+    log_dir = os.path.join(BASE_DIR, '..', 'log')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'app.log')
+    if not logger.handlers:
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.DEBUG)
+
+setup_logging()
+
+def fetch_universe_candles():
+    """
+    Fills the candle store for every NSE equity, fetching only symbols without a cache from today;
+    the holdings candle sync only covers held symbols. Returns (success, message).
+    """
+    return fetch_symbol_candles(instruments.equity_universe())
+
+def technical_table(symbols, path=market_snapshot.SNAPSHOT_DB_PATH):
+    """
+    Returns the market snapshot rows (last close, 50/200DMA, 52-week high, returns) for the symbols
+    with their relative-strength scores, first recomputing only the rows whose candle cache changed
+    since the last refresh. Each row is computed from that symbol's own candles, so a 200DMA covers
+    its last 200 sessions whatever dates other symbols traded on.
+    """
+    market_snapshot.refresh_snapshot(symbols, path=path)
+    return relative_strength.with_scores(market_snapshot.load_snapshot(symbols, path=path), path=path)
+
+def _yf_ticker(symbol):
+    if yf is None:
+        raise RuntimeError("yfinance is not installed; install it to screen fundamentals and news.")
+    return yf.Ticker(symbol.replace(instruments.EQUITY_SERIES_SUFFIX, "") + ".NS")
+
+def fetch_info(symbol):
+    """yfinance .info for a trading symbol; a lookup already in flight for the symbol is shared."""
+    return single_flight.fetches.do(("info", symbol), lambda: _yf_ticker(symbol).info)[0]
+
+def fetch_news(symbol):
+    """yfinance headlines for a trading symbol; a lookup already in flight for the symbol is shared."""
+    return single_flight.fetches.do(("news", symbol), lambda: _yf_ticker(symbol).news)[0]
+
+def fetch_fundamentals(symbols):
+    """Returns a fundamentals table for the symbols, fetching .info only for entries missing or older than the max age."""
+    cache = dict(load_universe_fundamentals())
+    now = time.time()
+    fetched = 0
+    for symbol in symbols:
+        entry = cache.get(symbol)
+        if entry and now - entry.get("fetched_at", 0) < FUNDAMENTALS_MAX_AGE_DAYS * 86400:
+            continue
+        try:
+            info = fetch_info(symbol)
+            cache[symbol] = {key: info.get(key) for key in UNIVERSE_INFO_KEYS}
+            cache[symbol]["fetched_at"] = now
+            fetched += 1
+        except Exception as e:
+            logger.warning(f"{symbol} fundamentals fetch failed: {e}")
+    if fetched:
+        save_universe_fundamentals(cache)
+    logger.info(f"Fundamentals: fetched {fetched}, reused {len(symbols) - fetched} cached entries.")
+    return pd.DataFrame.from_dict({s: cache[s] for s in symbols if s in cache}, orient="index")
+
+def news_sentiments(symbols):
+    """Returns {symbol: sentiment}, fetching yfinance headlines only for symbols without fresh cached news."""
+    return get_sentiments(symbols, fetch_news)
+
+def _record_stage(funnel, name, count_in, count_out, started):
+    """Appends one funnel stage with its survivor count and elapsed time."""
+    seconds = time.perf_counter() - started
+    funnel.append({"stage": name, "in": count_in, "out": count_out, "seconds": round(seconds, 3)})
+    logger.info(f"Stage '{name}': {count_in} -> {count_out} in {seconds:.2f}s")
+
+def run_universe_screen(include_news=True):
+    """
+    Screens every NSE equity in a funnel: technical prefilter on cached candles,
+    then fundamentals, then news, each stage only seeing the previous stage's survivors.
+    The candles come from fetch_universe_candles (the scheduler runs it just before).
+    """
+    logger.info("Starting universe screen...")
+    funnel = []
+    try:
+        started = time.perf_counter()
+        universe = instruments.equity_universe()
+        cached = set(candle_store.cached_symbols())
+        symbols = [s for s in universe if s in cached]
+        _record_stage(funnel, "cached_candles", len(universe), len(symbols), started)
+
+        started = time.perf_counter()
+        technicals = technical_table(symbols)
+        prefilter = screening_rules.evaluate(PREFILTER_RULE, technicals)
+        survivors = list(technicals.index[prefilter["passed"]])
+        _record_stage(funnel, "technical_prefilter", len(symbols), len(survivors), started)
+
+        started = time.perf_counter()
+        fundamentals = fetch_fundamentals(survivors)
+        screen = screening_rules.evaluate(FUNDAMENTALS_RULE, fundamentals)
+        for symbol, clauses in screening_rules.failed_clauses(screen).items():
+            logger.debug(f"{symbol} failed fundamentals: {', '.join(clauses)}")
+        passed = list(fundamentals.index[screen["passed"]])
+        _record_stage(funnel, "fundamentals", len(survivors), len(passed), started)
+        survivors = passed
+
+        sentiments = {}
+        if include_news:
+            started = time.perf_counter()
+            sentiments = news_sentiments(survivors)
+            passed = [s for s in survivors if sentiments[s] != "Negative"]
+            _record_stage(funnel, "news", len(survivors), len(passed), started)
+            survivors = passed
+    except Exception as e:
+        msg = f"Universe screen failed: {e}"
+        logger.exception(msg)
+        return False, msg
+
+    buy_list = []
+    for symbol in survivors:
+        row = technicals.loc[symbol]
+        buy_list.append({
+            "Symbol": symbol.replace(instruments.EQUITY_SERIES_SUFFIX, ""),
+            "Sector": fundamentals.at[symbol, "sector"] if "sector" in fundamentals else None,
+            "Last Close": row["close"],
+            "52W High": row["high52w"],
+            "Pct from High": (row["close"] / row["high52w"] - 1) * 100,
+            "News Sentiment": sentiments.get(symbol, "Unknown"),
+            "RS Score": row["rs_score"] if pd.notna(row["rs_score"]) else None,
+            "BUY": True
+        })
+    buy_list.sort(key=lambda entry: entry["RS Score"] if entry["RS Score"] is not None else -1, reverse=True)
+
+    try:
+        json_store.write_json(OUTPUT_FILE, {"generated_at": datetime.now().isoformat(timespec="seconds"), "funnel": funnel, "buy_list": buy_list})
+    except IOError as e:
+        msg = f"Failed to save universe screen: {e}"
+        logger.error(msg)
+        return False, msg
+
+    summary = " -> ".join(f"{s['stage']} {s['out']} ({s['seconds']:.1f}s)" for s in funnel)
+    msg = f"Universe screen complete: {summary}. Saved {len(buy_list)} BUY candidates to {OUTPUT_FILE}"
+    logger.info(msg)
+    return True, msg
+
+if __name__ == "__main__":
+    # Usage: python -m util.universe_screener [--fetch]   (--fetch first refreshes the universe's candles)
+    if "--fetch" in sys.argv:
+        success, message = fetch_universe_candles()
+        print(f"Success: {success}, Message: {message}")
+    success, message = run_universe_screen()
+    print(f"Success: {success}, Message: {message}")
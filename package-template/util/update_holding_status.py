@@ -1,28 +1,28 @@
-import json
 import os
+import pandas as pd
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script (python util/update_holding_status.py): put the project root on the path for the util imports.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import json_store, screening_rules
 
 base_dir = os.path.dirname(__file__)
 holding_path = os.path.join(base_dir, '../files/holding.json')
 fundamental_path = os.path.join(base_dir, '../files/fundamental_holdings.json')
 
 # Load holdings
-with open(holding_path, 'r', encoding='utf-8') as f:
-    holdings_data = json.load(f)
+holdings_data = json_store.read_json(holding_path)
 
 holdings = holdings_data['result']
 
 # Load fundamentals
-with open(fundamental_path, 'r', encoding='utf-8') as f:
-    fundamentals = json.load(f)
-
-def is_strong(fund):
-    try:
-        pe = float(fund.get('peRatio', 'nan'))
-        roe = float(fund.get('roe', 'nan'))
-        de = float(fund.get('debtToEquity', 'nan'))
-        return (pe < 25) and (roe > 0.15) and (de < 1.5)
-    except Exception:
-        return False
+fundamentals = json_store.read_json(fundamental_path)
+
+# Evaluate the 'holding_strength' rule (configs/screening_rules.json) for all symbols at once.
+fundamentals_table = pd.DataFrame.from_dict(fundamentals, orient='index')
+strong = screening_rules.evaluate('holding_strength', fundamentals_table)['passed']
 
 for h in holdings:
     symbol = h.get('nseTradingSymbol', '').replace('-EQ', '') + '.NS'
@@ -30,13 +30,12 @@ for h in holdings:
     if not fund and h.get('bseTradingSymbol'):
         symbol = h['bseTradingSymbol'] + '.BO'
         fund = fundamentals.get(symbol)
-    if fund and is_strong(fund):
+    if fund and strong.get(symbol, False):
         h['status'] = 'Strong'
     else:
         h['status'] = 'Weak'
 
 # Save the updated holdings back to holding.json
-with open(holding_path, 'w', encoding='utf-8') as f:
-    json.dump(holdings_data, f, indent=2)
+json_store.write_json(holding_path, holdings_data)
 
 print("Updated holding.json with status for each record.")
\ No newline at end of file